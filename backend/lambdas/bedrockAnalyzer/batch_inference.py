@@ -0,0 +1,543 @@
+"""
+Lambda function analyzing a backlog of contracts with Bedrock batch
+inference jobs instead of one on-demand request per prompt.
+
+The prompts of the contracts are written as JSONL records to S3 and
+submitted as model invocation jobs; a scheduled poll collects the finished
+jobs and saves their analyses in bulk, like the on-demand analyzer does.
+"""
+import json
+import boto3
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from lambda_function import (
+    ANALYSIS_CACHE_ENABLED, BEDROCK_MODEL_ID, TEXTRACT_BUCKET, analysis_cache_key,
+    analysis_prompts, cacheable_analysis, contract_sections, emit_metric,
+    failed_analysis, get_cached_analysis, merge_chunk_analyses,
+    parse_analysis_response, persist_analysis, put_cached_analysis, route_model,
+    s3_client, set_contract_status, trigger_risk_scoring
+)
+
+bedrock = boto3.client('bedrock', region_name='us-east-1')
+
+# Environment variables
+# Service role Bedrock assumes to read the input and write the output of the
+# jobs; without it jobs are only written to S3, for replay_job to play canned
+# outputs (local stand-in for testing)
+BATCH_INFERENCE_ROLE_ARN = os.environ.get('BATCH_INFERENCE_ROLE_ARN', '')
+# Inputs, outputs and manifests of the jobs, in TEXTRACT_BUCKET
+BATCH_INFERENCE_PREFIX = os.environ.get('BATCH_INFERENCE_PREFIX', 'batch-inference')
+# Bedrock quotas of records per job; smaller backlogs are not submitted
+BATCH_MIN_RECORDS = int(os.environ.get('BATCH_MIN_RECORDS', '100'))
+BATCH_MAX_RECORDS = int(os.environ.get('BATCH_MAX_RECORDS', '50000'))
+# Most input of a job, under the Bedrock quota of input file size; the input
+# of the jobs being written is kept in /tmp (ephemeral storage)
+BATCH_MAX_INPUT_MB = int(os.environ.get('BATCH_MAX_INPUT_MB', '500'))
+# Hours before Bedrock stops an unfinished job (and its partial results are collected)
+BATCH_JOB_TIMEOUT_HOURS = int(os.environ.get('BATCH_JOB_TIMEOUT_HOURS', '72'))
+# Most output tokens of a record; replies cut short cannot be continued in a
+# batch and are repaired by parse_analysis_response
+BATCH_MAX_TOKENS = int(os.environ.get('BATCH_MAX_TOKENS', '4000'))
+# Contract texts read, or analyses saved, at the same time
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '10'))
+
+# Job statuses after which Bedrock writes no more output
+FINISHED_JOB_STATUSES = {'Completed', 'PartiallyCompleted', 'Failed', 'Stopped', 'Expired'}
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Submit, poll or replay batch inference jobs of contract backlogs.
+    
+    Args:
+        event: Direct invocation or schedule event, with 'backlog_action':
+            'submit' with 'contract_ids' (or 'contract_ids_key', the S3 key
+            of a JSON list of them) and optionally 'skip_cache';
+            'poll' (default) to collect the finished jobs;
+            'replay' with 'job_name' and 'output_key' (S3) or 'output_path'
+            (local file) of canned JSONL output records
+        context: Lambda context
+    
+    Returns:
+        Jobs submitted, or contracts collected
+    """
+    action = event.get('backlog_action', 'poll')
+    try:
+        if action == 'submit':
+            contract_ids = event.get('contract_ids')
+            if contract_ids is None and event.get('contract_ids_key'):
+                response = s3_client.get_object(Bucket=TEXTRACT_BUCKET, Key=event['contract_ids_key'])
+                contract_ids = json.loads(response['Body'].read())
+            if not contract_ids:
+                return {'statusCode': 400, 'body': 'No contract_ids provided'}
+            result = submit_backlog(contract_ids, read_cache=not event.get('skip_cache'))
+        elif action == 'poll':
+            result = poll_jobs()
+        elif action == 'replay':
+            if not event.get('job_name') or not (event.get('output_key') or event.get('output_path')):
+                return {'statusCode': 400, 'body': 'job_name and output_key or output_path are required'}
+            result = replay_job(event['job_name'], event.get('output_key'), event.get('output_path'))
+        else:
+            return {'statusCode': 400, 'body': f"Unknown backlog_action: {action}"}
+        
+        return {'statusCode': 200, 'body': json.dumps(result)}
+    except Exception as e:
+        print(f"Error in batch inference {action}: {str(e)}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
+
+
+def submit_backlog(contract_ids: List[str], read_cache: bool = True) -> Dict[str, Any]:
+    """
+    Write the prompts of contracts to S3 and submit them as batch inference jobs.
+    
+    Contracts with a cached analysis are saved right away. The prompts of
+    the others are the ones of the on-demand analysis (see
+    analysis_prompts), split into one job per model tier (see route_model)
+    of at most BATCH_MAX_RECORDS records and BATCH_MAX_INPUT_MB of input,
+    a contract never spanning two jobs. Contracts are read
+    BATCH_CONCURRENCY at a time and their prompts written to the input
+    file of their job in /tmp as they are read, so that only the ids of
+    the backlog are kept in memory. Each job has a manifest mapping its
+    records to contracts, and its contracts are 'batch_queued' until it
+    is collected.
+    
+    Returns:
+        Jobs submitted, contracts saved from the cache, and contracts left
+        alone (text not found, or too few records for a job)
+    """
+    contract_ids = list(dict.fromkeys(contract_ids))
+    jobs = []
+    cached: List[str] = []
+    missing: List[str] = []
+    not_submitted: List[str] = []
+    # Job being written for each model
+    open_jobs: Dict[str, Dict[str, Any]] = {}
+    
+    def close_job(job: Dict[str, Any]) -> None:
+        if BATCH_INFERENCE_ROLE_ARN and len(job['records']) < BATCH_MIN_RECORDS:
+            print(f"Not submitting {len(job['contracts'])} contracts for {job['model_id']}: "
+                  f"{len(job['records'])} records, Bedrock needs at least {BATCH_MIN_RECORDS} per job")
+            not_submitted.extend(job['contracts'])
+            job['input'].close()
+        else:
+            jobs.append(submit_job(job))
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(BATCH_CONCURRENCY, len(contract_ids)))) as executor:
+        for offset in range(0, len(contract_ids), BATCH_CONCURRENCY):
+            batch = contract_ids[offset:offset + BATCH_CONCURRENCY]
+            analyses: Dict[str, Dict[str, Any]] = {}
+            for contract_id, text in zip(batch, executor.map(read_contract_text, batch)):
+                if text is None:
+                    missing.append(contract_id)
+                    continue
+                sections = contract_sections(text)
+                route = route_model(text, sections)
+                cache_key = analysis_cache_key(text, route['model_id']) if ANALYSIS_CACHE_ENABLED else None
+                analysis = get_cached_analysis(cache_key) if cache_key and read_cache else None
+                if analysis is not None:
+                    analyses[contract_id] = analysis
+                    continue
+                
+                prompts = analysis_prompts(text, sections)
+                size = sum(len(prompt) for _, prompt in prompts)
+                job = open_jobs.get(route['model_id'])
+                if job and job['records'] and (
+                        len(job['records']) + len(prompts) > BATCH_MAX_RECORDS
+                        or job['input'].tell() + size > BATCH_MAX_INPUT_MB * 1024 * 1024):
+                    close_job(open_jobs.pop(route['model_id']))
+                    job = None
+                if job is None:
+                    job = open_jobs[route['model_id']] = new_job(route['model_id'])
+                add_contract(job, contract_id, prompts, cache_key, route)
+            if analyses:
+                save_analyses(analyses)
+                cached.extend(analyses)
+    for job in open_jobs.values():
+        close_job(job)
+    
+    return {
+        'jobs': jobs,
+        'cached': sorted(cached),
+        'missing': missing,
+        'not_submitted': not_submitted
+    }
+
+
+def read_contract_text(contract_id: str) -> Optional[str]:
+    """Extracted text of a contract, None if it cannot be read."""
+    try:
+        response = s3_client.get_object(
+            Bucket=TEXTRACT_BUCKET,
+            Key=f"extracted-text/{contract_id}/text.txt"
+        )
+        return response['Body'].read().decode('utf-8')
+    except Exception as e:
+        print(f"Could not fetch text of contract {contract_id} from S3: {e}")
+        return None
+
+
+def new_job(model_id: str) -> Dict[str, Any]:
+    """
+    Job of model_id to add contracts to (see add_contract), its input
+    records written to a temporary file until submit_job uploads them.
+    """
+    return {
+        'job_name': f"contract-backlog-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{os.urandom(3).hex()}",
+        'model_id': model_id,
+        'input': tempfile.TemporaryFile(),
+        'records': {},
+        'contracts': {}
+    }
+
+
+def add_contract(job: Dict[str, Any], contract_id: str, prompts: List[Tuple[str, str]],
+                 cache_key: Optional[str], route: Dict[str, Any]) -> None:
+    """Write the (part id, prompt) tuples of a contract as input records of a job."""
+    # Record ids are 11 alphanumeric characters, as Bedrock expects; the
+    # manifest maps them back to contract parts
+    for part_id, prompt in prompts:
+        record_id = f"{len(job['records']):011d}"
+        job['records'][record_id] = [contract_id, part_id]
+        job['input'].write(json.dumps({
+            'recordId': record_id,
+            'modelInput': {
+                'anthropic_version': 'bedrock-2023-05-31',
+                'max_tokens': BATCH_MAX_TOKENS,
+                'messages': [{'role': 'user', 'content': prompt}]
+            }
+        }).encode('utf-8') + b'\n')
+    job['contracts'][contract_id] = {
+        'cache_key': cache_key,
+        'model_routing': route,
+        'parts': len(prompts)
+    }
+
+
+def submit_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Upload the input records of a job (see new_job), submit it and write
+    its manifest.
+    
+    Without BATCH_INFERENCE_ROLE_ARN, the job is not submitted and waits for
+    replay_job.
+    
+    Returns:
+        Job name, ARN (None for local jobs), contracts and records
+    """
+    job_name = job['job_name']
+    model_id = job['model_id']
+    contracts = job['contracts']
+    records = job['records']
+    input_key = f"{BATCH_INFERENCE_PREFIX}/{job_name}/input.jsonl"
+    output_prefix = f"{BATCH_INFERENCE_PREFIX}/{job_name}/output/"
+    
+    with job['input'] as input_file:
+        input_file.seek(0)
+        s3_client.upload_fileobj(
+            input_file,
+            TEXTRACT_BUCKET,
+            input_key,
+            ExtraArgs={'ContentType': 'application/jsonl'}
+        )
+    
+    job_arn = None
+    if BATCH_INFERENCE_ROLE_ARN:
+        response = bedrock.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=BATCH_INFERENCE_ROLE_ARN,
+            modelId=model_id,
+            inputDataConfig={'s3InputDataConfig': {
+                's3Uri': f"s3://{TEXTRACT_BUCKET}/{input_key}",
+                's3InputFormat': 'JSONL'
+            }},
+            outputDataConfig={'s3OutputDataConfig': {
+                's3Uri': f"s3://{TEXTRACT_BUCKET}/{output_prefix}"
+            }},
+            timeoutDurationInHours=BATCH_JOB_TIMEOUT_HOURS
+        )
+        job_arn = response['jobArn']
+    else:
+        print(f"No BATCH_INFERENCE_ROLE_ARN, job {job_name} kept local for replay")
+    
+    manifest = {
+        'job_name': job_name,
+        'job_arn': job_arn,
+        'model_id': model_id,
+        'status': 'Submitted' if job_arn else 'Local',
+        'created_at': datetime.utcnow().isoformat(),
+        'input_key': input_key,
+        'output_prefix': output_prefix,
+        'records': records,
+        'contracts': contracts
+    }
+    put_manifest(manifest)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(BATCH_CONCURRENCY, len(contracts)))) as executor:
+        list(executor.map(mark_queued, contracts))
+    
+    print(f"Submitted job {job_name} of {model_id}: {len(contracts)} contracts, {len(records)} records")
+    tier = next(iter(contracts.values()))['model_routing']['tier']
+    emit_metric('BatchRecordsSubmitted', len(records), dimensions={'ModelTier': tier})
+    return {
+        'job_name': job_name,
+        'job_arn': job_arn,
+        'model_id': model_id,
+        'contracts': len(contracts),
+        'records': len(records)
+    }
+
+
+def mark_queued(contract_id: str) -> None:
+    """Set a contract 'batch_queued'; failures are logged, not raised."""
+    try:
+        set_contract_status(contract_id, 'batch_queued')
+    except Exception as e:
+        print(f"Failed to update status of contract {contract_id}: {e}")
+
+
+def poll_jobs() -> Dict[str, Any]:
+    """
+    Check the jobs not collected yet and collect the finished ones.
+    
+    Jobs that did not complete (failed, stopped, expired) are collected too:
+    their contracts with output are saved, the others marked 'failed'.
+    
+    Returns:
+        Status of each open job, and the collection results of the finished ones
+    """
+    statuses = {}
+    collected = []
+    for manifest in open_manifests():
+        if not manifest.get('job_arn'):
+            statuses[manifest['job_name']] = manifest['status']
+            continue
+        
+        job = bedrock.get_model_invocation_job(jobIdentifier=manifest['job_arn'])
+        status = job['status']
+        statuses[manifest['job_name']] = status
+        if status not in FINISHED_JOB_STATUSES:
+            if status != manifest['status']:
+                manifest['status'] = status
+                put_manifest(manifest)
+            continue
+        
+        manifest['status'] = status
+        if job.get('message'):
+            manifest['message'] = job['message']
+        collected.append(collect_job(manifest, iter_output_records(manifest['output_prefix'])))
+    
+    return {'jobs': statuses, 'collected': collected}
+
+
+def replay_job(job_name: str, output_key: Optional[str] = None,
+               output_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Collect a job from canned output records instead of its Bedrock output,
+    to test the collection without running a job (see submit_job).
+    
+    Args:
+        job_name: Job whose manifest maps the records
+        output_key: S3 key in TEXTRACT_BUCKET of the JSONL output records
+        output_path: Local JSONL file of output records, if no output_key
+    """
+    manifest = get_manifest(job_name)
+    if output_key:
+        response = s3_client.get_object(Bucket=TEXTRACT_BUCKET, Key=output_key)
+        lines = response['Body'].read().decode('utf-8').splitlines()
+    else:
+        with open(output_path, encoding='utf-8') as output_file:
+            lines = output_file.read().splitlines()
+    manifest['status'] = 'Replayed'
+    return collect_job(manifest, parse_output_lines(lines))
+
+
+def iter_output_records(output_prefix: str) -> Iterable[Dict[str, Any]]:
+    """Output records Bedrock wrote under output_prefix ({job id}/input.jsonl.out)."""
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=TEXTRACT_BUCKET, Prefix=output_prefix):
+        for item in page.get('Contents', []):
+            if not item['Key'].endswith('.jsonl.out'):
+                continue
+            response = s3_client.get_object(Bucket=TEXTRACT_BUCKET, Key=item['Key'])
+            yield from parse_output_lines(response['Body'].read().decode('utf-8').splitlines())
+
+
+def parse_output_lines(lines: Iterable[str]) -> Iterable[Dict[str, Any]]:
+    """Output records of JSONL lines, skipping blank and invalid lines."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            print(f"Invalid batch output record: {e}")
+
+
+def collect_job(manifest: Dict[str, Any], records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Save the analyses of the output records of a job and close its manifest.
+    
+    The replies of each contract are parsed like on-demand replies, and the
+    analyses of contracts sent as several prompts merged. Contracts with no
+    successful record are marked 'failed'.
+    
+    Returns:
+        Contracts saved and failed, and records failed or cut short
+    """
+    start = time.time()
+    # Replies of each contract, as (record id, text) tuples
+    replies: Dict[str, List[Tuple[str, str]]] = {contract_id: [] for contract_id in manifest['contracts']}
+    failed_records = 0
+    truncated_records = 0
+    for record in records:
+        record_id = record.get('recordId')
+        if record_id not in manifest['records']:
+            continue
+        contract_id, part_id = manifest['records'][record_id]
+        output = record.get('modelOutput')
+        content = output.get('content', []) if isinstance(output, dict) else []
+        text = content[0].get('text', '') if content else ''
+        if not text:
+            failed_records += 1
+            print(f"Record {part_id} of contract {contract_id} failed: {record.get('error')}")
+            continue
+        if output.get('stop_reason') == 'max_tokens':
+            truncated_records += 1
+        replies[contract_id].append((record_id, text))
+    
+    analyses = {}
+    failed = []
+    for contract_id, parts in replies.items():
+        contract = manifest['contracts'][contract_id]
+        analysis = combine_replies(parts, contract['parts'], manifest['job_name'])
+        if analysis is None:
+            failed.append(contract_id)
+        else:
+            analysis['model_routing'] = contract['model_routing']
+            analyses[contract_id] = analysis
+    
+    save_analyses(analyses, {
+        contract_id: manifest['contracts'][contract_id]['cache_key'] for contract_id in analyses
+    }, manifest['model_id'])
+    if failed:
+        with ThreadPoolExecutor(max_workers=max(1, min(BATCH_CONCURRENCY, len(failed)))) as executor:
+            list(executor.map(mark_failed, failed))
+    
+    manifest['collected_at'] = datetime.utcnow().isoformat()
+    manifest['results'] = {
+        'contracts_saved': len(analyses),
+        'contracts_failed': len(failed),
+        'records_failed': failed_records,
+        'records_truncated': truncated_records,
+        'seconds': round(time.time() - start, 2)
+    }
+    put_manifest(manifest)
+    print(f"Collected job {manifest['job_name']} ({manifest['status']}): {json.dumps(manifest['results'])}")
+    emit_metric('BatchContractsSaved', len(analyses))
+    emit_metric('BatchContractsFailed', len(failed))
+    emit_metric('BatchRecordsTruncated', truncated_records)
+    return {'job_name': manifest['job_name'], **manifest['results']}
+
+
+def combine_replies(replies: List[Tuple[str, str]], expected: int, job_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Analysis of a contract from the replies to its prompts, None if it has
+    none. Replies that cannot be parsed count as failed prompts when the
+    contract was sent as several prompts, and are not merged.
+    
+    Args:
+        replies: (record id, reply text) tuples
+        expected: Number of prompts the contract was sent as
+        job_name: Job of the replies, recorded in the analysis
+    """
+    if not replies:
+        return None
+    analyses = [parse_analysis_response(text) for _, text in sorted(replies)]
+    if expected > 1:
+        analyses = [analysis for analysis in analyses if not failed_analysis(analysis)]
+        if not analyses:
+            return None
+    analysis = analyses[0] if expected == 1 else merge_chunk_analyses(analyses)
+    analysis['batch_inference'] = {
+        'job_name': job_name,
+        'prompts': expected,
+        'prompts_failed': expected - len(analyses)
+    }
+    return analysis
+
+
+def save_analyses(analyses: Dict[str, Dict[str, Any]],
+                  cache_keys: Optional[Dict[str, Optional[str]]] = None,
+                  model_id: str = BEDROCK_MODEL_ID) -> None:
+    """
+    Save the analyses of contracts, BATCH_CONCURRENCY contracts at a time:
+    clauses and status (see persist_analysis), analysis cache entry (for
+    the cache_keys given, analyses of model_id, unless some of their prompts
+    failed) and risk scoring.
+    """
+    def save(contract_id: str) -> None:
+        analysis = analyses[contract_id]
+        try:
+            persist_analysis(contract_id, analysis)
+        except Exception as e:
+            print(f"Failed to save analysis of contract {contract_id}: {e}")
+            return
+        cache_key = (cache_keys or {}).get(contract_id)
+        if cache_key and cacheable_analysis(analysis):
+            put_cached_analysis(cache_key, analysis, model_id)
+        trigger_risk_scoring(contract_id, analysis)
+    
+    if analyses:
+        with ThreadPoolExecutor(max_workers=max(1, min(BATCH_CONCURRENCY, len(analyses)))) as executor:
+            list(executor.map(save, analyses))
+
+
+def mark_failed(contract_id: str) -> None:
+    """Set a contract 'failed'; failures are logged, not raised."""
+    try:
+        set_contract_status(contract_id, 'failed')
+    except Exception as e:
+        print(f"Failed to update status of contract {contract_id}: {e}")
+
+
+def open_manifests() -> List[Dict[str, Any]]:
+    """Manifests of the jobs not collected yet."""
+    manifests = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=TEXTRACT_BUCKET, Prefix=f"{BATCH_INFERENCE_PREFIX}/jobs/open/"):
+        for item in page.get('Contents', []):
+            response = s3_client.get_object(Bucket=TEXTRACT_BUCKET, Key=item['Key'])
+            manifests.append(json.loads(response['Body'].read()))
+    return manifests
+
+
+def get_manifest(job_name: str) -> Dict[str, Any]:
+    """Manifest of a job not collected yet."""
+    response = s3_client.get_object(Bucket=TEXTRACT_BUCKET, Key=manifest_key(job_name, 'open'))
+    return json.loads(response['Body'].read())
+
+
+def put_manifest(manifest: Dict[str, Any]) -> None:
+    """
+    Store the manifest of a job under jobs/open/, or under jobs/collected/
+    once collected, so that polls only read the open ones.
+    """
+    collected = bool(manifest.get('collected_at'))
+    s3_client.put_object(
+        Bucket=TEXTRACT_BUCKET,
+        Key=manifest_key(manifest['job_name'], 'collected' if collected else 'open'),
+        Body=json.dumps(manifest).encode('utf-8'),
+        ContentType='application/json'
+    )
+    if collected:
+        s3_client.delete_object(Bucket=TEXTRACT_BUCKET, Key=manifest_key(manifest['job_name'], 'open'))
+
+
+def manifest_key(job_name: str, state: str) -> str:
+    """S3 key of the manifest of a job in state 'open' or 'collected'."""
+    return f"{BATCH_INFERENCE_PREFIX}/jobs/{state}/{job_name}.json"
@@ -2,15 +2,34 @@
 Lambda function to analyze contracts using AWS Bedrock (Claude 3).
 Extracts clauses, identifies risks, and generates summaries.
 """
+import functools
+import hashlib
 import json
 import boto3
 import os
-from datetime import datetime
-from typing import Dict, Any, List
+import random
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ConnectionError as BotoConnectionError, ReadTimeoutError
+
+from model_json import ClauseStreamParser, repair_json
+from model_router import DEFAULT_FAST_MODEL_ID, load_rules, load_tiers, route_contract
+from rate_limiter import DynamoDBRateLimiter, LocalRateLimiter, RateLimiter, RateLimitTimeout
+from section_segmenter import SECTION_TYPES, segment_sections, section_outline
 
 bedrock_runtime = boto3.client('bedrock-runtime', region_name='us-east-1')
 s3_client = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
+# Unlike resources, clients can be shared by the threads processing the
+# records and writing their clauses
+dynamodb_client = boto3.client('dynamodb')
+dynamodb_serializer = TypeSerializer()
 lambda_client = boto3.client('lambda')
 
 # Environment variables
@@ -18,101 +37,584 @@ TEXTRACT_BUCKET = os.environ.get('TEXTRACT_BUCKET_NAME', 'contract-textract-resu
 BEDROCK_MODEL_ID = os.environ.get('BEDROCK_MODEL_ID', 'anthropic.claude-3-sonnet-20240229-v1:0')
 CONTRACTS_TABLE = os.environ.get('CONTRACTS_TABLE', 'contracts')
 CLAUSES_TABLE = os.environ.get('CLAUSES_TABLE', 'clauses')
+# Contracts longer than one chunk are analyzed chunk by chunk (map) and the
+# results merged (reduce), instead of being truncated to the first 50k chars
+MAP_REDUCE_ENABLED = os.environ.get('MAP_REDUCE_ENABLED', 'true').lower() == 'true'
+CHUNK_SIZE_CHARS = int(os.environ.get('CHUNK_SIZE_CHARS', '60000'))
+CHUNK_OVERLAP_CHARS = int(os.environ.get('CHUNK_OVERLAP_CHARS', '2000'))
+# Chunks analyzed at the same time; a 200-page contract is about 10 chunks
+MAX_CONCURRENT_CHUNKS = int(os.environ.get('MAX_CONCURRENT_CHUNKS', '10'))
+# Send each analysis question only the sections relevant to it, in parallel,
+# instead of sending the whole contract with all the questions
+SECTION_ROUTING_ENABLED = os.environ.get('SECTION_ROUTING_ENABLED', 'true').lower() == 'true'
+# Below this many headings the text is not structured enough to be routed
+SECTION_ROUTING_MIN_SECTIONS = int(os.environ.get('SECTION_ROUTING_MIN_SECTIONS', '4'))
+# The overview question gets the start of each section of no clause type
+# (definitions, scope of work, exhibits); 0 sends them whole
+OVERVIEW_SECTION_CHARS = int(os.environ.get('OVERVIEW_SECTION_CHARS', '1500'))
+# Analyses are cached in TEXTRACT_BUCKET under ANALYSIS_CACHE_PREFIX, keyed by
+# model, prompt template hash and normalized text hash
+ANALYSIS_CACHE_ENABLED = os.environ.get('ANALYSIS_CACHE_ENABLED', 'true').lower() == 'true'
+ANALYSIS_CACHE_PREFIX = os.environ.get('ANALYSIS_CACHE_PREFIX', 'analysis-cache')
+# Older entries are ignored (the bucket lifecycle rule deletes them)
+ANALYSIS_CACHE_TTL_DAYS = int(os.environ.get('ANALYSIS_CACHE_TTL_DAYS', '30'))
+# Bump to invalidate every cached analysis without changing the prompts
+ANALYSIS_CACHE_VERSION = os.environ.get('ANALYSIS_CACHE_VERSION', '1')
+# CloudWatch namespace of the metrics logged in embedded metric format
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ContractAI')
+# SQS records of a batch processed at the same time
+RECORD_CONCURRENCY = int(os.environ.get('RECORD_CONCURRENCY', '5'))
+# Records are only started with at least this fraction of the invocation
+# time left (the first one always is); the others are returned as failures,
+# for SQS to redeliver them
+RECORD_START_MIN_FRACTION = float(os.environ.get('RECORD_START_MIN_FRACTION', '0.2'))
+# Stream the model responses and save each clause as soon as it is complete,
+# the contract being 'partially_analyzed' until the analysis is done
+STREAMING_ENABLED = os.environ.get('STREAMING_ENABLED', 'true').lower() == 'true'
+# Follow-up requests completing a reply cut at max_tokens
+MAX_CONTINUATIONS = int(os.environ.get('MAX_CONTINUATIONS', '2'))
+# Bedrock calls are rate limited to the account quotas of the model, through
+# a token bucket item shared by all invocations in RATE_LIMIT_TABLE (or one
+# bucket per process when it is not set)
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_TABLE = os.environ.get('RATE_LIMIT_TABLE', '')
+BEDROCK_TOKENS_PER_MINUTE = int(os.environ.get('BEDROCK_TOKENS_PER_MINUTE', '200000'))
+BEDROCK_REQUESTS_PER_MINUTE = int(os.environ.get('BEDROCK_REQUESTS_PER_MINUTE', '100'))
+# Longest wait for quota before calling Bedrock anyway
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.environ.get('RATE_LIMIT_MAX_WAIT_SECONDS', '120'))
+# Route each contract to a model tier by size, section count and guessed
+# type: the fast tier for short or standard contracts, the large tier
+# (BEDROCK_MODEL_ID) for long or complex ones (see model_router)
+MODEL_ROUTING_ENABLED = os.environ.get('MODEL_ROUTING_ENABLED', 'true').lower() == 'true'
+# JSON tier settings merged into the defaults, e.g. {"fast": {"model_id": "...",
+# "tokens_per_minute": 400000}}; quotas default to the BEDROCK_* ones
+MODEL_TIERS = load_tiers(os.environ.get('MODEL_TIERS', ''), {
+    'fast': {'model_id': DEFAULT_FAST_MODEL_ID},
+    'large': {'model_id': BEDROCK_MODEL_ID}
+})
+# JSON list of routing rules replacing model_router.DEFAULT_ROUTING_RULES
+MODEL_ROUTING_RULES = load_rules(os.environ.get('MODEL_ROUTING_RULES', ''), MODEL_TIERS)
+# Clause batches written to DynamoDB at the same time
+PERSIST_CONCURRENCY = int(os.environ.get('PERSIST_CONCURRENCY', '4'))
+# Attempts at writing a batch while DynamoDB returns unprocessed items
+BATCH_WRITE_MAX_ATTEMPTS = int(os.environ.get('BATCH_WRITE_MAX_ATTEMPTS', '8'))
+
+# Tier of the contracts when routing is off or no rule matches
+DEFAULT_MODEL_TIER = 'large'
+# Output tokens of each model request
+MAX_OUTPUT_TOKENS = 4000
+# Bump when a change to the analysis that the prompt templates and settings
+# hashed by analysis_prompt_hash do not show (response parsing, merging,
+# section segmentation) should invalidate the cached analyses
+ANALYSIS_PROMPT_VERSION = 1
+# Fraction of the invocation time kept for a model call and saving its
+# results: a wait for Bedrock quota that would end later than this before
+# the invocation timeout fails the record instead
+MODEL_CALL_RESERVE_FRACTION = 0.15
+# Bedrock error codes of throttling and transient failures: the record is
+# failed and redelivered instead of saving an incomplete analysis
+RETRYABLE_BEDROCK_ERRORS = {
+    'ThrottlingException', 'ServiceUnavailableException', 'InternalServerException',
+    'ModelTimeoutException', 'ModelNotReadyException', 'ModelStreamErrorException'
+}
+# Rough size of a token of contract text, to estimate input tokens
+CHARS_PER_TOKEN = 4
+# Most items in one BatchWriteItem request (DynamoDB limit)
+DYNAMODB_BATCH_SIZE = 25
+# Exponential backoff between batch write attempts, with full jitter
+BATCH_WRITE_BASE_BACKOFF_SECONDS = 0.05
+BATCH_WRITE_MAX_BACKOFF_SECONDS = 2.0
+
+# Places where a chunk can end, from best to worst: before a section
+# heading, at a blank line, at a line break
+HEADING_BOUNDARY_PATTERN = re.compile(
+    r'\n(?=[ \t]*(?:(?:ARTICLE|SECTION|SCHEDULE|EXHIBIT|ANNEX)\b'
+    r'|(?:Article|Section|Schedule|Exhibit|Annex)\s+[\dIVXLC]'
+    r'|\d{1,3}(?:\.\d{1,3})*\.?[ \t]+[A-Z]))'
+)
+PARAGRAPH_BOUNDARY_PATTERN = re.compile(r'\n[ \t]*\n')
+LINE_BOUNDARY_PATTERN = re.compile(r'\n')
+# Answers meaning "nothing in this part", dropped when merging chunk results
+EMPTY_ANSWERS = {'', 'n/a', 'na', 'none', 'null', 'not specified', 'not mentioned',
+                 'not found', 'not applicable', 'not provided', 'unknown', '...'}
+
+# Analysis questions answered from the sections of one clause type, the
+# sections of no type going to the overview question (see analyze_contract_by_section)
+SECTION_QUESTIONS = {
+    'payment': {
+        'topic': 'payment',
+        'task': '**Payment Terms**: Identify payment amounts, schedules, penalties',
+        'format': '"payment_terms": {"amount": "...", "schedule": "...", "penalties": "..."}'
+    },
+    'liability': {
+        'topic': 'liability',
+        'task': '**Liability**: Identify liability limitations, indemnification clauses',
+        'format': '"liability": "description of liability terms"'
+    },
+    'confidentiality': {
+        'topic': 'confidentiality',
+        'task': '**Confidentiality**: Extract confidentiality and NDA terms',
+        'format': '"confidentiality": "description of confidentiality terms"'
+    },
+    'termination': {
+        'topic': 'termination',
+        'task': '**Termination Conditions**: Identify termination clauses and conditions',
+        'format': '"termination": "description of termination conditions"'
+    }
+}
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Analyze contract text using Bedrock LLM.
     
+    The SQS records of the batch are processed concurrently, at most
+    RECORD_CONCURRENCY at a time, and records other than the first are no
+    longer started once less than RECORD_START_MIN_FRACTION of the time the
+    invocation had remains. The records
+    that failed or were not started are returned as batchItemFailures, so
+    that SQS only redelivers those.
+    
     Args:
         event: SQS event containing contract text location
         context: Lambda context
         
     Returns:
-        Analysis results
+        Analysis results, with the message ids of the failed records
     """
-    try:
-        # Parse SQS event
-        records = event.get('Records', [])
-        if not records:
-            return {'statusCode': 400, 'body': 'No records found'}
-        
-        for record in records:
-            # Parse SQS message body (may be string or already parsed)
-            body = record.get('body', '{}')
-            if isinstance(body, str):
-                try:
-                    # Strip BOM (Byte Order Mark) if present
-                    if body.startswith('\ufeff'):
-                        body = body[1:]
-                    # Also handle UTF-8 BOM bytes
-                    if body.startswith('\xef\xbb\xbf'):
-                        body = body[3:]
-                    message_body = json.loads(body)
-                except json.JSONDecodeError as e:
-                    print(f"Failed to parse message body: {e}")
-                    print(f"Body content: {body[:200]}")
-                    continue
-            else:
-                message_body = body
-            
-            contract_id = message_body.get('contract_id')
-            textract_text = message_body.get('extracted_text', '')
-            
-            if not textract_text:
-                # Fetch from S3 if not in message
-                text_key = f"extracted-text/{contract_id}/text.txt"
-                try:
-                    response = s3_client.get_object(
-                        Bucket=TEXTRACT_BUCKET,
-                        Key=text_key
-                    )
-                    textract_text = response['Body'].read().decode('utf-8')
-                except Exception as e:
-                    print(f"Could not fetch text from S3: {e}")
-                    continue
-            
-            # Analyze with Bedrock
-            analysis = analyze_contract_with_bedrock(textract_text)
-            
-            # Save results to DynamoDB
-            save_analysis_results(contract_id, analysis)
-            
-            # Update contract status
-            update_contract_status(contract_id, 'analyzed', analysis)
-            
-            # Trigger risk scoring (async)
-            try:
-                trigger_risk_scoring(contract_id, analysis)
-            except Exception as e:
-                print(f"Failed to trigger risk scoring: {e}")
-            
-            print(f"Analysis completed for contract {contract_id}")
-        
+    # Parse SQS event
+    records = event.get('Records', [])
+    if not records:
+        return {'statusCode': 400, 'body': 'No records found'}
+    
+    # Time by which the invocation is stopped, as time.time(), and the time
+    # it has, whatever its timeout
+    deadline = budget = None
+    if context:
+        budget = context.get_remaining_time_in_millis() / 1000
+        deadline = time.time() + budget
+    process = functools.partial(process_record_safely, deadline=deadline, budget=budget)
+    with ThreadPoolExecutor(max_workers=max(1, min(RECORD_CONCURRENCY, len(records)))) as executor:
+        errors = list(executor.map(process, records, [index == 0 for index in range(len(records))]))
+    
+    failures = [
+        {'itemIdentifier': record.get('messageId')}
+        for record, error in zip(records, errors) if error is not None
+    ]
+    if failures:
+        print(f"{len(failures)} of {len(records)} records failed")
         return {
-            'statusCode': 200,
-            'body': json.dumps({'message': 'Analysis completed'})
+            'statusCode': 500,
+            'body': json.dumps({'error': next(error for error in errors if error is not None)}),
+            'batchItemFailures': failures
         }
+    return {
+        'statusCode': 200,
+        'body': json.dumps({'message': 'Analysis completed'}),
+        'batchItemFailures': []
+    }
+
+
+def process_record_safely(record: Dict[str, Any], first: bool = True,
+                          deadline: Optional[float] = None,
+                          budget: Optional[float] = None) -> Optional[str]:
+    """
+    Process one SQS record; return the error message if it failed or was
+    not started before the deadline of the invocation, else None.
+    
+    Args:
+        record: SQS record
+        first: Whether it is the first record of the batch, always started
+        deadline: Time by which the invocation is stopped, as time.time()
+        budget: Seconds the invocation had, of which RECORD_START_MIN_FRACTION
+            must be left to start the record
+    """
+    if deadline is not None and budget is not None:
+        left = deadline - time.time()
+        if not first and left < RECORD_START_MIN_FRACTION * budget:
+            print(f"Not starting message {record.get('messageId')}: {left:.0f} of {budget:.0f} s left")
+            return 'Not started before the invocation timeout'
+        # Model calls keep a fraction of the invocation time for themselves
+        deadline -= MODEL_CALL_RESERVE_FRACTION * budget
+    try:
+        process_record(record, deadline)
+        return None
+    except Exception as e:
+        print(f"Error in bedrock analyzer for message {record.get('messageId')}: {str(e)}")
+        return str(e)
+
+
+def process_record(record: Dict[str, Any], deadline: Optional[float] = None) -> None:
+    """
+    Analyze the contract of one SQS record and save the results.
+    
+    Messages that cannot be parsed, or whose text cannot be found, are
+    logged and dropped since retrying them would not help. Waits for
+    Bedrock quota that would end after deadline (the invocation timeout
+    less MODEL_CALL_RESERVE_FRACTION of it) raise RateLimitTimeout.
+    """
+    # Parse SQS message body (may be string or already parsed)
+    body = record.get('body', '{}')
+    if isinstance(body, str):
+        try:
+            # Strip BOM (Byte Order Mark) if present
+            if body.startswith('\ufeff'):
+                body = body[1:]
+            # Also handle UTF-8 BOM bytes
+            if body.startswith('\xef\xbb\xbf'):
+                body = body[3:]
+            message_body = json.loads(body)
+        except json.JSONDecodeError as e:
+            print(f"Failed to parse message body: {e}")
+            print(f"Body content: {body[:200]}")
+            return
+    else:
+        message_body = body
+    
+    contract_id = message_body.get('contract_id')
+    textract_text = message_body.get('extracted_text', '')
+    
+    if not textract_text:
+        # Fetch from S3 if not in message
+        text_key = f"extracted-text/{contract_id}/text.txt"
+        try:
+            response = s3_client.get_object(
+                Bucket=TEXTRACT_BUCKET,
+                Key=text_key
+            )
+            textract_text = response['Body'].read().decode('utf-8')
+        except Exception as e:
+            print(f"Could not fetch text from S3: {e}")
+            return
+    
+    # Analyze with Bedrock (or reuse the analysis of the same text), saving
+    # clauses as they are streamed
+    streamed_clause_ids: Set[str] = set()
+    on_clause = functools.partial(save_streamed_clause, contract_id, streamed_clause_ids)
+    analysis = analyze_contract_cached(
+        textract_text,
+        read_cache=not message_body.get('skip_cache'),
+        on_clause=on_clause if STREAMING_ENABLED else None,
+        deadline=deadline
+    )
+    
+    # Save results and contract status to DynamoDB
+    persist_analysis(contract_id, analysis, streamed_clause_ids)
+    
+    # Trigger risk scoring (async)
+    try:
+        trigger_risk_scoring(contract_id, analysis)
+    except Exception as e:
+        print(f"Failed to trigger risk scoring: {e}")
+    
+    print(f"Analysis completed for contract {contract_id}")
+
+
+def analyze_contract_cached(contract_text: str, read_cache: bool = True,
+                            on_clause: Optional[Callable[[Dict[str, Any]], None]] = None,
+                            deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Analyze a contract, reusing the cached analysis of the same text.
+    
+    SQS redeliveries, reanalyses and duplicate uploads of a contract have the
+    same text, so they are answered from the cache in milliseconds instead of
+    calling Bedrock again. Entries are keyed by model, prompt template hash
+    (see analysis_prompt_hash) and normalized text hash, so changing the
+    model or the prompts invalidates them. Failed analyses are not cached.
+    
+    The contract is analyzed by the model of the tier route_model picks.
+    
+    Args:
+        contract_text: Extracted text from Textract
+        read_cache: False to analyze again and overwrite the cached analysis
+        on_clause: Called with each clause as soon as the model streamed it
+            (not called on cache hits)
+        deadline: Latest time.time() at which a model call can start after
+            waiting for quota (see rate_limiter.RateLimitTimeout)
         
+    Returns:
+        Analysis results dictionary
+    """
+    sections = contract_sections(contract_text)
+    route = route_model(contract_text, sections)
+    if not ANALYSIS_CACHE_ENABLED:
+        return analyze_contract_routed(contract_text, route, on_clause, deadline, sections)
+    
+    start = time.time()
+    cache_key = analysis_cache_key(contract_text, route['model_id'])
+    if read_cache:
+        cached = get_cached_analysis(cache_key)
+        if cached is not None:
+            elapsed_ms = (time.time() - start) * 1000
+            print(f"Analysis cache hit {cache_key} in {elapsed_ms:.0f} ms")
+            emit_metric('AnalysisCacheHit', 1)
+            emit_metric('AnalysisCacheHitLatency', elapsed_ms, 'Milliseconds')
+            return cached
+    
+    emit_metric('AnalysisCacheMiss', 1)
+    analysis = analyze_contract_routed(contract_text, route, on_clause, deadline, sections)
+    if cacheable_analysis(analysis):
+        put_cached_analysis(cache_key, analysis, route['model_id'])
+    return analysis
+
+
+def cacheable_analysis(analysis: Dict[str, Any]) -> bool:
+    """
+    Whether an analysis can be cached: it did not fail, and neither did any
+    of its chunks or prompts, so that a retry is not served a partial result.
+    """
+    if failed_analysis(analysis):
+        return False
+    for part, failed in (('map_reduce', 'chunks_failed'), ('section_routing', 'prompts_failed'),
+                         ('batch_inference', 'prompts_failed')):
+        if analysis.get(part, {}).get(failed):
+            print(f"Not caching analysis with {analysis[part][failed]} {failed.replace('_', ' ')}")
+            return False
+    return True
+
+
+def contract_sections(contract_text: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Sections of a contract, segmented once for both route_model and
+    analysis_mode; None when neither MODEL_ROUTING_ENABLED nor
+    SECTION_ROUTING_ENABLED needs them.
+    """
+    if MODEL_ROUTING_ENABLED or SECTION_ROUTING_ENABLED:
+        return segment_sections(contract_text)
+    return None
+
+
+def route_model(contract_text: str,
+                sections: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Model tier of a contract, from the first of MODEL_ROUTING_RULES matching
+    its length, section headings and guessed type (DEFAULT_MODEL_TIER when
+    MODEL_ROUTING_ENABLED is off).
+    
+    Args:
+        contract_text: Extracted contract text
+        sections: Sections of the text from contract_sections, segmented
+            here if not given
+    
+    Returns:
+        Dict with 'tier', 'model_id', 'rule' (index of the matching rule)
+        and 'signals' the rules were matched against
+    """
+    if not MODEL_ROUTING_ENABLED:
+        route = {'tier': DEFAULT_MODEL_TIER, 'rule': None, 'signals': {}}
+    else:
+        if sections is None:
+            sections = segment_sections(contract_text)
+        headings = sum(1 for section in sections if section['heading'])
+        route = route_contract(contract_text, headings, MODEL_ROUTING_RULES, DEFAULT_MODEL_TIER)
+        emit_metric('ContractsRouted', 1, dimensions={'ModelTier': route['tier']})
+    route['model_id'] = MODEL_TIERS[route['tier']]['model_id']
+    print(f"Routed contract to the {route['tier']} tier ({route['model_id']}): {json.dumps(route['signals'])}")
+    return route
+
+
+def analyze_contract_routed(contract_text: str, route: Dict[str, Any],
+                            on_clause: Optional[Callable[[Dict[str, Any]], None]] = None,
+                            deadline: Optional[float] = None,
+                            sections: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Analyze a contract with the model tier of route (see route_model), recording its latency."""
+    start = time.time()
+    analysis = analyze_contract_with_bedrock(contract_text, on_clause, route['tier'], deadline, sections)
+    analysis['model_routing'] = route
+    emit_metric('AnalysisLatency', (time.time() - start) * 1000, 'Milliseconds', {'ModelTier': route['tier']})
+    return analysis
+
+
+def analysis_cache_key(contract_text: str, model_id: str = BEDROCK_MODEL_ID) -> str:
+    """S3 key of the cached analysis of a text: {prefix}/{model}/{prompt hash}/{text hash}.json"""
+    normalized = ' '.join(unicodedata.normalize('NFKC', contract_text).split())
+    text_hash = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+    return f"{ANALYSIS_CACHE_PREFIX}/{model_id}/{analysis_prompt_hash()[:16]}/{text_hash}.json"
+
+
+@functools.lru_cache(maxsize=None)
+def analysis_prompt_hash() -> str:
+    """
+    Hash of what shapes the analysis of a text: the prompt templates (the
+    prompts rendered with placeholders), the model request parameters, the
+    settings choosing and splitting the prompts, ANALYSIS_PROMPT_VERSION
+    and ANALYSIS_CACHE_VERSION. Edits to the code around the prompts keep
+    the cached analyses; see ANALYSIS_PROMPT_VERSION for other changes.
+    """
+    sources = [
+        contract_prompt('{contract_text}'),
+        chunk_prompt('{chunk}', 0, 2),
+        bedrock_request_body([{"role": "user", "content": '{prompt}'}], MAX_OUTPUT_TOKENS)
+    ]
+    sources.extend(
+        section_question_prompt(question, '{text}', 0, 2, '{outline}')
+        for question in [*SECTION_QUESTIONS, 'other']
+    )
+    sources.append(json.dumps([
+        ANALYSIS_PROMPT_VERSION, ANALYSIS_CACHE_VERSION, MAP_REDUCE_ENABLED, CHUNK_SIZE_CHARS,
+        CHUNK_OVERLAP_CHARS, SECTION_ROUTING_ENABLED, SECTION_ROUTING_MIN_SECTIONS,
+        OVERVIEW_SECTION_CHARS, MAX_CONTINUATIONS
+    ]))
+    return hashlib.sha256('\n'.join(sources).encode('utf-8')).hexdigest()
+
+
+def get_cached_analysis(cache_key: str) -> Optional[Dict[str, Any]]:
+    """Cached analysis stored under cache_key, None if missing or expired."""
+    try:
+        response = s3_client.get_object(Bucket=TEXTRACT_BUCKET, Key=cache_key)
     except Exception as e:
-        print(f"Error in bedrock analyzer: {str(e)}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
-        }
+        code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+        if code not in ('NoSuchKey', '404'):
+            print(f"Could not read analysis cache: {e}")
+        return None
+    
+    age = datetime.now(timezone.utc) - response['LastModified']
+    if age.days >= ANALYSIS_CACHE_TTL_DAYS:
+        print(f"Analysis cache entry {cache_key} expired ({age.days} days old)")
+        return None
+    try:
+        return json.loads(response['Body'].read())['analysis']
+    except (ValueError, KeyError) as e:
+        print(f"Invalid analysis cache entry {cache_key}: {e}")
+        return None
+
+
+def put_cached_analysis(cache_key: str, analysis: Dict[str, Any], model_id: str = BEDROCK_MODEL_ID) -> None:
+    """Store an analysis of model_id in the cache; failures are logged, not raised."""
+    try:
+        s3_client.put_object(
+            Bucket=TEXTRACT_BUCKET,
+            Key=cache_key,
+            Body=json.dumps({
+                'model_id': model_id,
+                'prompt_hash': analysis_prompt_hash(),
+                'created_at': datetime.utcnow().isoformat(),
+                'analysis': analysis
+            }, default=str).encode('utf-8'),
+            ContentType='application/json'
+        )
+    except Exception as e:
+        print(f"Could not write analysis cache: {e}")
+
+
+def emit_metric(name: str, value: float, unit: str = 'Count',
+                dimensions: Optional[Dict[str, str]] = None) -> None:
+    """
+    Log a CloudWatch metric in embedded metric format (no API call needed),
+    with the FunctionName dimension and the given ones (such as ModelTier).
+    """
+    values = {'FunctionName': os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'bedrock-analyzer')}
+    values.update(dimensions or {})
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [list(values)],
+                'Metrics': [{'Name': name, 'Unit': unit}]
+            }]
+        },
+        **values,
+        name: value
+    }))
 
 
-def analyze_contract_with_bedrock(contract_text: str) -> Dict[str, Any]:
+def analyze_contract_with_bedrock(contract_text: str,
+                                  on_clause: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                  tier: str = DEFAULT_MODEL_TIER,
+                                  deadline: Optional[float] = None,
+                                  sections: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
     """
     Use Bedrock Claude to analyze contract.
     
+    Contracts split into enough sections are analyzed with
+    analyze_contract_by_section when SECTION_ROUTING_ENABLED is set, and
+    other contracts longer than CHUNK_SIZE_CHARS with
+    analyze_contract_map_reduce when MAP_REDUCE_ENABLED is set.
+    
+    Throttling and transient Bedrock errors (see retryable_bedrock_error)
+    are raised, whichever part of the contract they hit; other errors are
+    returned as {'error': ...} or leave out the failed part.
+    
     Args:
         contract_text: Extracted text from Textract
+        on_clause: Called with each clause as soon as the model streamed it
+        tier: Model tier (a MODEL_TIERS key) to analyze it with
+        deadline: Latest time.time() at which a model call can start after
+            waiting for quota
+        sections: Sections of the text from contract_sections, segmented
+            here if not given
         
     Returns:
         Analysis results dictionary
     """
-    prompt = f"""You are an enterprise contract review assistant. Analyze the following contract text and extract:
+    mode, sections = analysis_mode(contract_text, sections)
+    if mode == 'sections':
+        return analyze_contract_by_section(contract_text, sections, on_clause, tier, deadline)
+    if mode == 'map_reduce':
+        return analyze_contract_map_reduce(contract_text, on_clause, tier, deadline)
+    
+    prompt = contract_prompt(contract_text)
+    
+    try:
+        analysis_text = invoke_bedrock(prompt, on_clause=on_clause, tier=tier, deadline=deadline)
+        if not analysis_text:
+            return {'error': 'No analysis generated'}
+        return parse_analysis_response(analysis_text)
+            
+    except Exception as e:
+        print(f"Bedrock API error: {e}")
+        if retryable_bedrock_error(e):
+            raise
+        return {'error': str(e)}
+
+
+def retryable_bedrock_error(error: Exception) -> bool:
+    """
+    Whether a Bedrock call failed on throttling or a transient error
+    (RETRYABLE_BEDROCK_ERRORS, connection errors, no quota before the
+    deadline), which are raised for the SQS record to be retried rather than
+    saved as the analysis.
+    """
+    if isinstance(error, (BotoConnectionError, ReadTimeoutError, RateLimitTimeout)):
+        return True
+    return getattr(error, 'response', {}).get('Error', {}).get('Code') in RETRYABLE_BEDROCK_ERRORS
+
+
+def analysis_mode(contract_text: str,
+                  sections: Optional[List[Dict[str, Any]]] = None) -> Any:
+    """
+    How analyze_contract_with_bedrock analyzes a text, from its sections
+    (from contract_sections, segmented here if not given).
+    
+    Returns:
+        (mode, sections) tuple, mode being 'sections' (with the sections of
+        the text), 'map_reduce' or 'single' (with None)
+    """
+    if SECTION_ROUTING_ENABLED:
+        if sections is None:
+            sections = segment_sections(contract_text)
+        headings = sum(1 for section in sections if section['heading'])
+        if headings >= SECTION_ROUTING_MIN_SECTIONS:
+            return 'sections', sections
+        print(f"Found {headings} section headings, analyzing the contract as a whole")
+    
+    if MAP_REDUCE_ENABLED and len(contract_text) > CHUNK_SIZE_CHARS:
+        return 'map_reduce', None
+    return 'single', None
+
+
+def contract_prompt(contract_text: str) -> str:
+    """
+    Prompt analyzing a whole contract in one request.
+    
+    The text is only cut when it is longer than CHUNK_SIZE_CHARS, which
+    only happens with MAP_REDUCE_ENABLED unset.
+    """
+    if len(contract_text) > CHUNK_SIZE_CHARS:
+        print(f"Analyzing the first {CHUNK_SIZE_CHARS} of {len(contract_text)} chars in one request")
+        contract_text = contract_text[:CHUNK_SIZE_CHARS]
+    return f"""You are an enterprise contract review assistant. Analyze the following contract text and extract:
 
 1. **Clauses List**: Extract all major clauses (payment terms, liability, confidentiality, termination, etc.)
 2. **Payment Terms**: Identify payment amounts, schedules, penalties
@@ -124,7 +626,7 @@ def analyze_contract_with_bedrock(contract_text: str) -> Dict[str, Any]:
 8. **Summary**: Provide a 2-3 sentence executive summary
 
 Contract Text:
-{contract_text[:50000]}  # Limit to 50k chars for Bedrock
+{contract_text}
 
 Respond in JSON format:
 {{
@@ -140,83 +642,726 @@ Respond in JSON format:
   "summary": "executive summary"
 }}
 """
+
+
+def analysis_prompts(contract_text: str,
+                     sections: Optional[List[Dict[str, Any]]] = None) -> List[Tuple[str, str]]:
+    """
+    Prompts analyze_contract_with_bedrock sends for a text, to send them
+    some other way (see batch_inference). The answers to several prompts
+    are merged with merge_chunk_analyses.
     
-    try:
-        response = bedrock_runtime.invoke_model(
-            modelId=BEDROCK_MODEL_ID,
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 4000,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            }),
-            contentType='application/json',
-            accept='application/json'
+    Args:
+        contract_text: Extracted contract text
+        sections: Sections of the text from contract_sections, segmented
+            here if not given
+    
+    Returns:
+        (part_id, prompt) tuples, part_id being unique within the text
+    """
+    mode, sections = analysis_mode(contract_text, sections)
+    if mode == 'sections':
+        outline = section_outline(sections)
+        return [
+            (f"{question}-{index + 1}", section_question_prompt(question, text, index, count, outline))
+            for question, text, index, count in section_tasks(sections)
+        ]
+    if mode == 'map_reduce':
+        chunks = split_into_chunks(contract_text)
+        return [
+            (f"chunk-{index + 1}", chunk_prompt(chunk, index, len(chunks)))
+            for index, chunk in enumerate(chunks)
+        ]
+    return [('contract', contract_prompt(contract_text))]
+
+
+def invoke_bedrock(prompt: str, max_tokens: int = MAX_OUTPUT_TOKENS,
+                   on_clause: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   tier: str = DEFAULT_MODEL_TIER, deadline: Optional[float] = None) -> str:
+    """
+    Send a single user message to the Bedrock model of a tier (a MODEL_TIERS
+    key) and return the reply text.
+    
+    With on_clause, the reply is streamed (see invoke_bedrock_stream). A
+    reply cut at max_tokens is completed by up to MAX_CONTINUATIONS
+    requests sending the partial reply back as the start of the assistant
+    message, so that the model only writes the rest of it.
+    
+    Calls wait for the quota of the tier (see rate_limiter_for), and raise
+    RateLimitTimeout rather than wait past deadline.
+    """
+    parser = ClauseStreamParser() if on_clause is not None else None
+    model_id = MODEL_TIERS[tier]['model_id']
+    limiter = rate_limiter_for(tier)
+    reply = ''
+    for continuation in range(MAX_CONTINUATIONS + 1):
+        messages = [{"role": "user", "content": prompt}]
+        if reply:
+            # Bedrock rejects an assistant message ending with whitespace
+            reply = reply.rstrip()
+            messages.append({"role": "assistant", "content": reply})
+        
+        # Quota is taken for the input and the most output tokens, and
+        # what the call did not use is given back afterwards
+        input_tokens = sum(len(message['content']) for message in messages) // CHARS_PER_TOKEN
+        reserved = input_tokens + max_tokens
+        if limiter is not None:
+            waited = limiter.acquire(reserved, deadline)
+            if waited:
+                print(f"Waited {waited:.1f} s for Bedrock quota")
+                emit_metric('RateLimitWait', waited * 1000, 'Milliseconds')
+        usage: Dict[str, int] = {}
+        start = time.time()
+        try:
+            if parser is not None:
+                text, stop_reason, usage = invoke_bedrock_stream(messages, max_tokens, parser, on_clause, model_id)
+            else:
+                text, stop_reason, usage = invoke_bedrock_once(messages, max_tokens, model_id)
+        finally:
+            if limiter is not None:
+                used = usage.get('input_tokens', input_tokens) + usage.get('output_tokens', 0)
+                if reserved > used:
+                    limiter.release(reserved - used)
+        record_model_call(tier, time.time() - start, usage)
+        reply += text
+        
+        if stop_reason != 'max_tokens' or not text:
+            break
+        if continuation < MAX_CONTINUATIONS:
+            print(f"Reply cut at {max_tokens} tokens, requesting continuation {continuation + 1}")
+            emit_metric('ModelContinuation', 1)
+    return reply
+
+
+def record_model_call(tier: str, seconds: float, usage: Dict[str, int]) -> None:
+    """Log the latency and token usage of a model call, per model tier."""
+    dimensions = {'ModelTier': tier}
+    emit_metric('ModelLatency', seconds * 1000, 'Milliseconds', dimensions)
+    emit_metric('ModelInputTokens', usage.get('input_tokens', 0), 'Count', dimensions)
+    emit_metric('ModelOutputTokens', usage.get('output_tokens', 0), 'Count', dimensions)
+
+
+def invoke_bedrock_once(messages: List[Dict[str, str]], max_tokens: int,
+                        model_id: str = BEDROCK_MODEL_ID) -> Any:
+    """
+    Send messages to a Bedrock model.
+    
+    Returns:
+        (text, stop_reason, usage) tuple of the reply, usage holding its
+        input_tokens and output_tokens
+    """
+    response = bedrock_runtime.invoke_model(
+        modelId=model_id,
+        body=bedrock_request_body(messages, max_tokens),
+        contentType='application/json',
+        accept='application/json'
+    )
+    
+    response_body = json.loads(response['body'].read())
+    content = response_body.get('content', [])
+    
+    text = content[0].get('text', '') if content else ''
+    return text, response_body.get('stop_reason'), response_body.get('usage', {})
+
+
+def invoke_bedrock_stream(messages: List[Dict[str, str]], max_tokens: int, parser: ClauseStreamParser,
+                          on_clause: Callable[[Dict[str, Any]], None], model_id: str = BEDROCK_MODEL_ID) -> Any:
+    """
+    Stream the reply of a Bedrock model to messages through parser,
+    calling on_clause with each object of its "clauses" array as soon as it
+    is complete.
+    
+    Returns:
+        (text, stop_reason, usage) tuple of the reply, usage holding its
+        input_tokens and output_tokens
+    """
+    response = bedrock_runtime.invoke_model_with_response_stream(
+        modelId=model_id,
+        body=bedrock_request_body(messages, max_tokens),
+        contentType='application/json',
+        accept='application/json'
+    )
+    
+    parts = []
+    stop_reason = None
+    usage: Dict[str, int] = {}
+    for event in response['body']:
+        chunk = event.get('chunk')
+        if not chunk:
+            continue
+        payload = json.loads(chunk['bytes'])
+        if payload.get('type') == 'message_start':
+            usage.update(payload.get('message', {}).get('usage', {}))
+        if payload.get('type') == 'message_delta':
+            stop_reason = payload.get('delta', {}).get('stop_reason', stop_reason)
+            usage.update(payload.get('usage', {}))
+        if payload.get('type') != 'content_block_delta':
+            continue
+        text = payload.get('delta', {}).get('text', '')
+        parts.append(text)
+        for clause in parser.feed(text):
+            on_clause(clause)
+    return ''.join(parts), stop_reason, usage
+
+
+@functools.lru_cache(maxsize=None)
+def rate_limiter_for(tier: str) -> Optional[RateLimiter]:
+    """
+    Rate limiter of the calls to the model of a tier, with the quotas of
+    the tier, None when RATE_LIMIT_ENABLED is off.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return None
+    settings = MODEL_TIERS[tier]
+    tokens_per_minute = int(settings.get('tokens_per_minute', BEDROCK_TOKENS_PER_MINUTE))
+    requests_per_minute = int(settings.get('requests_per_minute', BEDROCK_REQUESTS_PER_MINUTE))
+    if RATE_LIMIT_TABLE:
+        return DynamoDBRateLimiter(
+            boto3.client('dynamodb'), RATE_LIMIT_TABLE, f"bedrock#{settings['model_id']}",
+            tokens_per_minute, requests_per_minute, RATE_LIMIT_MAX_WAIT_SECONDS
         )
+    return LocalRateLimiter(tokens_per_minute, requests_per_minute, RATE_LIMIT_MAX_WAIT_SECONDS)
+
+
+def bedrock_request_body(messages: List[Dict[str, str]], max_tokens: int) -> str:
+    """Request body of messages for the Anthropic models on Bedrock."""
+    return json.dumps({
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "messages": messages
+    })
+
+
+def parse_analysis_response(analysis_text: str) -> Dict[str, Any]:
+    """
+    Parse the JSON analysis from a model reply (may be wrapped in markdown code blocks).
+    
+    Replies json.loads rejects (cut short, fenced in the middle, followed by
+    text) are repaired with repair_json, keeping every complete clause; what
+    was recovered is reported under 'parse_repair'.
+    """
+    try:
+        # Remove markdown code blocks if present
+        cleaned_text = analysis_text.strip()
+        if cleaned_text.startswith('```json'):
+            cleaned_text = cleaned_text[7:]  # Remove ```json
+        if cleaned_text.startswith('```'):
+            cleaned_text = cleaned_text[3:]   # Remove ```
+        if cleaned_text.endswith('```'):
+            cleaned_text = cleaned_text[:-3]  # Remove trailing ```
+        cleaned_text = cleaned_text.strip()
         
-        response_body = json.loads(response['body'].read())
-        content = response_body.get('content', [])
+        parsed = json.loads(cleaned_text)
+        print(f"Successfully parsed Bedrock response with {len(parsed.get('clauses', []))} clauses")
+        return parsed
+    except json.JSONDecodeError as e:
+        repaired, report = repair_json(analysis_text)
+        if isinstance(repaired, dict):
+            print(f"Repaired Bedrock response ({e}): {json.dumps(report)}")
+            emit_metric('ModelJsonRepaired', 1)
+            repaired['parse_repair'] = report
+            return repaired
         
-        if content and len(content) > 0:
-            analysis_text = content[0].get('text', '')
-            # Parse JSON from response (may be wrapped in markdown code blocks)
-            try:
-                # Remove markdown code blocks if present
-                cleaned_text = analysis_text.strip()
-                if cleaned_text.startswith('```json'):
-                    cleaned_text = cleaned_text[7:]  # Remove ```json
-                if cleaned_text.startswith('```'):
-                    cleaned_text = cleaned_text[3:]   # Remove ```
-                if cleaned_text.endswith('```'):
-                    cleaned_text = cleaned_text[:-3]  # Remove trailing ```
-                cleaned_text = cleaned_text.strip()
-                
-                parsed = json.loads(cleaned_text)
-                print(f"Successfully parsed Bedrock response with {len(parsed.get('clauses', []))} clauses")
-                return parsed
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse JSON: {e}")
-                print(f"Response text: {analysis_text[:200]}")
-                # Fallback: return structured response
-                return {
-                    'clauses': [],
-                    'summary': analysis_text[:500],
-                    'raw_analysis': analysis_text
-                }
-        else:
-            return {'error': 'No analysis generated'}
-            
+        print(f"Failed to parse JSON: {e}")
+        print(f"Response text: {analysis_text[:200]}")
+        # Fallback: return structured response
+        return {
+            'clauses': [],
+            'summary': analysis_text[:500],
+            'raw_analysis': analysis_text
+        }
+
+
+def analyze_contract_by_section(contract_text: str, sections: List[Dict[str, Any]],
+                                on_clause: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                tier: str = DEFAULT_MODEL_TIER,
+                                deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Analyze a contract question by question, each question being sent only
+    the sections classified as relevant to it.
+    
+    The payment, liability, confidentiality and termination questions get
+    the sections of their clause type; the overview question (other clauses,
+    risks, missing clauses, summary) gets the outline of the contract and the
+    first OVERVIEW_SECTION_CHARS of each section of no type. Questions
+    without sections are skipped. Section texts longer than CHUNK_SIZE_CHARS
+    are split into chunks, and all the prompts run concurrently (at most
+    MAX_CONCURRENT_CHUNKS at a time). The answers are merged like chunk
+    analyses.
+    
+    Args:
+        contract_text: Extracted text from Textract
+        sections: Sections of the text, from segment_sections
+        on_clause: Called with each clause as soon as the model streamed it
+        tier: Model tier (a MODEL_TIERS key) to analyze it with
+        deadline: Latest time.time() at which a model call can start after
+            waiting for quota
+        
+    Returns:
+        Analysis results dictionary
+    """
+    start = time.time()
+    outline = section_outline(sections)
+    tasks = section_tasks(sections)
+    
+    print(f"Analyzing {len(sections)} sections with {len(tasks)} prompts")
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_CHUNKS, len(tasks)))) as executor:
+        results = list(executor.map(
+            lambda task: analyze_section_question(
+                *task, outline=outline, on_clause=on_clause, tier=tier, deadline=deadline
+            ), tasks
+        ))
+    
+    analyses = [result for result in results if not failed_analysis(result)]
+    if not analyses:
+        return {'error': f"All {len(tasks)} prompts failed: {failure_reason(results[0])}"}
+    
+    merged = merge_chunk_analyses(analyses)
+    input_chars = sum(len(chunk) for _, chunk, _, _ in tasks) + len(outline)
+    merged['section_routing'] = {
+        'sections': len(sections),
+        'prompts': len(tasks),
+        'prompts_failed': len(results) - len(analyses),
+        'input_chars': input_chars,
+        'contract_chars': len(contract_text),
+        'seconds': round(time.time() - start, 2)
+    }
+    print(f"Section routed analysis: {json.dumps(merged['section_routing'])}, {len(merged['clauses'])} clauses")
+    return merged
+
+
+def section_tasks(sections: List[Dict[str, Any]]) -> List[Any]:
+    """
+    Prompts of analyze_contract_by_section, as (question, text, index, count)
+    tuples: the text of the question, or its chunk index out of count.
+    """
+    tasks = []
+    for question in SECTION_TYPES + ['other']:
+        texts = [section['text'] for section in sections if question in section['types']]
+        if question == 'other' and OVERVIEW_SECTION_CHARS > 0:
+            texts = [shorten_section(text, OVERVIEW_SECTION_CHARS) for text in texts]
+        text = '\n\n'.join(texts)
+        if not text and question != 'other':
+            continue
+        chunks = split_into_chunks(text) if text else ['']
+        for index, chunk in enumerate(chunks):
+            tasks.append((question, chunk, index, len(chunks)))
+    return tasks
+
+
+def shorten_section(text: str, max_chars: int) -> str:
+    """First max_chars of a section, cut at a word boundary."""
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(' ', max_chars // 2, max_chars)
+    return text[:cut if cut != -1 else max_chars].rstrip() + ' [...]'
+
+
+def analyze_section_question(question: str, text: str, index: int, count: int, outline: str,
+                             on_clause: Optional[Callable[[Dict[str, Any]], None]] = None,
+                             tier: str = DEFAULT_MODEL_TIER,
+                             deadline: Optional[float] = None) -> Dict[str, Any]:
+    """Answer one analysis question (a SECTION_QUESTIONS key or 'other') from its sections."""
+    part = f" (part {index + 1} of {count})" if count > 1 else ''
+    prompt = section_question_prompt(question, text, index, count, outline)
+    try:
+        analysis_text = invoke_bedrock(prompt, on_clause=on_clause, tier=tier, deadline=deadline)
+        if not analysis_text:
+            return {'error': f'No analysis generated for {question} sections{part}'}
+        return parse_analysis_response(analysis_text)
     except Exception as e:
-        print(f"Bedrock API error: {e}")
+        print(f"Bedrock API error on {question} sections{part}: {e}")
+        if retryable_bedrock_error(e):
+            raise
         return {'error': str(e)}
 
 
-def save_analysis_results(contract_id: str, analysis: Dict[str, Any]) -> None:
-    """Save analysis results to DynamoDB."""
-    clauses_table = dynamodb.Table(CLAUSES_TABLE)
+def section_question_prompt(question: str, text: str, index: int, count: int, outline: str) -> str:
+    """Prompt of one analysis question (a SECTION_QUESTIONS key or 'other')."""
+    part = f" (part {index + 1} of {count})" if count > 1 else ''
+    if question == 'other':
+        return f"""You are an enterprise contract review assistant. Below are the outline of a contract, listing its sections with their clause types, and the sections of the contract that are not about payment, liability, confidentiality or termination (those are analyzed separately). Extract:
+
+1. **Clauses List**: Extract all major clauses in these sections
+2. **Hidden Risks**: List any concerning or unusual clauses
+3. **Missing Clauses**: Identify critical clauses that should be present in the contract but are missing from its outline
+4. **Summary**: Provide a 2-3 sentence executive summary of the contract
+
+Contract Outline:
+{outline}
+
+Contract Sections{part}:
+{text or '(none)'}
+
+Respond in JSON format:
+{{
+  "clauses": [
+    {{"name": "clause name", "description": "clause description", "type": "other"}}
+  ],
+  "hidden_risks": ["risk 1", "risk 2"],
+  "missing_clauses": ["clause 1", "clause 2"],
+  "summary": "executive summary"
+}}
+"""
     
-    # Save each clause
-    for clause in analysis.get('clauses', []):
-        clauses_table.put_item(
-            Item={
-                'clause_id': f"{contract_id}_{clause.get('name', 'unknown')}",
-                'contract_id': contract_id,
-                'clause_name': clause.get('name', ''),
-                'description': clause.get('description', ''),
-                'type': clause.get('type', 'other'),
-                'created_at': datetime.utcnow().isoformat()
-            }
+    details = SECTION_QUESTIONS[question]
+    return f"""You are an enterprise contract review assistant. The following sections were taken from a contract because they concern {details['topic']}. Analyze them and extract:
+
+1. **Clauses List**: Extract the {details['topic']} clauses, and any other major clause in these sections
+2. {details['task']}
+3. **Hidden Risks**: List any concerning or unusual clauses in these sections
+
+Use an empty string or an empty list when these sections say nothing about a topic.
+
+Contract Sections{part}:
+{text}
+
+Respond in JSON format:
+{{
+  "clauses": [
+    {{"name": "clause name", "description": "clause description", "type": "payment|liability|confidentiality|termination|other"}}
+  ],
+  {details['format']},
+  "hidden_risks": ["risk 1", "risk 2"]
+}}
+"""
+
+
+def analyze_contract_map_reduce(contract_text: str,
+                                on_clause: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                tier: str = DEFAULT_MODEL_TIER,
+                                deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Analyze a long contract in overlapping chunks, concurrently, and merge the results.
+    
+    Each chunk is analyzed on its own (map), at most MAX_CONCURRENT_CHUNKS at
+    a time, so the latency stays close to that of one chunk. The chunk
+    results are then merged and deduplicated locally (reduce).
+    """
+    start = time.time()
+    chunks = split_into_chunks(contract_text)
+    print(f"Analyzing {len(contract_text)} chars in {len(chunks)} chunks")
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_CHUNKS, len(chunks)))) as executor:
+        results = list(executor.map(
+            functools.partial(analyze_chunk, on_clause=on_clause, tier=tier, deadline=deadline),
+            chunks, range(len(chunks)), [len(chunks)] * len(chunks)
+        ))
+    
+    analyses = [result for result in results if not failed_analysis(result)]
+    failed = len(results) - len(analyses)
+    if not analyses:
+        return {'error': f"All {len(chunks)} chunks failed: {failure_reason(results[0])}"}
+    
+    merged = merge_chunk_analyses(analyses)
+    merged['map_reduce'] = {
+        'chunks': len(chunks),
+        'chunks_failed': failed,
+        'seconds': round(time.time() - start, 2)
+    }
+    print(f"Map-reduce analysis: {json.dumps(merged['map_reduce'])}, {len(merged['clauses'])} clauses")
+    return merged
+
+
+def split_into_chunks(text: str, chunk_size: int = CHUNK_SIZE_CHARS,
+                      overlap: int = CHUNK_OVERLAP_CHARS) -> List[str]:
+    """
+    Split text into chunks of at most chunk_size characters, ending on section
+    boundaries when possible. Each chunk repeats the last overlap characters
+    of the previous one (from a line start), so that a clause cut at a chunk
+    boundary is seen whole in one of them.
+    """
+    chunks = []
+    start = 0
+    while len(text) - start > chunk_size:
+        end = find_chunk_end(text, start + chunk_size // 2, start + chunk_size)
+        chunks.append(text[start:end])
+        next_start = max(end - overlap, start + 1)
+        line_start = text.find('\n', next_start, end)
+        start = line_start + 1 if line_start != -1 else next_start
+    chunks.append(text[start:])
+    return chunks
+
+
+def find_chunk_end(text: str, lowest: int, highest: int) -> int:
+    """Best position in text[lowest:highest] to end a chunk (after a newline)."""
+    for pattern in (HEADING_BOUNDARY_PATTERN, PARAGRAPH_BOUNDARY_PATTERN, LINE_BOUNDARY_PATTERN):
+        last = None
+        for last in pattern.finditer(text, lowest, highest):
+            pass
+        if last is not None:
+            return last.start() + 1
+    return highest
+
+
+def analyze_chunk(chunk: str, index: int, count: int,
+                  on_clause: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  tier: str = DEFAULT_MODEL_TIER, deadline: Optional[float] = None) -> Dict[str, Any]:
+    """Map step: analyze one chunk of a long contract."""
+    prompt = chunk_prompt(chunk, index, count)
+    try:
+        analysis_text = invoke_bedrock(prompt, on_clause=on_clause, tier=tier, deadline=deadline)
+        if not analysis_text:
+            return {'error': f'No analysis generated for chunk {index + 1}'}
+        return parse_analysis_response(analysis_text)
+    except Exception as e:
+        print(f"Bedrock API error on chunk {index + 1}/{count}: {e}")
+        if retryable_bedrock_error(e):
+            raise
+        return {'error': str(e)}
+
+
+def chunk_prompt(chunk: str, index: int, count: int) -> str:
+    """Prompt analyzing one chunk of a long contract."""
+    return f"""You are an enterprise contract review assistant. The following text is part {index + 1} of {count} of a contract. Analyze this part only and extract:
+
+1. **Clauses List**: Extract all major clauses in this part (payment terms, liability, confidentiality, termination, etc.)
+2. **Payment Terms**: Identify payment amounts, schedules, penalties
+3. **Liability**: Identify liability limitations, indemnification clauses
+4. **Confidentiality**: Extract confidentiality and NDA terms
+5. **Termination Conditions**: Identify termination clauses and conditions
+6. **Hidden Risks**: List any concerning or unusual clauses
+7. **Missing Clauses**: Identify critical clauses that this part refers to or should contain but are missing
+8. **Summary**: Provide a 1-2 sentence summary of this part
+
+Use an empty string or an empty list when this part says nothing about a topic.
+
+Contract Text (part {index + 1} of {count}):
+{chunk}
+
+Respond in JSON format:
+{{
+  "clauses": [
+    {{"name": "clause name", "description": "clause description", "type": "payment|liability|confidentiality|termination|other"}}
+  ],
+  "payment_terms": {{"amount": "...", "schedule": "...", "penalties": "..."}},
+  "liability": "description of liability terms",
+  "confidentiality": "description of confidentiality terms",
+  "termination": "description of termination conditions",
+  "hidden_risks": ["risk 1", "risk 2"],
+  "missing_clauses": ["clause 1", "clause 2"],
+  "summary": "summary of this part"
+}}
+"""
+
+
+def failed_analysis(analysis: Dict[str, Any]) -> bool:
+    """
+    Whether a chunk or prompt analysis failed: an error, or a reply that
+    could not be parsed (its raw text must not be merged into the summary).
+    """
+    return 'error' in analysis or 'raw_analysis' in analysis
+
+
+def failure_reason(analysis: Dict[str, Any]) -> str:
+    """Why a chunk or prompt analysis failed (see failed_analysis)."""
+    return analysis.get('error') or 'unparseable model reply'
+
+
+def merge_chunk_analyses(analyses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Reduce step: merge chunk analyses into one analysis of the whole contract.
+    Failed analyses (see failed_analysis) must be left out.
+    
+    Clauses are deduplicated by normalized name (chunks overlap), keeping the
+    longest description; risks and text answers are deduplicated; a clause
+    reported missing by a chunk is dropped if another chunk found it.
+    """
+    clauses: Dict[str, Dict[str, Any]] = {}
+    for analysis in analyses:
+        for clause in analysis.get('clauses', []) or []:
+            if not isinstance(clause, dict) or not clause.get('name'):
+                continue
+            key = normalize_label(clause['name'])
+            existing = clauses.get(key)
+            if existing is None or len(str(clause.get('description', ''))) > len(str(existing.get('description', ''))):
+                clauses[key] = clause
+    
+    payment_terms: Dict[str, str] = {}
+    for field in ('amount', 'schedule', 'penalties'):
+        payment_terms[field] = '; '.join(unique_answers(
+            analysis['payment_terms'].get(field) for analysis in analyses
+            if isinstance(analysis.get('payment_terms'), dict)
+        ))
+    
+    found = set(clauses)
+    found.update(normalize_label(clause.get('type', '')) for clause in clauses.values())
+    missing_clauses = [
+        missing for missing in unique_answers(
+            item for analysis in analyses for item in analysis.get('missing_clauses', []) or []
         )
+        if normalize_label(missing) not in found
+    ]
+    
+    return {
+        'clauses': list(clauses.values()),
+        'payment_terms': payment_terms,
+        'liability': ' '.join(unique_answers(analysis.get('liability') for analysis in analyses)),
+        'confidentiality': ' '.join(unique_answers(analysis.get('confidentiality') for analysis in analyses)),
+        'termination': ' '.join(unique_answers(analysis.get('termination') for analysis in analyses)),
+        'hidden_risks': unique_answers(
+            item for analysis in analyses for item in analysis.get('hidden_risks', []) or []
+        ),
+        'missing_clauses': missing_clauses,
+        'summary': ' '.join(unique_answers(analysis.get('summary') for analysis in analyses))
+    }
+
+
+def normalize_label(value: Any) -> str:
+    """Lowercase alphanumeric words of a label, for comparisons."""
+    return ' '.join(re.findall(r'[a-z0-9]+', str(value).lower()))
+
+
+def unique_answers(values: Any) -> List[str]:
+    """Non-empty string answers, in order, without duplicates."""
+    answers = []
+    seen = set()
+    for value in values:
+        if not isinstance(value, str):
+            continue
+        value = value.strip()
+        key = normalize_label(value)
+        if value.lower().strip('. ') in EMPTY_ANSWERS or not key or key in seen:
+            continue
+        seen.add(key)
+        answers.append(value)
+    return answers
+
+
+def persist_analysis(contract_id: str, analysis: Dict[str, Any],
+                     streamed_clause_ids: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """
+    Save the clauses of an analysis, then mark the contract as analyzed.
+    
+    The status is updated once all the clauses are written, so a contract
+    is never reported analyzed with clauses missing.
+    
+    Args:
+        contract_id: Contract analyzed
+        analysis: Analysis results
+        streamed_clause_ids: Clauses saved while streaming; those the final
+            analysis dropped (merged duplicates) are deleted
+        
+    Returns:
+        Persistence statistics (clauses, batches, retries, milliseconds)
+    """
+    start = time.time()
+    stats = save_analysis_results(contract_id, analysis, streamed_clause_ids)
+    update_contract_status(contract_id, 'analyzed', analysis)
+    stats['ms'] = round((time.time() - start) * 1000)
+    print(f"Persisted analysis of contract {contract_id}: {json.dumps(stats)}")
+    emit_metric('PersistenceLatency', stats['ms'], 'Milliseconds')
+    return stats
+
+
+def save_analysis_results(contract_id: str, analysis: Dict[str, Any],
+                          stale_clause_ids: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """
+    Save analysis results to DynamoDB.
+    
+    Clauses are written with BatchWriteItem, DYNAMODB_BATCH_SIZE at a time,
+    PERSIST_CONCURRENCY batches in parallel. The stale_clause_ids that are
+    not clauses of the analysis are deleted in the same batches.
+    
+    Returns:
+        Number of clauses, batches, retried batch writes and deleted clauses
+    """
+    created_at = datetime.utcnow().isoformat()
+    
+    # One item per clause id: a batch cannot hold the same key twice, and
+    # the last clause of a name was the one kept when writing them one by one
+    items: Dict[str, Dict[str, Any]] = {}
+    for clause in analysis.get('clauses', []):
+        item = clause_item(contract_id, clause, created_at)
+        items[item['clause_id']] = item
+    
+    requests = [{'PutRequest': {'Item': dynamodb_item(item)}} for item in items.values()]
+    deleted = sorted(set(stale_clause_ids or ()) - set(items))
+    requests.extend(
+        {'DeleteRequest': {'Key': dynamodb_item({'clause_id': clause_id})}} for clause_id in deleted
+    )
+    batches = [
+        requests[i:i + DYNAMODB_BATCH_SIZE] for i in range(0, len(requests), DYNAMODB_BATCH_SIZE)
+    ]
+    retries = 0
+    if batches:
+        with ThreadPoolExecutor(max_workers=max(1, min(PERSIST_CONCURRENCY, len(batches)))) as executor:
+            retries = sum(executor.map(write_clause_batch, batches))
+    
+    return {'clauses': len(items), 'batches': len(batches), 'retries': retries, 'deleted': len(deleted)}
+
+
+def dynamodb_item(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Item, key or expression values in the typed format of dynamodb_client."""
+    return {name: dynamodb_serializer.serialize(value) for name, value in values.items()}
+
+
+def clause_item(contract_id: str, clause: Dict[str, Any], created_at: str) -> Dict[str, Any]:
+    """Clauses table item of a clause of the analysis."""
+    return {
+        'clause_id': f"{contract_id}_{clause.get('name', 'unknown')}",
+        'contract_id': contract_id,
+        'clause_name': clause.get('name', ''),
+        'description': clause.get('description', ''),
+        'type': clause.get('type', 'other'),
+        'created_at': created_at
+    }
+
+
+# Guards the sets of streamed clause ids, which the threads analyzing the
+# sections or chunks of a contract add to concurrently
+streamed_clause_lock = threading.Lock()
+
+
+def save_streamed_clause(contract_id: str, streamed_clause_ids: Set[str], clause: Dict[str, Any]) -> None:
+    """
+    Save a clause as soon as the model streamed it, and mark the contract
+    as partially analyzed with the first one, so that it can be shown
+    before the analysis is done. Failures are logged, not raised: the
+    clause is saved again with the final analysis.
+    
+    Safe to call from several threads with the same streamed_clause_ids:
+    only one of them finds the first clause and sets the status.
+    """
+    if not clause.get('name'):
+        return
+    try:
+        item = clause_item(contract_id, clause, datetime.utcnow().isoformat())
+        dynamodb_client.put_item(TableName=CLAUSES_TABLE, Item=dynamodb_item(item))
+        with streamed_clause_lock:
+            first = not streamed_clause_ids
+            streamed_clause_ids.add(item['clause_id'])
+        if first:
+            set_contract_status(contract_id, 'partially_analyzed')
+    except Exception as e:
+        print(f"Failed to save streamed clause: {e}")
+
+
+def write_clause_batch(requests: List[Dict[str, Any]]) -> int:
+    """
+    Send up to DYNAMODB_BATCH_SIZE put or delete requests of clauses with
+    BatchWriteItem, retrying unprocessed items with jittered exponential
+    backoff.
+    
+    Returns:
+        Number of retries needed
+    """
+    request_items = {CLAUSES_TABLE: requests}
+    for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+        if attempt:
+            backoff = min(BATCH_WRITE_MAX_BACKOFF_SECONDS, BATCH_WRITE_BASE_BACKOFF_SECONDS * 2 ** attempt)
+            time.sleep(random.uniform(0, backoff))
+        response = dynamodb_client.batch_write_item(RequestItems=request_items)
+        request_items = response.get('UnprocessedItems') or {}
+        if not request_items:
+            return attempt
+    
+    unprocessed = sum(len(requests) for requests in request_items.values())
+    raise RuntimeError(f"{unprocessed} clauses still unprocessed after {BATCH_WRITE_MAX_ATTEMPTS} batch write attempts")
 
 
 def update_contract_status(contract_id: str, status: str, analysis: Dict[str, Any]) -> None:
     """Update contract status in DynamoDB."""
-    contracts_table = dynamodb.Table(CONTRACTS_TABLE)
-    
     update_expression = "SET #status = :status, clauses_count = :clauses_count, summary = :summary"
     expression_values = {
         ':status': status,
@@ -225,14 +1370,26 @@ def update_contract_status(contract_id: str, status: str, analysis: Dict[str, An
     }
     expression_names = {'#status': 'status'}
     
-    contracts_table.update_item(
-        Key={'contract_id': contract_id},
+    dynamodb_client.update_item(
+        TableName=CONTRACTS_TABLE,
+        Key=dynamodb_item({'contract_id': contract_id}),
         UpdateExpression=update_expression,
-        ExpressionAttributeValues=expression_values,
+        ExpressionAttributeValues=dynamodb_item(expression_values),
         ExpressionAttributeNames=expression_names
     )
 
 
+def set_contract_status(contract_id: str, status: str) -> None:
+    """Update only the status of a contract in DynamoDB."""
+    dynamodb_client.update_item(
+        TableName=CONTRACTS_TABLE,
+        Key=dynamodb_item({'contract_id': contract_id}),
+        UpdateExpression="SET #status = :status",
+        ExpressionAttributeValues=dynamodb_item({':status': status}),
+        ExpressionAttributeNames={'#status': 'status'}
+    )
+
+
 def trigger_risk_scoring(contract_id: str, analysis: Dict[str, Any]) -> None:
     """Trigger risk scoring Lambda asynchronously."""
     try:
@@ -0,0 +1,249 @@
+"""
+Parsing of the JSON analyses written by the model: incrementally while they
+are streamed, and tolerantly when they are fenced, followed by text or cut
+short at max_tokens.
+"""
+import json
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+# Markdown code fences, wherever the model put them
+FENCE_PATTERN = re.compile(r'```[A-Za-z]*')
+TRAILING_COMMA_PATTERN = re.compile(r',(\s*[}\]])')
+PARTIAL_UNICODE_ESCAPE_PATTERN = re.compile(r'\\u[0-9A-Fa-f]{0,3}$')
+
+
+class ClauseStreamParser:
+    """
+    Incremental scanner of a JSON analysis that returns each object of its
+    top-level "clauses" array as soon as the object is complete.
+    
+    Text before the first "{" (such as a ```json fence) is ignored. The
+    scanner only tracks strings and nesting, so feeding text costs one pass
+    over it, and only complete clause objects are decoded.
+    
+    Usage:
+        parser = ClauseStreamParser()
+        for delta in text_deltas:
+            for clause in parser.feed(delta):
+                ...
+    """
+    
+    def __init__(self, array_key: str = 'clauses'):
+        self.array_key = array_key
+        self.buffer = ''
+        self.position = 0
+        # Open containers, as [bracket, key in the parent object]
+        self.stack: List[List[Optional[str]]] = []
+        self.in_string = False
+        self.escaped = False
+        self.string_start = 0
+        self.last_string: Optional[str] = None
+        self.pending_key: Optional[str] = None
+        self.element_start: Optional[int] = None
+        self.done = False
+    
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Add streamed text; return the clause objects it completed."""
+        self.buffer += text
+        completed = []
+        buffer = self.buffer
+        
+        for position in range(self.position, len(buffer)):
+            char = buffer[position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    self.last_string = buffer[self.string_start:position + 1]
+                continue
+            if self.done:
+                break
+            
+            if char == '"':
+                if self.stack:
+                    self.in_string = True
+                    self.string_start = position
+            elif char == ':':
+                self.pending_key = self.last_string
+            elif char == ',':
+                self.pending_key = None
+            elif char in '{[':
+                if not self.stack and char == '[':
+                    continue
+                key = None
+                if self.stack and self.stack[-1][0] == '{' and self.pending_key is not None:
+                    try:
+                        key = json.loads(self.pending_key)
+                    except ValueError:
+                        key = None
+                self.stack.append([char, key])
+                self.pending_key = None
+                if char == '{' and self.in_clause_array(len(self.stack) - 1):
+                    self.element_start = position
+            elif char in '}]' and self.stack:
+                self.stack.pop()
+                if char == '}' and self.element_start is not None and self.in_clause_array(len(self.stack)):
+                    clause = decode_object(buffer[self.element_start:position + 1])
+                    if clause is not None:
+                        completed.append(clause)
+                    self.element_start = None
+                if not self.stack:
+                    self.done = True
+        
+        self.position = len(buffer)
+        return completed
+    
+    def in_clause_array(self, depth: int) -> bool:
+        """Whether a container at depth is an element of the top-level clause array."""
+        return (
+            depth == 2
+            and self.stack[0][0] == '{'
+            and self.stack[1][0] == '['
+            and self.stack[1][1] == self.array_key
+        )
+
+
+def decode_object(text: str) -> Optional[Dict[str, Any]]:
+    """JSON object of text, tolerating trailing commas; None if invalid."""
+    try:
+        value = json.loads(text)
+    except ValueError:
+        try:
+            value = json.loads(TRAILING_COMMA_PATTERN.sub(r'\1', text))
+        except ValueError:
+            return None
+    return value if isinstance(value, dict) else None
+
+
+def repair_json(text: str) -> Tuple[Optional[Any], Dict[str, Any]]:
+    """
+    Parse the first JSON object of a model reply that json.loads rejects.
+    
+    Code fences are removed wherever they are, text after the object is
+    ignored and trailing commas are dropped. When the reply was cut short,
+    an unterminated string value is closed, an incomplete key or value is
+    dropped, and the open arrays and objects are closed. Only the complete
+    objects of the "clauses" array are kept, a clause cut short being
+    dropped rather than kept with missing fields.
+    
+    Args:
+        text: Model reply
+    
+    Returns:
+        (value, report) tuple, value being None if nothing could be parsed.
+        The report tells whether the reply was truncated, what was closed
+        or dropped, and how many clauses were recovered.
+    """
+    cleaned = FENCE_PATTERN.sub('', text)
+    report: Dict[str, Any] = {
+        'truncated': False,
+        'closed_string': False,
+        'closed_containers': 0,
+        'dropped_chars': 0,
+        'clauses_recovered': 0,
+        'clauses_dropped': 0
+    }
+    start = cleaned.find('{')
+    if start == -1:
+        report['error'] = 'No JSON object found'
+        return None, report
+    
+    candidate = close_truncated_json(cleaned, start, report)
+    try:
+        value = json.loads(candidate)
+    except ValueError:
+        try:
+            value = json.loads(TRAILING_COMMA_PATTERN.sub(r'\1', candidate))
+        except ValueError as e:
+            report['error'] = str(e)
+            return None, report
+    
+    if isinstance(value, dict) and isinstance(value.get('clauses'), list):
+        complete = ClauseStreamParser().feed(cleaned[start:])
+        report['clauses_recovered'] = len(complete)
+        report['clauses_dropped'] = max(0, len(value['clauses']) - len(complete))
+        value['clauses'] = complete
+    return value, report
+
+
+def close_truncated_json(text: str, start: int, report: Dict[str, Any]) -> str:
+    """
+    The JSON object starting at text[start], ending at its closing brace,
+    or completed as described in repair_json if the text ends first.
+    """
+    # Open containers, as [bracket, what comes next: key, colon, value or comma]
+    stack: List[List[str]] = []
+    in_string = False
+    escaped = False
+    string_is_value = False
+    token_start: Optional[int] = None
+    # Last position where closing the open containers gives valid JSON
+    safe_end = start
+    safe_closers = ''
+    
+    def closers() -> str:
+        return ''.join('}' if bracket == '{' else ']' for bracket, _ in reversed(stack))
+    
+    def value_completed(end: int) -> None:
+        nonlocal safe_end, safe_closers
+        stack[-1][1] = 'comma'
+        safe_end = end
+        safe_closers = closers()
+    
+    for position in range(start, len(text)):
+        char = text[position]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+                if string_is_value:
+                    value_completed(position + 1)
+                else:
+                    stack[-1][1] = 'colon'
+            continue
+        
+        if token_start is not None and (char in ',:}]"{[' or char.isspace()):
+            # A number or literal ends where a delimiter follows it
+            value_completed(position)
+            token_start = None
+        
+        if char.isspace():
+            continue
+        if char == '"':
+            in_string = True
+            string_is_value = stack[-1][1] != 'key' if stack else True
+        elif char in '{[':
+            stack.append([char, 'key' if char == '{' else 'value'])
+            safe_end = position + 1
+            safe_closers = closers()
+        elif char in '}]':
+            if stack:
+                stack.pop()
+            if not stack:
+                return text[start:position + 1]
+            value_completed(position + 1)
+        elif char == ':':
+            stack[-1][1] = 'value'
+        elif char == ',':
+            stack[-1][1] = 'key' if stack[-1][0] == '{' else 'value'
+        elif token_start is None:
+            token_start = position
+    
+    report['truncated'] = True
+    if in_string and string_is_value:
+        # Keep the partial text of a value, without a dangling escape
+        partial = text[start:len(text) - 1] if escaped else text[start:]
+        partial = PARTIAL_UNICODE_ESCAPE_PATTERN.sub('', partial)
+        report['closed_string'] = True
+        report['closed_containers'] = len(stack)
+        return partial + '"' + closers()
+    report['dropped_chars'] = len(text) - safe_end
+    report['closed_containers'] = len(safe_closers)
+    return text[start:safe_end] + safe_closers
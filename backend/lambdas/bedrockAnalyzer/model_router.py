@@ -0,0 +1,180 @@
+"""
+Route contracts to a model tier: a small fast model for short or standard
+contracts, the large model for long or complex ones.
+
+Tiers and routing rules are JSON (see load_tiers and load_rules), so that
+they can be changed through the environment without code changes.
+"""
+import json
+import re
+from typing import Dict, Any, List
+
+# Model of the fast tier unless configured otherwise
+DEFAULT_FAST_MODEL_ID = 'anthropic.claude-3-haiku-20240307-v1:0'
+
+# Rules tried in order, the first matching one giving the tier. A rule
+# matches when all its conditions hold: min_chars, max_chars, min_sections,
+# max_sections (section headings found) and contract_types (guessed type)
+DEFAULT_ROUTING_RULES = [
+    {'tier': 'large', 'min_chars': 60000},
+    {'tier': 'large', 'min_sections': 30},
+    {'tier': 'large', 'contract_types': ['master_services', 'license', 'merger', 'loan', 'partnership']},
+    {'tier': 'fast', 'contract_types': ['nda', 'employment', 'lease', 'purchase', 'statement_of_work']},
+    {'tier': 'fast', 'max_chars': 15000},
+    {'tier': 'large'}
+]
+RULE_CONDITIONS = {'min_chars', 'max_chars', 'min_sections', 'max_sections', 'contract_types'}
+
+# Keywords of each contract type, looked for at the start of the contract
+CONTRACT_TYPE_PATTERNS = {
+    'nda': re.compile(
+        r'\b(?:non-?disclosure|confidentiality agreement|NDA)\b', re.IGNORECASE
+    ),
+    'employment': re.compile(
+        r'\b(?:employment agreement|employment contract|offer letter|employer|employee)\b', re.IGNORECASE
+    ),
+    'lease': re.compile(r'\b(?:lease|landlord|tenant|lessor|lessee)\b', re.IGNORECASE),
+    'master_services': re.compile(
+        r'\b(?:master (?:services? |subscription )?agreement|MSA)\b', re.IGNORECASE
+    ),
+    'statement_of_work': re.compile(r'\b(?:statement of work|SOW)\b', re.IGNORECASE),
+    'license': re.compile(
+        r'\b(?:licen[cs]e agreement|licensor|licensee|end user licen[cs]e)\b', re.IGNORECASE
+    ),
+    'purchase': re.compile(
+        r'\b(?:purchase order|sale of goods|supply agreement|buyer|seller)\b', re.IGNORECASE
+    ),
+    'loan': re.compile(
+        r'\b(?:loan agreement|credit agreement|promissory note|borrower|lender)\b', re.IGNORECASE
+    ),
+    'merger': re.compile(
+        r'\b(?:merger|acquisition|stock purchase agreement|asset purchase agreement)\b', re.IGNORECASE
+    ),
+    'partnership': re.compile(
+        r'\b(?:partnership agreement|joint venture|operating agreement)\b', re.IGNORECASE
+    ),
+}
+# Text looked at to guess the type, and the part of it holding the title,
+# whose matches count TITLE_WEIGHT times
+CONTRACT_TYPE_SAMPLE_CHARS = 3000
+TITLE_CHARS = 300
+TITLE_WEIGHT = 3
+
+
+def load_tiers(config: str, defaults: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Model tiers: the defaults, updated with a JSON object mapping tier names
+    to their settings ("model_id", and optionally "tokens_per_minute" and
+    "requests_per_minute" quotas). Invalid JSON is ignored.
+    
+    Example:
+        {"fast": {"model_id": "anthropic.claude-3-haiku-20240307-v1:0",
+                  "tokens_per_minute": 400000}}
+    """
+    tiers = {name: dict(settings) for name, settings in defaults.items()}
+    if not config:
+        return tiers
+    try:
+        overrides = json.loads(config)
+        if not isinstance(overrides, dict):
+            raise ValueError('expected an object')
+    except ValueError as e:
+        print(f"Ignoring invalid model tiers {config[:200]}: {e}")
+        return tiers
+    
+    for name, settings in overrides.items():
+        if not isinstance(settings, dict):
+            print(f"Ignoring settings of model tier {name}: expected an object")
+            continue
+        tiers.setdefault(name, {}).update(settings)
+    for name in [name for name, settings in tiers.items() if not settings.get('model_id')]:
+        print(f"Ignoring model tier {name} without model_id")
+        del tiers[name]
+    return tiers
+
+
+def load_rules(config: str, tiers: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Routing rules: a JSON list of rules (see DEFAULT_ROUTING_RULES), or the
+    default rules if config is empty or invalid. Rules of unknown tiers or
+    with unknown conditions are dropped.
+    """
+    rules = DEFAULT_ROUTING_RULES
+    if config:
+        try:
+            rules = json.loads(config)
+            if not isinstance(rules, list):
+                raise ValueError('expected a list')
+        except ValueError as e:
+            print(f"Ignoring invalid model routing rules {config[:200]}: {e}")
+            rules = DEFAULT_ROUTING_RULES
+    
+    valid = []
+    for rule in rules:
+        if not isinstance(rule, dict) or rule.get('tier') not in tiers:
+            print(f"Ignoring model routing rule {rule}: unknown tier")
+            continue
+        unknown = set(rule) - RULE_CONDITIONS - {'tier'}
+        if unknown:
+            print(f"Ignoring model routing rule {rule}: unknown conditions {sorted(unknown)}")
+            continue
+        valid.append(rule)
+    return valid
+
+
+def guess_contract_type(text: str) -> str:
+    """
+    Contract type of a text from keywords in its first
+    CONTRACT_TYPE_SAMPLE_CHARS, the title weighing more; 'unknown' if none match.
+    """
+    sample = text[:CONTRACT_TYPE_SAMPLE_CHARS]
+    title = sample[:TITLE_CHARS]
+    best_type = 'unknown'
+    best_score = 0
+    for contract_type, pattern in CONTRACT_TYPE_PATTERNS.items():
+        score = len(pattern.findall(sample)) + (TITLE_WEIGHT - 1) * len(pattern.findall(title))
+        if score > best_score:
+            best_type = contract_type
+            best_score = score
+    return best_type
+
+
+def route_contract(text: str, section_count: int, rules: List[Dict[str, Any]],
+                   default_tier: str) -> Dict[str, Any]:
+    """
+    Tier of a contract, from the first rule matching its signals.
+    
+    Args:
+        text: Extracted contract text
+        section_count: Section headings found in the text
+        rules: Routing rules, from load_rules
+        default_tier: Tier used when no rule matches
+    
+    Returns:
+        Dict with 'tier', 'rule' (index of the matching rule, None if none)
+        and 'signals' (chars, sections, contract_type)
+    """
+    signals = {
+        'chars': len(text),
+        'sections': section_count,
+        'contract_type': guess_contract_type(text)
+    }
+    for index, rule in enumerate(rules):
+        if rule_matches(rule, signals):
+            return {'tier': rule['tier'], 'rule': index, 'signals': signals}
+    return {'tier': default_tier, 'rule': None, 'signals': signals}
+
+
+def rule_matches(rule: Dict[str, Any], signals: Dict[str, Any]) -> bool:
+    """Whether the signals of a contract meet all the conditions of a rule."""
+    if 'min_chars' in rule and signals['chars'] < rule['min_chars']:
+        return False
+    if 'max_chars' in rule and signals['chars'] > rule['max_chars']:
+        return False
+    if 'min_sections' in rule and signals['sections'] < rule['min_sections']:
+        return False
+    if 'max_sections' in rule and signals['sections'] > rule['max_sections']:
+        return False
+    if 'contract_types' in rule and signals['contract_type'] not in rule['contract_types']:
+        return False
+    return True
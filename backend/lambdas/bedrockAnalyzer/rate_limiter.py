@@ -0,0 +1,246 @@
+"""
+Token bucket rate limiting of the Bedrock calls, to stay under the account
+quotas of tokens and requests per minute instead of being throttled.
+"""
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+# Pause after losing a conditional write to another invocation
+CONTENTION_BACKOFF_SECONDS = 0.05
+
+
+def number(value: float) -> Dict[str, str]:
+    """A number in the typed format of the DynamoDB client."""
+    return {'N': str(value)}
+
+
+class RateLimitTimeout(Exception):
+    """The quota of a call would only be available after its deadline."""
+
+
+class RateLimiter(ABC):
+    """
+    Two token buckets, for model tokens and for requests, refilled
+    continuously at tokens_per_minute and requests_per_minute and holding at
+    most one minute of quota.
+    
+    acquire() takes the estimated tokens of a call (input plus max output
+    tokens, as Bedrock counts them when the call starts) and one request,
+    waiting until the buckets hold them. release() gives back the tokens
+    the call did not use once its actual usage is known. Waits longer than
+    max_wait_seconds are cut short and the call goes ahead, Bedrock's own
+    throttling being the last resort, but a wait that would end after the
+    deadline given to acquire raises RateLimitTimeout instead of sleeping.
+    """
+    
+    def __init__(self, tokens_per_minute: int, requests_per_minute: int,
+                 max_wait_seconds: float = 120.0):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.max_wait_seconds = max_wait_seconds
+    
+    @abstractmethod
+    def acquire(self, tokens: int, deadline: Optional[float] = None) -> float:
+        """
+        Take tokens and one request from the buckets; return the seconds waited.
+        
+        Raises:
+            RateLimitTimeout: if the wait would end after deadline (a time.time())
+        """
+    
+    @abstractmethod
+    def release(self, tokens: int) -> None:
+        """Give back tokens reserved by acquire but not used."""
+    
+    def refill(self, tokens: float, requests: float, elapsed: float) -> Tuple[float, float]:
+        """Bucket contents after elapsed seconds."""
+        elapsed = max(0.0, elapsed)
+        return (
+            min(float(self.tokens_per_minute), tokens + elapsed * self.tokens_per_minute / 60),
+            min(float(self.requests_per_minute), requests + elapsed * self.requests_per_minute / 60)
+        )
+    
+    def wait_time(self, tokens: float, requests: float, needed: int) -> float:
+        """Seconds until the buckets hold needed tokens and one request (0 if they do)."""
+        token_wait = (needed - tokens) * 60 / self.tokens_per_minute
+        request_wait = (1 - requests) * 60 / self.requests_per_minute
+        return max(0.0, token_wait, request_wait)
+    
+    def cap(self, tokens: int) -> int:
+        """Tokens of a call larger than the bucket can only wait for a full bucket."""
+        return min(tokens, self.tokens_per_minute)
+    
+    def check_deadline(self, wait: float, deadline: Optional[float]) -> None:
+        """Raise RateLimitTimeout if a wait starting now would end after deadline."""
+        if deadline is not None and time.time() + wait > deadline:
+            raise RateLimitTimeout(
+                f"Bedrock quota not available for {wait:.1f} s, "
+                f"{max(0.0, deadline - time.time()):.1f} s before the deadline"
+            )
+
+
+class LocalRateLimiter(RateLimiter):
+    """
+    Rate limiter shared by the threads of one process only, for local runs
+    and as a stand-in when no rate limit table is configured.
+    """
+    
+    def __init__(self, tokens_per_minute: int, requests_per_minute: int,
+                 max_wait_seconds: float = 120.0):
+        super().__init__(tokens_per_minute, requests_per_minute, max_wait_seconds)
+        self.tokens = float(tokens_per_minute)
+        self.requests = float(requests_per_minute)
+        self.updated_at = time.time()
+        self.lock = threading.Lock()
+    
+    def acquire(self, tokens: int, deadline: Optional[float] = None) -> float:
+        needed = self.cap(tokens)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.time()
+                self.tokens, self.requests = self.refill(self.tokens, self.requests, now - self.updated_at)
+                self.updated_at = now
+                wait = self.wait_time(self.tokens, self.requests, needed)
+                if wait == 0 or waited >= self.max_wait_seconds:
+                    self.tokens -= needed
+                    self.requests -= 1
+                    return waited
+            wait = min(wait, self.max_wait_seconds - waited)
+            self.check_deadline(wait, deadline)
+            time.sleep(wait)
+            waited += wait
+    
+    def release(self, tokens: int) -> None:
+        with self.lock:
+            self.tokens = min(float(self.tokens_per_minute), self.tokens + tokens)
+
+
+class DynamoDBRateLimiter(RateLimiter):
+    """
+    Rate limiter shared by all the invocations through one DynamoDB item.
+    
+    The item holds the bucket contents at updated_at and a version number.
+    Taking from the buckets is a write conditioned on the version read, so
+    concurrent invocations never take the same tokens twice; the loser of a
+    race reads the item again. If DynamoDB fails, calls are not limited.
+    
+    The item is read and written with a low-level DynamoDB client, which,
+    unlike resources, is safe to share between threads.
+    """
+    
+    def __init__(self, client: Any, table_name: str, bucket_id: str, tokens_per_minute: int,
+                 requests_per_minute: int, max_wait_seconds: float = 120.0):
+        super().__init__(tokens_per_minute, requests_per_minute, max_wait_seconds)
+        self.client = client
+        self.table_name = table_name
+        self.key = {'bucket_id': {'S': bucket_id}}
+    
+    def acquire(self, tokens: int, deadline: Optional[float] = None) -> float:
+        needed = self.cap(tokens)
+        waited = 0.0
+        while True:
+            try:
+                item = self.client.get_item(
+                    TableName=self.table_name, Key=self.key, ConsistentRead=True
+                ).get('Item')
+            except Exception as e:
+                print(f"Rate limiter unavailable, not limiting: {e}")
+                return waited
+            
+            now = time.time()
+            if item:
+                bucket_tokens, bucket_requests = self.refill(
+                    float(item['tokens']['N']), float(item['requests']['N']),
+                    now - float(item['updated_at']['N'])
+                )
+                version = int(item['version']['N'])
+            else:
+                bucket_tokens = float(self.tokens_per_minute)
+                bucket_requests = float(self.requests_per_minute)
+                version = None
+            
+            wait = self.wait_time(bucket_tokens, bucket_requests, needed)
+            if wait > 0 and waited < self.max_wait_seconds:
+                wait = min(wait, self.max_wait_seconds - waited) + random.uniform(0, 0.1)
+                self.check_deadline(wait, deadline)
+                time.sleep(wait)
+                waited += wait
+                continue
+            
+            if self.take(bucket_tokens - needed, bucket_requests - 1, now, version):
+                return waited
+            time.sleep(random.uniform(0, CONTENTION_BACKOFF_SECONDS))
+    
+    def take(self, tokens: float, requests: float, now: float, version: Optional[int]) -> bool:
+        """Write the new bucket contents if the item is still at version; False if it changed."""
+        values: Dict[str, Any] = {
+            ':tokens': number(round(tokens, 3)),
+            ':requests': number(round(requests, 3)),
+            ':updated_at': number(round(now, 3)),
+            ':next_version': number((version or 0) + 1)
+        }
+        if version is None:
+            condition = 'attribute_not_exists(bucket_id)'
+        else:
+            condition = 'version = :version'
+            values[':version'] = number(version)
+        try:
+            self.client.update_item(
+                TableName=self.table_name,
+                Key=self.key,
+                UpdateExpression=(
+                    'SET tokens = :tokens, requests = :requests, '
+                    'updated_at = :updated_at, version = :next_version'
+                ),
+                ConditionExpression=condition,
+                ExpressionAttributeValues=values
+            )
+            return True
+        except Exception as e:
+            if getattr(e, 'response', {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                return False
+            print(f"Rate limiter unavailable, not limiting: {e}")
+            return True
+    
+    def release(self, tokens: int) -> None:
+        # Bumping the version makes a concurrent acquire read the refund. A
+        # refund that would overfill the bucket fills it up to its capacity
+        tokens = self.cap(tokens)
+        values = {
+            ':tokens': number(tokens),
+            ':one': number(1),
+            ':most': number(self.tokens_per_minute - tokens)
+        }
+        try:
+            self.client.update_item(
+                TableName=self.table_name,
+                Key=self.key,
+                UpdateExpression='ADD tokens :tokens, version :one',
+                ConditionExpression='attribute_exists(bucket_id) AND tokens <= :most',
+                ExpressionAttributeValues=values
+            )
+        except Exception as e:
+            if getattr(e, 'response', {}).get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                print(f"Could not release {tokens} rate limiter tokens: {e}")
+                return
+            self.fill(values[':most'])
+    
+    def fill(self, most: Dict[str, str]) -> None:
+        """Fill the token bucket up to its capacity if it holds more than most tokens."""
+        try:
+            self.client.update_item(
+                TableName=self.table_name,
+                Key=self.key,
+                UpdateExpression='SET tokens = :capacity ADD version :one',
+                ConditionExpression='attribute_exists(bucket_id) AND tokens > :most',
+                ExpressionAttributeValues={
+                    ':capacity': number(self.tokens_per_minute), ':one': number(1), ':most': most
+                }
+            )
+        except Exception as e:
+            if getattr(e, 'response', {}).get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                print(f"Could not fill the rate limiter bucket: {e}")
@@ -0,0 +1,199 @@
+"""
+Split extracted contract text into sections and classify them by clause type,
+so that each analysis question only has to be sent the relevant sections.
+"""
+import re
+from typing import Dict, Any, List, Optional
+
+# Clause types a section can be routed to; sections matching none are 'other'
+SECTION_TYPES = ['payment', 'liability', 'confidentiality', 'termination']
+
+# Keywords of each clause type, matched at the start of words
+SECTION_KEYWORDS = {
+    'payment': re.compile(
+        r'\b(?:payment|pay|fees?\b|price|pricing|invoic|compensation|remuneration|'
+        r'royalt|expenses|reimburse|taxes|billing|late charge|interest on)',
+        re.IGNORECASE
+    ),
+    'liability': re.compile(
+        r'\b(?:liabilit|liable|indemni|hold harmless|damages|warrant|'
+        r'disclaimer|insurance|limitation of)',
+        re.IGNORECASE
+    ),
+    'confidentiality': re.compile(
+        r'\b(?:confidential|non-disclosure|nondisclosure|proprietary information|'
+        r'trade secret|privacy|data protection|personal data)',
+        re.IGNORECASE
+    ),
+    'termination': re.compile(
+        r'\b(?:terminat|expir|renewal|cancel|term of (?:this|the) agreement|'
+        r'effect of termination|survival)',
+        re.IGNORECASE
+    ),
+}
+# Keyword matches needed in the body of a section (its heading needs one)
+MIN_BODY_MATCHES = 2
+
+# Numbered headings: "ARTICLE 5", "Section 12", "5.", "5.1 Fees"
+KEYWORD_HEADING_PATTERN = re.compile(
+    r'^[ \t]*(?:ARTICLE|SECTION|SCHEDULE|EXHIBIT|ANNEX|Article|Section|Schedule|Exhibit|Annex)'
+    r'[ \t]+([\dIVXLC]+|[A-Z])\b'
+)
+NUMBERED_HEADING_PATTERN = re.compile(r'^[ \t]*(\d{1,3})((?:\.\d{1,3})*)\.?[ \t]+[A-Z(]')
+# Layout heuristics: a short line in capitals, or a short Title Case line
+# without final punctuation, set apart by a blank line
+CAPITALS_HEADING_PATTERN = re.compile(r"^[ \t]*[A-Z][A-Z0-9 ,&'/()\-]{2,79}:?[ \t]*$")
+TITLE_HEADING_PATTERN = re.compile(r"^[ \t]*[A-Z][A-Za-z0-9,&'/()\- ]{2,59}[A-Za-z)][ \t]*$")
+# Sections shorter than this after their heading are merged with the next one
+MIN_SECTION_BODY_CHARS = 40
+
+ROMAN_NUMERALS = {'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100}
+
+
+def segment_sections(text: str) -> List[Dict[str, Any]]:
+    """
+    Split contract text into top-level sections.
+    
+    A section starts at a heading line: a numbered heading ("ARTICLE 5",
+    "Section 12", "5. Fees"), a short line in capitals, or a short title line
+    preceded by a blank line. Numbered sub-clauses ("5.1", "5.2") and
+    numbered lists inside a section stay in that section, since a heading
+    number has to be greater than the one of the current section. The text
+    before the first heading is a section with an empty heading.
+    
+    Args:
+        text: Extracted contract text
+    
+    Returns:
+        Sections in document order, as dicts with 'heading', 'text' (heading
+        included), 'start' (offset in text) and 'types' (see classify_section)
+    """
+    sections = []
+    current = {'heading': '', 'start': 0, 'number': None, 'body_chars': 0}
+    previous_blank = True
+    offset = 0
+    
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        is_heading, number = match_heading(line, stripped, previous_blank, current['number'])
+        if is_heading:
+            if current['body_chars'] < MIN_SECTION_BODY_CHARS:
+                # Heading split over several lines ("ARTICLE 5" / "PAYMENT")
+                # or a section without body: keep going with the same section
+                current['heading'] = f"{current['heading']} {stripped}".strip()
+                if number is not None:
+                    current['number'] = number
+            else:
+                sections.append(current)
+                current = {'heading': stripped, 'start': offset, 'number': number, 'body_chars': 0}
+        else:
+            current['body_chars'] += len(stripped)
+        previous_blank = not stripped
+        offset += len(line)
+    sections.append(current)
+    
+    result = []
+    for index, section in enumerate(sections):
+        end = sections[index + 1]['start'] if index + 1 < len(sections) else len(text)
+        section_text = text[section['start']:end].strip()
+        if not section_text:
+            continue
+        result.append({
+            'heading': section['heading'][:200],
+            'text': section_text,
+            'start': section['start'],
+            'types': classify_section(section['heading'], section_text)
+        })
+    return result
+
+
+def match_heading(line: str, stripped: str, previous_blank: bool,
+                  current_number: Optional[int]) -> Any:
+    """
+    Whether a line starts a new section, and the section number it gives.
+    
+    Returns:
+        (is_heading, number) tuple, number being None for unnumbered headings
+    """
+    if not stripped:
+        return False, None
+    
+    match = KEYWORD_HEADING_PATTERN.match(line)
+    if match:
+        return True, parse_section_number(match.group(1))
+    
+    match = NUMBERED_HEADING_PATTERN.match(line)
+    if match:
+        number = int(match.group(1))
+        # "5.1" inside section 5, or a "1." list item inside section 5
+        if current_number is not None and number <= current_number:
+            return False, None
+        # Top-level numbers only ("6.1" may start section 6 if "6." is missing)
+        if current_number is None or number == current_number + 1 or not match.group(2):
+            return True, number
+        return False, None
+    
+    if CAPITALS_HEADING_PATTERN.match(line) and sum(c.isalpha() for c in stripped) >= 4:
+        return True, None
+    
+    if previous_blank and TITLE_HEADING_PATTERN.match(line) and len(stripped.split()) <= 8:
+        words = [word for word in re.findall(r'[A-Za-z]+', stripped) if len(word) > 3]
+        if words and all(word[0].isupper() for word in words):
+            return True, None
+    
+    return False, None
+
+
+def parse_section_number(value: str) -> Optional[int]:
+    """Number of a section from its digits, roman numeral or letter."""
+    if value.isdigit():
+        return int(value)
+    if all(c in ROMAN_NUMERALS for c in value):
+        total = 0
+        for index, c in enumerate(value):
+            digit = ROMAN_NUMERALS[c]
+            if index + 1 < len(value) and ROMAN_NUMERALS[value[index + 1]] > digit:
+                total -= digit
+            else:
+                total += digit
+        return total
+    if len(value) == 1 and value.isalpha():
+        return ord(value.upper()) - ord('A') + 1
+    return None
+
+
+def classify_section(heading: str, text: str) -> List[str]:
+    """
+    Clause types of a section: those named in its heading, and those with
+    at least MIN_BODY_MATCHES keyword matches in its text.
+    
+    Returns:
+        Matching SECTION_TYPES, or ['other'] when none match
+    """
+    types = []
+    for section_type in SECTION_TYPES:
+        pattern = SECTION_KEYWORDS[section_type]
+        if pattern.search(heading):
+            types.append(section_type)
+            continue
+        matches = 0
+        for _ in pattern.finditer(text):
+            matches += 1
+            if matches >= MIN_BODY_MATCHES:
+                types.append(section_type)
+                break
+    return types or ['other']
+
+
+def section_outline(sections: List[Dict[str, Any]], max_chars: int = 4000) -> str:
+    """Headings of the sections with their clause types, one per line."""
+    lines = []
+    size = 0
+    for section in sections:
+        line = f"- {section['heading'] or '(preamble)'} [{', '.join(section['types'])}]"
+        size += len(line) + 1
+        if size > max_chars:
+            lines.append(f"- ... {len(sections) - len(lines)} more sections")
+            break
+        lines.append(line)
+    return '\n'.join(lines)
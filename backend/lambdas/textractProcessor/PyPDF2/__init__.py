@@ -10,6 +10,7 @@ You can read the full docs at https://pypdf2.readthedocs.io/.
 import warnings
 
 from ._encryption import PasswordType
+from ._layout import TextRuns
 from ._merger import PdfFileMerger, PdfMerger
 from ._page import PageObject, Transformation
 from ._reader import DocumentInformation, PdfFileReader, PdfReader
@@ -38,4 +39,5 @@ __all__ = [
     "Transformation",
     "PageObject",
     "PasswordType",
+    "TextRuns",
 ]
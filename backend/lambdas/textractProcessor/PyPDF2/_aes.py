@@ -0,0 +1,286 @@
+"""
+Pure-Python AES, used to read AES encrypted documents when no C
+implementation (PyCryptodome or cryptography) is installed.
+
+The cipher works on 32-bit words with precomputed round tables, following
+the reference implementation of FIPS-197. The tables are built the first
+time a key is used.
+"""
+
+from typing import List, Optional, Tuple
+
+_Tables = Tuple[
+    List[int],
+    List[int],
+    List[List[int]],
+    List[List[int]],
+]
+_tables: Optional[_Tables] = None
+
+
+def _build_tables() -> _Tables:
+    global _tables
+    if _tables is not None:
+        return _tables
+
+    def xtime(a: int) -> int:
+        a <<= 1
+        return a ^ 0x11B if a & 0x100 else a
+
+    def mul(a: int, b: int) -> int:
+        result = 0
+        while b:
+            if b & 1:
+                result ^= a
+            a = xtime(a)
+            b >>= 1
+        return result
+
+    # multiplicative inverses in GF(2^8), through powers of the generator 3
+    exp = [0] * 255
+    log = [0] * 256
+    value = 1
+    for i in range(255):
+        exp[i] = value
+        log[value] = i
+        value ^= xtime(value)
+    sbox = [0] * 256
+    for x in range(256):
+        inv = exp[(255 - log[x]) % 255] if x else 0
+        s = inv
+        for shift in range(1, 5):
+            s ^= ((inv << shift) | (inv >> (8 - shift))) & 0xFF
+        sbox[x] = s ^ 0x63
+    inv_sbox = [0] * 256
+    for x, s in enumerate(sbox):
+        inv_sbox[s] = x
+
+    te0 = []
+    td0 = []
+    for x in range(256):
+        s = sbox[x]
+        te0.append((mul(s, 2) << 24) | (s << 16) | (s << 8) | mul(s, 3))
+        s = inv_sbox[x]
+        td0.append(
+            (mul(s, 14) << 24) | (mul(s, 9) << 16) | (mul(s, 13) << 8) | mul(s, 11)
+        )
+
+    def rotations(table: List[int]) -> List[List[int]]:
+        result = [table]
+        for _ in range(3):
+            table = [((t >> 8) | (t << 24)) & 0xFFFFFFFF for t in table]
+            result.append(table)
+        return result
+
+    _tables = (sbox, inv_sbox, rotations(te0), rotations(td0))
+    return _tables
+
+
+class AES:
+    """
+    AES block cipher with a 128, 192 or 256 bit key.
+
+    :param key: The key, 16, 24 or 32 bytes long.
+    """
+
+    def __init__(self, key: bytes) -> None:
+        if len(key) not in (16, 24, 32):
+            raise ValueError(f"Incorrect AES key length ({len(key)} bytes)")
+        sbox, _, _, (td0, td1, td2, td3) = _build_tables()
+        nk = len(key) // 4
+        self.rounds = nk + 6
+        words = [int.from_bytes(key[4 * i : 4 * i + 4], "big") for i in range(nk)]
+        rcon = 1
+        for i in range(nk, 4 * (self.rounds + 1)):
+            t = words[-1]
+            if i % nk == 0:
+                t = (
+                    (sbox[(t >> 16) & 0xFF] << 24)
+                    | (sbox[(t >> 8) & 0xFF] << 16)
+                    | (sbox[t & 0xFF] << 8)
+                    | sbox[t >> 24]
+                ) ^ (rcon << 24)
+                rcon = rcon << 1 ^ (0x11B if rcon & 0x80 else 0)
+            elif nk > 6 and i % nk == 4:
+                t = (
+                    (sbox[t >> 24] << 24)
+                    | (sbox[(t >> 16) & 0xFF] << 16)
+                    | (sbox[(t >> 8) & 0xFF] << 8)
+                    | sbox[t & 0xFF]
+                )
+            words.append(words[i - nk] ^ t)
+        self._encrypt_keys = words
+
+        # round keys of the equivalent inverse cipher: the encryption round
+        # keys in reverse order, with InvMixColumns applied to the inner ones
+        decrypt_keys = []
+        for r in range(self.rounds, -1, -1):
+            round_key = words[4 * r : 4 * r + 4]
+            if 0 < r < self.rounds:
+                round_key = [
+                    td0[sbox[w >> 24]]
+                    ^ td1[sbox[(w >> 16) & 0xFF]]
+                    ^ td2[sbox[(w >> 8) & 0xFF]]
+                    ^ td3[sbox[w & 0xFF]]
+                    for w in round_key
+                ]
+            decrypt_keys.extend(round_key)
+        self._decrypt_keys = decrypt_keys
+
+    def encrypt_block(self, block: int) -> int:
+        """Encrypt a block given as a 128-bit big-endian integer."""
+        sbox, _, (te0, te1, te2, te3), _ = _build_tables()
+        rk = self._encrypt_keys
+        s0 = (block >> 96) ^ rk[0]
+        s1 = ((block >> 64) & 0xFFFFFFFF) ^ rk[1]
+        s2 = ((block >> 32) & 0xFFFFFFFF) ^ rk[2]
+        s3 = (block & 0xFFFFFFFF) ^ rk[3]
+        for k in range(4, 4 * self.rounds, 4):
+            s0, s1, s2, s3 = (
+                te0[s0 >> 24]
+                ^ te1[(s1 >> 16) & 0xFF]
+                ^ te2[(s2 >> 8) & 0xFF]
+                ^ te3[s3 & 0xFF]
+                ^ rk[k],
+                te0[s1 >> 24]
+                ^ te1[(s2 >> 16) & 0xFF]
+                ^ te2[(s3 >> 8) & 0xFF]
+                ^ te3[s0 & 0xFF]
+                ^ rk[k + 1],
+                te0[s2 >> 24]
+                ^ te1[(s3 >> 16) & 0xFF]
+                ^ te2[(s0 >> 8) & 0xFF]
+                ^ te3[s1 & 0xFF]
+                ^ rk[k + 2],
+                te0[s3 >> 24]
+                ^ te1[(s0 >> 16) & 0xFF]
+                ^ te2[(s1 >> 8) & 0xFF]
+                ^ te3[s2 & 0xFF]
+                ^ rk[k + 3],
+            )
+        k = 4 * self.rounds
+        return (
+            (
+                (sbox[s0 >> 24] << 120)
+                | (sbox[(s1 >> 16) & 0xFF] << 112)
+                | (sbox[(s2 >> 8) & 0xFF] << 104)
+                | (sbox[s3 & 0xFF] << 96)
+                | (sbox[s1 >> 24] << 88)
+                | (sbox[(s2 >> 16) & 0xFF] << 80)
+                | (sbox[(s3 >> 8) & 0xFF] << 72)
+                | (sbox[s0 & 0xFF] << 64)
+                | (sbox[s2 >> 24] << 56)
+                | (sbox[(s3 >> 16) & 0xFF] << 48)
+                | (sbox[(s0 >> 8) & 0xFF] << 40)
+                | (sbox[s1 & 0xFF] << 32)
+                | (sbox[s3 >> 24] << 24)
+                | (sbox[(s0 >> 16) & 0xFF] << 16)
+                | (sbox[(s1 >> 8) & 0xFF] << 8)
+                | sbox[s2 & 0xFF]
+            )
+            ^ (rk[k] << 96)
+            ^ (rk[k + 1] << 64)
+            ^ (rk[k + 2] << 32)
+            ^ rk[k + 3]
+        )
+
+    def decrypt_block(self, block: int) -> int:
+        """Decrypt a block given as a 128-bit big-endian integer."""
+        _, inv_sbox, _, (td0, td1, td2, td3) = _build_tables()
+        rk = self._decrypt_keys
+        s0 = (block >> 96) ^ rk[0]
+        s1 = ((block >> 64) & 0xFFFFFFFF) ^ rk[1]
+        s2 = ((block >> 32) & 0xFFFFFFFF) ^ rk[2]
+        s3 = (block & 0xFFFFFFFF) ^ rk[3]
+        for k in range(4, 4 * self.rounds, 4):
+            s0, s1, s2, s3 = (
+                td0[s0 >> 24]
+                ^ td1[(s3 >> 16) & 0xFF]
+                ^ td2[(s2 >> 8) & 0xFF]
+                ^ td3[s1 & 0xFF]
+                ^ rk[k],
+                td0[s1 >> 24]
+                ^ td1[(s0 >> 16) & 0xFF]
+                ^ td2[(s3 >> 8) & 0xFF]
+                ^ td3[s2 & 0xFF]
+                ^ rk[k + 1],
+                td0[s2 >> 24]
+                ^ td1[(s1 >> 16) & 0xFF]
+                ^ td2[(s0 >> 8) & 0xFF]
+                ^ td3[s3 & 0xFF]
+                ^ rk[k + 2],
+                td0[s3 >> 24]
+                ^ td1[(s2 >> 16) & 0xFF]
+                ^ td2[(s1 >> 8) & 0xFF]
+                ^ td3[s0 & 0xFF]
+                ^ rk[k + 3],
+            )
+        k = 4 * self.rounds
+        return (
+            (
+                (inv_sbox[s0 >> 24] << 120)
+                | (inv_sbox[(s3 >> 16) & 0xFF] << 112)
+                | (inv_sbox[(s2 >> 8) & 0xFF] << 104)
+                | (inv_sbox[s1 & 0xFF] << 96)
+                | (inv_sbox[s1 >> 24] << 88)
+                | (inv_sbox[(s0 >> 16) & 0xFF] << 80)
+                | (inv_sbox[(s3 >> 8) & 0xFF] << 72)
+                | (inv_sbox[s2 & 0xFF] << 64)
+                | (inv_sbox[s2 >> 24] << 56)
+                | (inv_sbox[(s1 >> 16) & 0xFF] << 48)
+                | (inv_sbox[(s0 >> 8) & 0xFF] << 40)
+                | (inv_sbox[s3 & 0xFF] << 32)
+                | (inv_sbox[s3 >> 24] << 24)
+                | (inv_sbox[(s2 >> 16) & 0xFF] << 16)
+                | (inv_sbox[(s1 >> 8) & 0xFF] << 8)
+                | inv_sbox[s0 & 0xFF]
+            )
+            ^ (rk[k] << 96)
+            ^ (rk[k + 1] << 64)
+            ^ (rk[k + 2] << 32)
+            ^ rk[k + 3]
+        )
+
+    def ecb_encrypt(self, data: bytes) -> bytes:
+        _check_length(data)
+        encrypt_block = self.encrypt_block
+        return b"".join(
+            encrypt_block(int.from_bytes(data[i : i + 16], "big")).to_bytes(16, "big")
+            for i in range(0, len(data), 16)
+        )
+
+    def ecb_decrypt(self, data: bytes) -> bytes:
+        _check_length(data)
+        decrypt_block = self.decrypt_block
+        return b"".join(
+            decrypt_block(int.from_bytes(data[i : i + 16], "big")).to_bytes(16, "big")
+            for i in range(0, len(data), 16)
+        )
+
+    def cbc_encrypt(self, iv: bytes, data: bytes) -> bytes:
+        _check_length(data)
+        encrypt_block = self.encrypt_block
+        out = bytearray(len(data))
+        previous = int.from_bytes(iv, "big")
+        for i in range(0, len(data), 16):
+            previous = encrypt_block(
+                int.from_bytes(data[i : i + 16], "big") ^ previous
+            )
+            out[i : i + 16] = previous.to_bytes(16, "big")
+        return bytes(out)
+
+    def cbc_decrypt(self, iv: bytes, data: bytes) -> bytes:
+        _check_length(data)
+        decrypt_block = self.decrypt_block
+        out = bytearray(len(data))
+        previous = int.from_bytes(iv, "big")
+        for i in range(0, len(data), 16):
+            block = int.from_bytes(data[i : i + 16], "big")
+            out[i : i + 16] = (decrypt_block(block) ^ previous).to_bytes(16, "big")
+            previous = block
+        return bytes(out)
+
+
+def _check_length(data: bytes) -> None:
+    if len(data) % 16:
+        raise ValueError("Data must be aligned to the 16 bytes AES block size")
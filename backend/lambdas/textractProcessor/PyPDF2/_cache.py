@@ -0,0 +1,143 @@
+"""Bounded caches used while reading PDF files."""
+
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    Optional,
+    Tuple,
+)
+
+
+class LRUCache:
+    """
+    Dictionary-like cache with a byte budget and least-recently-used eviction.
+
+    Entries for which ``pin`` returns ``True`` are never evicted; they are
+    still accounted for in :attr:`current_bytes`. Sizes are re-measured
+    whenever an entry is hit, so data attached to a cached value after it
+    was stored (like the decoded data of a stream) counts towards the budget.
+
+    :param max_bytes: The byte budget for unpinned entries. ``None`` means
+        unbounded: nothing is evicted, but sizes are still measured so that
+        :attr:`current_bytes` reports the memory held.
+    :param sizeof: Callable estimating the size in bytes of a cached value.
+    :param pin: Callable deciding if a value must stay in the cache for the
+        lifetime of the cache.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        pin: Optional[Callable[[Any], bool]] = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self._sizeof: Callable[[Any], int] = sizeof or (lambda _value: 1)
+        self._pin = pin
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._pinned: Dict[Hashable, Tuple[Any, int]] = {}
+        self.current_bytes = 0
+        self.pinned_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key in self._pinned:
+            self.hits += 1
+            return self._pinned[key][0]
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        value, size = entry
+        new_size = self._sizeof(value)
+        if new_size != size:
+            self._entries[key] = (value, new_size)
+            self.current_bytes += new_size - size
+            self._evict(keep=key)
+        return value
+
+    def __getitem__(self, key: Hashable) -> Any:
+        if key in self._pinned:
+            return self._pinned[key][0]
+        return self._entries[key][0]
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        if key in self:
+            del self[key]
+        size = self._sizeof(value)
+        self.current_bytes += size
+        if self._pin is not None and self._pin(value):
+            self._pinned[key] = (value, size)
+            self.pinned_bytes += size
+            return
+        self._entries[key] = (value, size)
+        self._evict(keep=key)
+
+    def __delitem__(self, key: Hashable) -> None:
+        if key in self._pinned:
+            _, size = self._pinned.pop(key)
+            self.pinned_bytes -= size
+        else:
+            _, size = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._pinned or key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._pinned) + len(self._entries)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        yield from list(self._pinned)
+        yield from list(self._entries)
+
+    def keys(self) -> Iterator[Hashable]:
+        return iter(self)
+
+    def values(self) -> Iterator[Any]:
+        for key in self:
+            yield self[key]
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        for key in self:
+            yield key, self[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._pinned.clear()
+        self.current_bytes = 0
+        self.pinned_bytes = 0
+
+    def _evict(self, keep: Optional[Hashable] = None) -> None:
+        if self.max_bytes is None:
+            return
+        while self.current_bytes - self.pinned_bytes > self.max_bytes:
+            key = next(iter(self._entries), None)
+            if key is None or key == keep:
+                # a single entry larger than the budget stays until the
+                # next insertion pushes it out
+                break
+            _, size = self._entries.pop(key)
+            self.current_bytes -= size
+            self.evictions += 1
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Counters and memory usage of the cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self),
+            "pinned_entries": len(self._pinned),
+            "current_bytes": self.current_bytes,
+            "pinned_bytes": self.pinned_bytes,
+        }
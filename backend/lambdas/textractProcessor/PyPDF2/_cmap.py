@@ -3,7 +3,8 @@ from binascii import unhexlify
 from math import ceil
 from typing import Any, Dict, List, Tuple, Union, cast
 
-from ._codecs import adobe_glyphs, charset_encoding
+from . import _codecs
+from ._codecs import charset_encoding
 from ._utils import logger_warning
 from .errors import PdfReadWarning
 from .generic import DecodedStreamObject, DictionaryObject, StreamObject
@@ -156,6 +157,7 @@ def parse_encoding(
     else:
         encoding = charset_encoding["/StandardCoding"].copy()
     if "/Differences" in enc:
+        adobe_glyphs = _codecs.adobe_glyphs
         x: int = 0
         o: Union[int, str]
         for o in cast(DictionaryObject, cast(DictionaryObject, enc)["/Differences"]):
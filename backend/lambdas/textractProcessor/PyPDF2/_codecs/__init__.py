@@ -1,6 +1,5 @@
-from typing import Dict, List
+from typing import Any, Dict, List
 
-from .adobe_glyphs import adobe_glyphs
 from .pdfdoc import _pdfdoc_encoding
 from .std import _std_encoding
 from .symbol import _symbol_encoding
@@ -50,6 +49,18 @@ charset_encoding: Dict[str, List[str]] = {
     "/ZapfDingbats": _zapfding_encoding,
 }
 
+
+def __getattr__(name: str) -> Any:
+    # adobe_glyphs is a large table only needed by fonts with /Differences,
+    # so it is imported on first access rather than with the package
+    if name == "adobe_glyphs":
+        from .adobe_glyphs import adobe_glyphs
+
+        globals()[name] = adobe_glyphs
+        return adobe_glyphs
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     "adobe_glyphs",
     "_std_encoding",
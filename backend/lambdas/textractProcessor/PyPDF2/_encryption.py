@@ -25,14 +25,15 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import functools
 import hashlib
 import random
 import struct
 from enum import IntEnum
 from typing import Any, Dict, Optional, Tuple, Union, cast
 
+from ._cache import LRUCache
 from ._utils import logger_warning
-from .errors import DependencyError
 from .generic import (
     ArrayObject,
     ByteStringObject,
@@ -56,42 +57,35 @@ class CryptIdentity(CryptBase):
     pass
 
 
+def _rc4_python(key: bytes, data: bytes) -> bytes:
+    S = list(range(256))
+    key_length = len(key)
+    j = 0
+    for i in range(256):
+        j = (j + S[i] + key[i % key_length]) & 255
+        S[i], S[j] = S[j], S[i]
+    n = len(data)
+    keystream = bytearray(n)
+    i = j = 0
+    for k in range(n):
+        i = (i + 1) & 255
+        si = S[i]
+        j = (j + si) & 255
+        sj = S[j]
+        S[i] = sj
+        S[j] = si
+        keystream[k] = S[(si + sj) & 255]
+    # xor the whole buffer at once instead of byte by byte
+    return (
+        int.from_bytes(data, "little") ^ int.from_bytes(keystream, "little")
+    ).to_bytes(n, "little")
+
+
+# The ciphers use the first C implementation available: PyCryptodome, then
+# cryptography, and a pure Python one otherwise. RC4 is only taken from
+# cryptography where it is not deprecated.
 try:
     from Crypto.Cipher import AES, ARC4  # type: ignore[import]
-    from Crypto.Util.Padding import pad  # type: ignore[import]
-
-    class CryptRC4(CryptBase):
-        def __init__(self, key: bytes) -> None:
-            self.key = key
-
-        def encrypt(self, data: bytes) -> bytes:
-            return ARC4.ARC4Cipher(self.key).encrypt(data)
-
-        def decrypt(self, data: bytes) -> bytes:
-            return ARC4.ARC4Cipher(self.key).decrypt(data)
-
-    class CryptAES(CryptBase):
-        def __init__(self, key: bytes) -> None:
-            self.key = key
-
-        def encrypt(self, data: bytes) -> bytes:
-            iv = bytes(bytearray(random.randint(0, 255) for _ in range(16)))
-            p = 16 - len(data) % 16
-            data += bytes(bytearray(p for _ in range(p)))
-            aes = AES.new(self.key, AES.MODE_CBC, iv)
-            return iv + aes.encrypt(data)
-
-        def decrypt(self, data: bytes) -> bytes:
-            iv = data[:16]
-            data = data[16:]
-            aes = AES.new(self.key, AES.MODE_CBC, iv)
-            if len(data) % 16:
-                data = pad(data, 16)
-            d = aes.decrypt(data)
-            if len(d) == 0:
-                return d
-            else:
-                return d[: -d[-1]]
 
     def RC4_encrypt(key: bytes, data: bytes) -> bytes:
         return ARC4.ARC4Cipher(key).encrypt(data)
@@ -112,57 +106,103 @@ try:
         return AES.new(key, AES.MODE_CBC, iv).decrypt(data)
 
 except ImportError:
+    try:
+        from cryptography.hazmat.primitives.ciphers import (  # type: ignore[import]
+            Cipher,
+            algorithms,
+            modes,
+        )
 
-    class CryptRC4(CryptBase):  # type: ignore
-        def __init__(self, key: bytes) -> None:
-            self.S = list(range(256))
-            j = 0
-            for i in range(256):
-                j = (j + self.S[i] + key[i % len(key)]) % 256
-                self.S[i], self.S[j] = self.S[j], self.S[i]
-
-        def encrypt(self, data: bytes) -> bytes:
-            S = list(self.S)
-            out = list(0 for _ in range(len(data)))
-            i, j = 0, 0
-            for k in range(len(data)):
-                i = (i + 1) % 256
-                j = (j + S[i]) % 256
-                S[i], S[j] = S[j], S[i]
-                x = S[(S[i] + S[j]) % 256]
-                out[k] = data[k] ^ x
-            return bytes(bytearray(out))
-
-        def decrypt(self, data: bytes) -> bytes:
-            return self.encrypt(data)
-
-    class CryptAES(CryptBase):  # type: ignore
-        def __init__(self, key: bytes) -> None:
-            pass
-
-        def encrypt(self, data: bytes) -> bytes:
-            raise DependencyError("PyCryptodome is required for AES algorithm")
-
-        def decrypt(self, data: bytes) -> bytes:
-            raise DependencyError("PyCryptodome is required for AES algorithm")
+        try:
+            from cryptography.hazmat.decrepit.ciphers.algorithms import (  # type: ignore[import]
+                ARC4 as _ARC4,
+            )
 
-    def RC4_encrypt(key: bytes, data: bytes) -> bytes:
-        return CryptRC4(key).encrypt(data)
+            def RC4_encrypt(key: bytes, data: bytes) -> bytes:
+                return Cipher(_ARC4(key), mode=None).encryptor().update(data)
 
-    def RC4_decrypt(key: bytes, data: bytes) -> bytes:
-        return CryptRC4(key).decrypt(data)
+        except ImportError:
 
-    def AES_ECB_encrypt(key: bytes, data: bytes) -> bytes:
-        raise DependencyError("PyCryptodome is required for AES algorithm")
+            def RC4_encrypt(key: bytes, data: bytes) -> bytes:
+                return _rc4_python(key, data)
 
-    def AES_ECB_decrypt(key: bytes, data: bytes) -> bytes:
-        raise DependencyError("PyCryptodome is required for AES algorithm")
+        def RC4_decrypt(key: bytes, data: bytes) -> bytes:
+            return RC4_encrypt(key, data)
 
-    def AES_CBC_encrypt(key: bytes, iv: bytes, data: bytes) -> bytes:
-        raise DependencyError("PyCryptodome is required for AES algorithm")
+        def AES_ECB_encrypt(key: bytes, data: bytes) -> bytes:
+            encryptor = Cipher(algorithms.AES(key), modes.ECB()).encryptor()
+            return encryptor.update(data) + encryptor.finalize()
 
-    def AES_CBC_decrypt(key: bytes, iv: bytes, data: bytes) -> bytes:
-        raise DependencyError("PyCryptodome is required for AES algorithm")
+        def AES_ECB_decrypt(key: bytes, data: bytes) -> bytes:
+            decryptor = Cipher(algorithms.AES(key), modes.ECB()).decryptor()
+            return decryptor.update(data) + decryptor.finalize()
+
+        def AES_CBC_encrypt(key: bytes, iv: bytes, data: bytes) -> bytes:
+            encryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).encryptor()
+            return encryptor.update(data) + encryptor.finalize()
+
+        def AES_CBC_decrypt(key: bytes, iv: bytes, data: bytes) -> bytes:
+            decryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).decryptor()
+            return decryptor.update(data) + decryptor.finalize()
+
+    except ImportError:
+        from ._aes import AES as _AES
+
+        # the key schedule is costly in Python, and a document uses few keys
+        # at a time
+        _aes_cipher = functools.lru_cache(maxsize=64)(_AES)
+
+        def RC4_encrypt(key: bytes, data: bytes) -> bytes:
+            return _rc4_python(key, data)
+
+        def RC4_decrypt(key: bytes, data: bytes) -> bytes:
+            return _rc4_python(key, data)
+
+        def AES_ECB_encrypt(key: bytes, data: bytes) -> bytes:
+            return _aes_cipher(key).ecb_encrypt(data)
+
+        def AES_ECB_decrypt(key: bytes, data: bytes) -> bytes:
+            return _aes_cipher(key).ecb_decrypt(data)
+
+        def AES_CBC_encrypt(key: bytes, iv: bytes, data: bytes) -> bytes:
+            return _aes_cipher(key).cbc_encrypt(iv, data)
+
+        def AES_CBC_decrypt(key: bytes, iv: bytes, data: bytes) -> bytes:
+            return _aes_cipher(key).cbc_decrypt(iv, data)
+
+
+class CryptRC4(CryptBase):
+    def __init__(self, key: bytes) -> None:
+        self.key = key
+
+    def encrypt(self, data: bytes) -> bytes:
+        return RC4_encrypt(self.key, data)
+
+    def decrypt(self, data: bytes) -> bytes:
+        return RC4_decrypt(self.key, data)
+
+
+class CryptAES(CryptBase):
+    def __init__(self, key: bytes) -> None:
+        self.key = key
+
+    def encrypt(self, data: bytes) -> bytes:
+        iv = bytes(bytearray(random.randint(0, 255) for _ in range(16)))
+        p = 16 - len(data) % 16
+        data += bytes(bytearray(p for _ in range(p)))
+        return iv + AES_CBC_encrypt(self.key, iv, data)
+
+    def decrypt(self, data: bytes) -> bytes:
+        iv = data[:16]
+        data = data[16:]
+        if len(data) % 16:
+            p = 16 - len(data) % 16
+            data += bytes((p,)) * p
+        d = AES_CBC_decrypt(self.key, iv, data)
+        if len(d) == 0:
+            return d
+        else:
+            return d[: -d[-1]]
 
 
 class CryptFilter:
@@ -672,6 +712,10 @@ class AlgV5:
         return perms
 
 
+# number of objects for which Encryption keeps the derived keys
+_CRYPT_FILTER_CACHE_ENTRIES = 4096
+
+
 class PasswordType(IntEnum):
     NOT_DECRYPTED = 0
     USER_PASSWORD = 1
@@ -703,6 +747,8 @@ class Encryption:
         # 2 => user password
         self._password_type = PasswordType.NOT_DECRYPTED
         self._key: Optional[bytes] = None
+        # (idnum, generation) -> CryptFilter
+        self._crypt_filters = LRUCache(_CRYPT_FILTER_CACHE_ENTRIES)
 
     def is_decrypted(self) -> bool:
         return self._password_type != PasswordType.NOT_DECRYPTED
@@ -737,6 +783,13 @@ class Encryption:
            stored as the first 16 bytes of the encrypted stream or string.
            The output is the encrypted data to be stored in the PDF file.
         """
+        cf = self._crypt_filters.get((idnum, generation))
+        if cf is None:
+            cf = self._get_crypt_filter(idnum, generation)
+            self._crypt_filters[(idnum, generation)] = cf
+        return cf.decrypt_object(obj)
+
+    def _get_crypt_filter(self, idnum: int, generation: int) -> CryptFilter:
         pack1 = struct.pack("<i", idnum)[:3]
         pack2 = struct.pack("<i", generation)[:2]
 
@@ -753,12 +806,13 @@ class Encryption:
         # for AES-256
         aes256_key = key
 
-        stmCrypt = self._get_crypt(self.StmF, rc4_key, aes128_key, aes256_key)
-        StrCrypt = self._get_crypt(self.StrF, rc4_key, aes128_key, aes256_key)
-        efCrypt = self._get_crypt(self.EFF, rc4_key, aes128_key, aes256_key)
-
-        cf = CryptFilter(stmCrypt, StrCrypt, efCrypt)
-        return cf.decrypt_object(obj)
+        crypts: Dict[str, CryptBase] = {}
+        for method in (self.StmF, self.StrF, self.EFF):
+            if method not in crypts:
+                crypts[method] = self._get_crypt(
+                    method, rc4_key, aes128_key, aes256_key
+                )
+        return CryptFilter(crypts[self.StmF], crypts[self.StrF], crypts[self.EFF])
 
     @staticmethod
     def _get_crypt(
@@ -786,6 +840,7 @@ class Encryption:
         if rc != PasswordType.NOT_DECRYPTED:
             self._password_type = rc
             self._key = key
+            self._crypt_filters.clear()
         return rc
 
     def verify_v4(self, password: bytes) -> Tuple[bytes, PasswordType]:
@@ -27,7 +27,9 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import functools
 import math
+import re
 import uuid
 import warnings
 from decimal import Decimal
@@ -46,6 +48,8 @@ from typing import (
 )
 
 from ._cmap import build_char_map, unknown_char_map
+from ._layout import TextRuns
+from ._profile import profile_phase
 from ._protocols import PdfReaderProtocol
 from ._utils import (
     CompressedTransformationMatrix,
@@ -1310,6 +1314,7 @@ class PageObject(DictionaryObject):
         visitor_operand_before: Optional[Callable[[Any, Any, Any, Any], None]] = None,
         visitor_operand_after: Optional[Callable[[Any, Any, Any, Any], None]] = None,
         visitor_text: Optional[Callable[[Any, Any, Any, Any, Any], None]] = None,
+        visitor_run: Optional[Callable[[str, float, float, float], None]] = None,
     ) -> str:
         """
         See extract_text for most arguments.
@@ -1318,9 +1323,46 @@ class PageObject(DictionaryObject):
             content_key: indicate the default key where to extract data
                 None = the object; this allow to reuse the function on XObject
                 default = "/Content"
+            visitor_run: function called with the text, x, y and font size
+                of the text shown by each text showing operator
+        """
+        fragments = self._iter_text(
+            obj,
+            pdf,
+            orientations,
+            space_width,
+            content_key,
+            visitor_operand_before,
+            visitor_operand_after,
+            visitor_text,
+            visitor_run,
+        )
+        profiler = getattr(pdf, "profiler", None)
+        if profiler is not None:
+            fragments = profiler.iterate("text_ops", fragments)
+        return "".join(fragments)
+
+    def _iter_text(
+        self,
+        obj: Any,
+        pdf: Any,
+        orientations: Tuple[int, ...] = (0, 90, 180, 270),
+        space_width: float = 200.0,
+        content_key: Optional[str] = PG.CONTENTS,
+        visitor_operand_before: Optional[Callable[[Any, Any, Any, Any], None]] = None,
+        visitor_operand_after: Optional[Callable[[Any, Any, Any, Any], None]] = None,
+        visitor_text: Optional[Callable[[Any, Any, Any, Any, Any], None]] = None,
+        visitor_run: Optional[Callable[[str, float, float, float], None]] = None,
+    ) -> Iterator[str]:
+        """
+        Generator behind _extract_text: the text is yielded in fragments as
+        soon as the operators producing it have been processed.
         """
         text: str = ""
-        output: str = ""
+        # text extracted by the current operator, not yielded yet
+        fragments: List[str] = []
+        # last character of the text extracted so far
+        output_tail: str = ""
         rtl_dir: bool = False  # right-to-left
         cmaps: Dict[
             str,
@@ -1336,10 +1378,12 @@ class PageObject(DictionaryObject):
                 # if no parents we will have no /Resources will be available => an exception wil be raised
             resources_dict = cast(DictionaryObject, objr[PG.RESOURCES])
         except Exception:
-            return ""  # no resources means no text is possible (no font) we consider the file as not damaged, no need to check for TJ or Tj
+            return  # no resources means no text is possible (no font) we consider the file as not damaged, no need to check for TJ or Tj
+        profiler = getattr(pdf, "profiler", None)
         if "/Font" in resources_dict:
-            for f in cast(DictionaryObject, resources_dict["/Font"]):
-                cmaps[f] = build_char_map(f, space_width, obj)
+            with profile_phase(profiler, "cmap"):
+                for f in cast(DictionaryObject, resources_dict["/Font"]):
+                    cmaps[f] = build_char_map(f, space_width, obj)
         cmap: Tuple[
             Union[str, Dict[int, str]], Dict[str, str], str, Optional[DictionaryObject]
         ] = (
@@ -1353,9 +1397,10 @@ class PageObject(DictionaryObject):
                 obj[content_key].get_object() if isinstance(content_key, str) else obj
             )
             if not isinstance(content, ContentStream):
-                content = ContentStream(content, pdf, "bytes")
+                with profile_phase(profiler, "content_parse"):
+                    content = ContentStream(content, pdf, "bytes")
         except KeyError:  # it means no content can be extracted(certainly empty page)
-            return ""
+            return
         # Note: we check all strings are TextStringObjects.  ByteStringObjects
         # are strings where the byte->string encoding was unknown, so adding
         # them to the text here would be gibberish.
@@ -1397,12 +1442,36 @@ class PageObject(DictionaryObject):
             else:
                 return 270
 
+        # text of the current text showing operator, and its x, y and font
+        # size, for visitor_run
+        run_pieces: List[str] = []
+        run_origin: List[float] = [0.0, 0.0, 0.0]
+
+        def add_run_piece(piece: str, m: List[float]) -> None:
+            if not run_pieces:
+                run_origin[0] = m[4]
+                run_origin[1] = m[5]
+                run_origin[2] = font_size * math.sqrt(
+                    abs(m[0] * m[3]) + abs(m[1] * m[2])
+                )
+            run_pieces.append(piece)
+
+        def emit(fragment: str) -> None:
+            nonlocal output_tail
+            if fragment:
+                fragments.append(fragment)
+                output_tail = fragment[-1]
+
+        def last_char() -> str:
+            # same as (output + text)[-1] without keeping the whole output
+            return text[-1] if text else output_tail[-1]
+
         def current_spacewidth() -> float:
             # return space_scale * _space_width * char_scale
             return _space_width / 1000.0
 
         def process_operation(operator: bytes, operands: List) -> None:
-            nonlocal cm_matrix, cm_stack, tm_matrix, tm_prev, output, text, char_scale, space_scale, _space_width, TL, font_size, cmap, orientations, rtl_dir, visitor_text
+            nonlocal cm_matrix, cm_stack, tm_matrix, tm_prev, text, char_scale, space_scale, _space_width, TL, font_size, cmap, orientations, rtl_dir, visitor_text
             global CUSTOM_RTL_MIN, CUSTOM_RTL_MAX, CUSTOM_RTL_SPECIAL_CHARS
 
             check_crlf_space: bool = False
@@ -1410,7 +1479,7 @@ class PageObject(DictionaryObject):
             if operator == b"BT":
                 tm_matrix = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
                 # tm_prev = tm_matrix
-                output += text
+                emit(text)
                 if visitor_text is not None:
                     visitor_text(text, cm_matrix, tm_matrix, cmap[3], font_size)
                 # based
@@ -1419,7 +1488,7 @@ class PageObject(DictionaryObject):
                 text = ""
                 return None
             elif operator == b"ET":
-                output += text
+                emit(text)
                 if visitor_text is not None:
                     visitor_text(text, cm_matrix, tm_matrix, cmap[3], font_size)
                 text = ""
@@ -1452,7 +1521,7 @@ class PageObject(DictionaryObject):
                     cm_matrix = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
                 # rtl_dir = False
             elif operator == b"cm":
-                output += text
+                emit(text)
                 if visitor_text is not None:
                     visitor_text(text, cm_matrix, tm_matrix, cmap[3], font_size)
                 text = ""
@@ -1477,7 +1546,7 @@ class PageObject(DictionaryObject):
                 TL = float(operands[0])
             elif operator == b"Tf":
                 if text != "":
-                    output += text  # .translate(cmap)
+                    emit(text)  # .translate(cmap)
                     if visitor_text is not None:
                         visitor_text(text, cm_matrix, tm_matrix, cmap[3], font_size)
                 text = ""
@@ -1537,6 +1606,8 @@ class PageObject(DictionaryObject):
                 if orientation in orientations:
                     if isinstance(operands[0], str):
                         text += operands[0]
+                        if visitor_run is not None:
+                            add_run_piece(operands[0], m)
                     else:
                         t: str = ""
                         tt: bytes = (
@@ -1561,10 +1632,11 @@ class PageObject(DictionaryObject):
                                     for x in tt
                                 ]
                             )
+                        mapped = "".join([cmap[1][x] if x in cmap[1] else x for x in t])
+                        if visitor_run is not None:
+                            add_run_piece(mapped, m)
                         # "\u0590 - \u08FF \uFB50 - \uFDFF"
-                        for x in "".join(
-                            [cmap[1][x] if x in cmap[1] else x for x in t]
-                        ):
+                        for x in mapped:
                             xx = ord(x)
                             # fmt: off
                             if (  # cases where the current inserting order is kept (punctuation,...)
@@ -1585,7 +1657,7 @@ class PageObject(DictionaryObject):
                                 if not rtl_dir:
                                     rtl_dir = True
                                     # print("RTL",text,"*")
-                                    output += text
+                                    emit(text)
                                     if visitor_text is not None:
                                         visitor_text(text, cm_matrix, tm_matrix, cmap[3], font_size)
                                     text = ""
@@ -1595,7 +1667,7 @@ class PageObject(DictionaryObject):
                                 if rtl_dir:
                                     rtl_dir = False
                                     # print("LTR",text,"*")
-                                    output += text
+                                    emit(text)
                                     if visitor_text is not None:
                                         visitor_text(text, cm_matrix, tm_matrix, cmap[3], font_size)
                                     text = ""
@@ -1616,8 +1688,8 @@ class PageObject(DictionaryObject):
                 try:
                     if orientation == 0:
                         if delta_y < -0.8 * f:
-                            if (output + text)[-1] != "\n":
-                                output += text + "\n"
+                            if last_char() != "\n":
+                                emit(text + "\n")
                                 if visitor_text is not None:
                                     visitor_text(
                                         text + "\n",
@@ -1631,12 +1703,12 @@ class PageObject(DictionaryObject):
                             abs(delta_y) < f * 0.3
                             and abs(delta_x) > current_spacewidth() * f * 15
                         ):
-                            if (output + text)[-1] != " ":
+                            if last_char() != " ":
                                 text += " "
                     elif orientation == 180:
                         if delta_y > 0.8 * f:
-                            if (output + text)[-1] != "\n":
-                                output += text + "\n"
+                            if last_char() != "\n":
+                                emit(text + "\n")
                                 if visitor_text is not None:
                                     visitor_text(
                                         text + "\n",
@@ -1650,12 +1722,12 @@ class PageObject(DictionaryObject):
                             abs(delta_y) < f * 0.3
                             and abs(delta_x) > current_spacewidth() * f * 15
                         ):
-                            if (output + text)[-1] != " ":
+                            if last_char() != " ":
                                 text += " "
                     elif orientation == 90:
                         if delta_x > 0.8 * f:
-                            if (output + text)[-1] != "\n":
-                                output += text + "\n"
+                            if last_char() != "\n":
+                                emit(text + "\n")
                                 if visitor_text is not None:
                                     visitor_text(
                                         text + "\n",
@@ -1669,12 +1741,12 @@ class PageObject(DictionaryObject):
                             abs(delta_x) < f * 0.3
                             and abs(delta_y) > current_spacewidth() * f * 15
                         ):
-                            if (output + text)[-1] != " ":
+                            if last_char() != " ":
                                 text += " "
                     elif orientation == 270:
                         if delta_x < -0.8 * f:
-                            if (output + text)[-1] != "\n":
-                                output += text + "\n"
+                            if last_char() != "\n":
+                                emit(text + "\n")
                                 if visitor_text is not None:
                                     visitor_text(
                                         text + "\n",
@@ -1688,11 +1760,13 @@ class PageObject(DictionaryObject):
                             abs(delta_x) < f * 0.3
                             and abs(delta_y) > current_spacewidth() * f * 15
                         ):
-                            if (output + text)[-1] != " ":
+                            if last_char() != " ":
                                 text += " "
                 except Exception:
                     pass
 
+        if profiler is not None:
+            profiler.count("operators", len(content.operations))
         for operands, operator in content.operations:
             if visitor_operand_before is not None:
                 visitor_operand_before(operator, operands, cm_matrix, tm_matrix)
@@ -1720,12 +1794,12 @@ class PageObject(DictionaryObject):
                         ):
                             process_operation(b"Tj", [" "])
             elif operator == b"Do":
-                output += text
+                emit(text)
                 if visitor_text is not None:
                     visitor_text(text, cm_matrix, tm_matrix, cmap[3], font_size)
                 try:
-                    if output[-1] != "\n":
-                        output += "\n"
+                    if output_tail[-1] != "\n":
+                        emit("\n")
                         if visitor_text is not None:
                             visitor_text("\n", cm_matrix, tm_matrix, cmap[3], font_size)
                 except IndexError:
@@ -1733,16 +1807,24 @@ class PageObject(DictionaryObject):
                 try:
                     xobj = resources_dict["/XObject"]
                     if xobj[operands[0]]["/Subtype"] != "/Image":  # type: ignore
-                        # output += text
-                        text = self.extract_xform_text(
-                            xobj[operands[0]],  # type: ignore
+                        # emit(text)
+                        form_run = None
+                        if visitor_run is not None:
+                            form_run = _transformed_run_visitor(
+                                visitor_run,
+                                xobj[operands[0]].get("/Matrix"),  # type: ignore
+                                cm_matrix,
+                            )
+                        text = self._extract_xform_text_cached(
+                            cast(DictionaryObject, xobj).raw_get(operands[0]),
                             orientations,
                             space_width,
                             visitor_operand_before,
                             visitor_operand_after,
                             visitor_text,
+                            form_run,
                         )
-                        output += text
+                        emit(text)
                         if visitor_text is not None:
                             visitor_text(text, cm_matrix, tm_matrix, cmap[3], font_size)
                 except Exception:
@@ -1756,10 +1838,18 @@ class PageObject(DictionaryObject):
                 process_operation(operator, operands)
             if visitor_operand_after is not None:
                 visitor_operand_after(operator, operands, cm_matrix, tm_matrix)
-        output += text  # just in case of
+            if run_pieces:
+                run_text = "".join(run_pieces)
+                if not run_text.isspace() and run_text:
+                    visitor_run(run_text, *run_origin)  # type: ignore
+                run_pieces.clear()
+            if fragments:
+                yield from fragments
+                fragments.clear()
+        emit(text)  # just in case of
         if text != "" and visitor_text is not None:
             visitor_text(text, cm_matrix, tm_matrix, cmap[3], font_size)
-        return output
+        yield from fragments
 
     def extract_text(
         self,
@@ -1771,6 +1861,8 @@ class PageObject(DictionaryObject):
         visitor_operand_before: Optional[Callable[[Any, Any, Any, Any], None]] = None,
         visitor_operand_after: Optional[Callable[[Any, Any, Any, Any], None]] = None,
         visitor_text: Optional[Callable[[Any, Any, Any, Any, Any], None]] = None,
+        text_runs: Optional[TextRuns] = None,
+        page_number: int = 0,
     ) -> str:
         """
         Locate all text drawing commands, in the order they are provided in the
@@ -1808,6 +1900,10 @@ class PageObject(DictionaryObject):
                 text matrix, font-dictionary and font-size.
                 The font-dictionary may be None in case of unknown fonts.
                 If not None it may e.g. contain key "/BaseFont" with value "/Arial,Bold".
+            text_runs: if given, the text shown by each text showing operator
+                is appended to it with its position and font size, for
+                layout analysis. See :class:`TextRuns<PyPDF2.TextRuns>`.
+            page_number: page number recorded with the runs in text_runs.
 
         Returns:
             The extracted text
@@ -1848,6 +1944,10 @@ class PageObject(DictionaryObject):
         if isinstance(orientations, int):
             orientations = (orientations,)
 
+        visitor_run = None
+        if text_runs is not None:
+            visitor_run = functools.partial(text_runs.append, page=page_number)
+
         return self._extract_text(
             self,
             self.pdf,
@@ -1857,7 +1957,52 @@ class PageObject(DictionaryObject):
             visitor_operand_before,
             visitor_operand_after,
             visitor_text,
+            visitor_run,
+        )
+
+    def iter_text(
+        self,
+        orientations: Union[int, Tuple[int, ...]] = (0, 90, 180, 270),
+        space_width: float = 200.0,
+        visitor_operand_before: Optional[Callable[[Any, Any, Any, Any], None]] = None,
+        visitor_operand_after: Optional[Callable[[Any, Any, Any, Any], None]] = None,
+        visitor_text: Optional[Callable[[Any, Any, Any, Any, Any], None]] = None,
+    ) -> Iterator[str]:
+        """
+        Incremental version of :meth:`extract_text`.
+
+        The text is yielded in fragments while the content stream is being
+        processed; joining all the fragments gives the result of
+        :meth:`extract_text` with the same arguments. This allows a caller to
+        stop as soon as it has enough text.
+
+        Args:
+            orientations: see :meth:`extract_text`
+            space_width: see :meth:`extract_text`
+            visitor_operand_before: see :meth:`extract_text`
+            visitor_operand_after: see :meth:`extract_text`
+            visitor_text: see :meth:`extract_text`
+
+        Returns:
+            An iterator over the extracted text fragments
+        """
+        if isinstance(orientations, int):
+            orientations = (orientations,)
+
+        fragments = self._iter_text(
+            self,
+            self.pdf,
+            orientations,
+            space_width,
+            PG.CONTENTS,
+            visitor_operand_before,
+            visitor_operand_after,
+            visitor_text,
         )
+        profiler = getattr(self.pdf, "profiler", None)
+        if profiler is not None:
+            fragments = profiler.iterate("text_ops", fragments)
+        return fragments
 
     def extract_xform_text(
         self,
@@ -1888,6 +2033,61 @@ class PageObject(DictionaryObject):
             visitor_text,
         )
 
+    def _extract_xform_text_cached(
+        self,
+        xform: Any,
+        orientations: Tuple[int, ...],
+        space_width: float,
+        visitor_operand_before: Optional[Callable[[Any, Any, Any, Any], None]],
+        visitor_operand_after: Optional[Callable[[Any, Any, Any, Any], None]],
+        visitor_text: Optional[Callable[[Any, Any, Any, Any, Any], None]],
+        visitor_run: Optional[Callable[[str, float, float, float], None]] = None,
+    ) -> str:
+        """
+        Same as extract_xform_text, memoized in the reader per form object.
+
+        The text of a form only depends on the form itself, so forms invoked
+        on every page (letterheads, footers, watermarks) are only parsed
+        once per document. Visitors must see every operator, so nothing is
+        memoized when one is given.
+        """
+        if visitor_run is not None:
+            return self._extract_text(
+                xform.get_object(),
+                self.pdf,
+                orientations,
+                space_width,
+                None,
+                visitor_operand_before,
+                visitor_operand_after,
+                visitor_text,
+                visitor_run,
+            )
+        cache = getattr(self.pdf, "_xform_text_cache", None)
+        key = None
+        if (
+            cache is not None
+            and isinstance(xform, IndirectObject)
+            and xform.pdf is self.pdf
+            and visitor_operand_before is None
+            and visitor_operand_after is None
+            and visitor_text is None
+        ):
+            key = (xform.idnum, xform.generation, tuple(orientations), space_width)
+            if key in cache:
+                return cache[key]
+        text = self.extract_xform_text(
+            xform.get_object(),
+            orientations,
+            space_width,
+            visitor_operand_before,
+            visitor_operand_after,
+            visitor_text,
+        )
+        if key is not None:
+            cache[key] = text
+        return text
+
     def extractText(
         self, Tj_sep: str = "", TJ_sep: str = ""
     ) -> str:  # pragma: no cover
@@ -1911,6 +2111,50 @@ class PageObject(DictionaryObject):
         unembedded = fonts - embedded
         return embedded, unembedded
 
+    def classify_content(self, min_image_coverage: float = 0.8) -> str:
+        """
+        Tell whether the page has a text layer, without extracting its text.
+
+        The decoded content streams are only scanned for a few operators
+        (text showing, ``cm``, ``q``/``Q``, ``Do`` and inline images), up to
+        the first text shown, which is much cheaper than
+        :meth:`extract_text`. Text counts only where the resources define
+        fonts; form XObjects are scanned as well.
+
+        Args:
+            min_image_coverage: fraction of the media box that the images
+                must cover for a page without text to be a scan.
+
+        Returns:
+            ``"text"`` if the page shows text, ``"image"`` if it has no
+            text and images cover the page (a scanned page that needs OCR),
+            and ``"none"`` otherwise (blank page, vector graphics only).
+        """
+        profiler = getattr(self.pdf, "profiler", None)
+        with profile_phase(profiler, "classify_content"):
+            scan = _ContentScan()
+            resources = self.get(PG.RESOURCES)
+            contents = self.get(PG.CONTENTS)
+            if contents is not None:
+                contents = contents.get_object()
+                if isinstance(contents, ArrayObject):
+                    data = b"\n".join(c.get_object().get_data() for c in contents)
+                else:
+                    data = contents.get_data()
+                scan.scan(data, resources, (1.0, 0.0, 0.0, 1.0))
+            if scan.has_text:
+                return "text"
+            try:
+                page_area = abs(float(self.mediabox.width * self.mediabox.height))
+            except Exception:
+                page_area = 0.0
+            if scan.images and (
+                page_area <= 0
+                or scan.image_area >= min_image_coverage * page_area
+            ):
+                return "image"
+            return "none"
+
     mediabox = _create_rectangle_accessor(PG.MEDIABOX, ())
     """
     A :class:`RectangleObject<PyPDF2.generic.RectangleObject>`, expressed in default user space units,
@@ -2112,3 +2356,147 @@ def _get_fonts_walk(
         _get_fonts_walk(cast(DictionaryObject, obj[key]), fnt, emb)
 
     return fnt, emb  # return the sets for each page
+
+
+_DELIMITED = rb"(?![^\s/\[\]()<>{}%])"
+# operators looked at by PageObject.classify_content; the other operators and
+# their operands are skipped without being parsed
+_CONTENT_SCAN_PATTERN = re.compile(
+    rb"(?<![\d.])(?P<cm>(?:[-+]?(?:\d+\.?\d*|\.\d+)\s+){6})cm"
+    + _DELIMITED
+    + rb"|(?<![^\s\])>])(?P<gs>[qQ])"
+    + _DELIMITED
+    + rb"|(?P<text>[)\]>]\s*(?:Tj|TJ|'|\"))"
+    + _DELIMITED
+    + rb"|/(?P<do>[^\s/\[\]()<>{}%]+)\s*Do"
+    + _DELIMITED
+    + rb"|(?<![^\s\])>])(?P<bi>BI)"
+    + _DELIMITED
+)
+# start of the data of an inline image, and its end (the data is binary and
+# can hold anything looking like operators)
+_INLINE_IMAGE_DATA = re.compile(rb"(?<![^\s>\]])ID\s")
+_INLINE_IMAGE_END = re.compile(rb"\sEI" + _DELIMITED)
+# nesting limit for form XObjects in PageObject.classify_content
+_CONTENT_SCAN_MAX_DEPTH = 8
+
+
+def _multiply_linear(
+    matrix: Any, ctm: Tuple[float, float, float, float]
+) -> Tuple[float, float, float, float]:
+    """Linear part of ``matrix`` (6 numbers) concatenated to ``ctm``."""
+    a, b, c, d = (float(x) for x in matrix[:4])
+    return (
+        a * ctm[0] + b * ctm[2],
+        a * ctm[1] + b * ctm[3],
+        c * ctm[0] + d * ctm[2],
+        c * ctm[1] + d * ctm[3],
+    )
+
+
+def _transformed_run_visitor(
+    visitor_run: Callable[[str, float, float, float], None],
+    form_matrix: Any,
+    cm_matrix: List[float],
+) -> Callable[[str, float, float, float], None]:
+    """
+    visitor_run for the content of a form XObject, which is extracted in
+    the coordinates of the form: the runs are moved to those of the page.
+    """
+    m = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+    if form_matrix is not None:
+        m = [float(x) for x in form_matrix]
+    a, b, c, d, e, f = (
+        m[0] * cm_matrix[0] + m[1] * cm_matrix[2],
+        m[0] * cm_matrix[1] + m[1] * cm_matrix[3],
+        m[2] * cm_matrix[0] + m[3] * cm_matrix[2],
+        m[2] * cm_matrix[1] + m[3] * cm_matrix[3],
+        m[4] * cm_matrix[0] + m[5] * cm_matrix[2] + cm_matrix[4],
+        m[4] * cm_matrix[1] + m[5] * cm_matrix[3] + cm_matrix[5],
+    )
+    scale = math.sqrt(abs(a * d) + abs(b * c))
+
+    def visitor(text: str, x: float, y: float, font_size: float) -> None:
+        visitor_run(text, x * a + y * c + e, x * b + y * d + f, font_size * scale)
+
+    return visitor
+
+
+class _ContentScan:
+    """Text and image area found in content streams."""
+
+    def __init__(self) -> None:
+        self.has_text = False
+        self.images = 0
+        self.image_area = 0.0
+        self._depth = 0
+
+    def scan(
+        self,
+        data: bytes,
+        resources: Any,
+        ctm: Tuple[float, float, float, float],
+    ) -> None:
+        """
+        Scan ``data``, drawn with ``resources`` and the linear part
+        ``(a, b, c, d)`` of the current transformation matrix.
+        """
+        resources = resources.get_object() if resources is not None else None
+        if not isinstance(resources, DictionaryObject):
+            resources = DictionaryObject()
+        has_fonts = bool(resources.get(RES.FONT))
+        xobjects = resources.get(RES.XOBJECT)
+        xobjects = xobjects.get_object() if xobjects is not None else {}
+        stack: List[Tuple[float, float, float, float]] = []
+        pos = 0
+        while True:
+            match = _CONTENT_SCAN_PATTERN.search(data, pos)
+            if match is None:
+                return
+            pos = match.end()
+            if match.group("bi"):
+                # inline images are drawn on the unit square too
+                self.images += 1
+                self.image_area += abs(ctm[0] * ctm[3] - ctm[1] * ctm[2])
+                start = _INLINE_IMAGE_DATA.search(data, pos)
+                end = _INLINE_IMAGE_END.search(data, start.end()) if start else None
+                if end is None:
+                    return
+                pos = end.end()
+            elif match.group("cm"):
+                ctm = _multiply_linear(match.group("cm").split(), ctm)
+            elif match.group("gs") == b"q":
+                stack.append(ctm)
+            elif match.group("gs"):
+                if stack:
+                    ctm = stack.pop()
+            elif match.group("text"):
+                if has_fonts:
+                    # the rest of the page does not change the answer
+                    self.has_text = True
+                    return
+            else:
+                name = "/" + match.group("do").decode("latin-1")
+                xobject = xobjects.get(name)
+                if xobject is None:
+                    continue
+                xobject = xobject.get_object()
+                subtype = xobject.get(IA.SUBTYPE)
+                if subtype == "/Image":
+                    # images are drawn on the unit square
+                    self.images += 1
+                    self.image_area += abs(ctm[0] * ctm[3] - ctm[1] * ctm[2])
+                elif subtype == "/Form" and self._depth < _CONTENT_SCAN_MAX_DEPTH:
+                    matrix = xobject.get("/Matrix")
+                    form_ctm = ctm if matrix is None else _multiply_linear(matrix, ctm)
+                    self._depth += 1
+                    try:
+                        self.scan(
+                            xobject.get_data(),
+                            xobject.get(PG.RESOURCES, resources),
+                            form_ctm,
+                        )
+                    finally:
+                        self._depth -= 1
+                    if self.has_text:
+                        return
@@ -0,0 +1,106 @@
+"""Optional timers and counters describing where the time goes while reading a PDF."""
+
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import (
+    Any,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+class Profiler:
+    """
+    Accumulates the time spent in named phases, and event counters.
+
+    Phases nest: while a phase runs, the time of the enclosing phase is
+    paused, so each timing only covers the work done by the phase itself and
+    the timings of a document add up to the time spent reading it.
+
+    While a phase runs, the profiler is also the one returned by
+    :func:`current_profiler`, which lets code without access to the reader
+    (like the stream filters) report into it.
+    """
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        # [phase, time at which it started or was last resumed]
+        self._stack: List[List[Any]] = []
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def phase(self, name: str, count: bool = True) -> Iterator[None]:
+        """
+        Time the body of the ``with`` statement as phase ``name``, and count
+        it as an event of the same name unless ``count`` is false.
+        """
+        if count:
+            self.count(name)
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self.timings[parent[0]] = (
+                self.timings.get(parent[0], 0.0) + now - parent[1]
+            )
+        self._stack.append([name, now])
+        token = _current_profiler.set(self)
+        try:
+            yield
+        finally:
+            _current_profiler.reset(token)
+            now = time.perf_counter()
+            _, start = self._stack.pop()
+            self.timings[name] = self.timings.get(name, 0.0) + now - start
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def iterate(self, name: str, iterator: Iterator[T]) -> Iterator[T]:
+        """
+        Wrap a lazy iterator so that producing its items is timed as phase
+        ``name``, and the time spent by the consumer is not.
+        """
+        while True:
+            with self.phase(name, count=False):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Timings in seconds and counters, by phase or event name."""
+        return {
+            "timings": {
+                name: round(value, 6) for name, value in self.timings.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+
+_current_profiler: ContextVar[Optional[Profiler]] = ContextVar(
+    "_current_profiler", default=None
+)
+_NOT_PROFILED = nullcontext()
+
+
+def current_profiler() -> Optional[Profiler]:
+    """The profiler of the phase being run, if any."""
+    return _current_profiler.get()
+
+
+def profile_phase(profiler: Optional[Profiler], name: str) -> ContextManager[None]:
+    """:meth:`Profiler.phase` if a profiler is given, a no-op context otherwise."""
+    if profiler is None:
+        return _NOT_PROFILED
+    return profiler.phase(name)
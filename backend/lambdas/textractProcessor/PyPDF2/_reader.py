@@ -27,28 +27,37 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import mmap
 import os
 import re
 import struct
 import zlib
+from bisect import bisect_right
 from datetime import datetime
 from io import BytesIO
 from pathlib import Path
+from types import TracebackType
 from typing import (
     Any,
     Callable,
     Dict,
     Iterable,
+    Iterator,
     List,
     Optional,
     Tuple,
+    Type,
     Union,
     cast,
 )
 
+from ._cache import LRUCache
 from ._encryption import Encryption, PasswordType
+from ._layout import TextRuns
 from ._page import PageObject, _VirtualList
+from ._profile import Profiler, profile_phase
 from ._utils import (
+    BufferStream,
     StrByteType,
     StreamType,
     b_,
@@ -93,10 +102,12 @@ from .generic import (
     NullObject,
     NumberObject,
     PdfObject,
+    StreamObject,
     TextStringObject,
     TreeObject,
     read_object,
 )
+from .pagerange import PageRange
 from .types import OutlineType, PagemodeType
 from .xmp import XmpInformation
 
@@ -109,6 +120,67 @@ def convert_to_int(d: bytes, size: int) -> Union[int, Tuple[Any, ...]]:
     return struct.unpack(">q", d)[0]
 
 
+# a standard xref table entry: "nnnnnnnnnn ggggg n" and a 2 byte EOL
+_XREF_ENTRY_PATTERN = re.compile(rb"(\d{10}) (\d{5}) ([fn])(?: \r| \n|\r\n)")
+_XREF_ENTRIES_PATTERN = re.compile(rb"(?:\d{10} \d{5} [fn](?: \r| \n|\r\n))*")
+# object headers and trailers found when rebuilding a broken xref table
+_OBJ_HEADER_PATTERN = re.compile(rb"[\r\n \t][ \t]*(\d+)[ \t]+(\d+)[ \t]+obj")
+_TRAILER_PATTERN = re.compile(rb"[\r\n \t][ \t]*trailer[\r\n \t]*(<<)")
+
+# budget of the decoded object stream cache when cache_max_bytes is not set
+_OBJECT_STREAM_CACHE_MAX_BYTES = 16 * 1024 * 1024
+# /Type of the objects never evicted from the resolved object cache
+_STRUCTURAL_TYPES = frozenset(("/Catalog", "/Pages", "/Page", "/Font"))
+
+
+def _get_stream_buffer(stream: StreamType) -> Any:
+    """
+    Whole content of the stream in a form the re module can search.
+
+    Streams exposing their buffer (BytesIO, BufferStream over an mmap) are
+    searched in place instead of being copied.
+    """
+    if hasattr(stream, "getbuffer"):
+        return stream.getbuffer()  # type: ignore
+    p = stream.tell()
+    stream.seek(0, 0)
+    buf = stream.read(-1)
+    stream.seek(p, 0)
+    return buf
+
+
+def _estimate_object_size(obj: Optional[PdfObject]) -> int:
+    """Rough estimate of the memory held by a resolved object."""
+    if isinstance(obj, ContentStream):
+        return 64 * (len(obj.operations) + len(obj) + 1)
+    if isinstance(obj, StreamObject):
+        raw = obj._raw_data
+        # memoryview slices of a memory-mapped file live in the page cache
+        size = 0 if isinstance(raw, memoryview) else len(raw or b"")
+        size += 64 * (len(obj) + 1)
+        decoded = obj.decoded_self
+        if decoded is not None:
+            size += _estimate_object_size(decoded)
+        return size
+    if isinstance(obj, (DictionaryObject, ArrayObject)):
+        return 64 * (len(obj) + 1)
+    if isinstance(obj, (bytes, str)):
+        return len(obj) + 64
+    return 64
+
+
+def _is_structural_object(obj: Optional[PdfObject]) -> bool:
+    """
+    The catalog, the nodes of the page tree and font dictionaries: they are
+    small and referenced over and over while extracting text.
+    """
+    return (
+        isinstance(obj, DictionaryObject)
+        and not isinstance(obj, StreamObject)
+        and obj.get("/Type") in _STRUCTURAL_TYPES
+    )
+
+
 def convertToInt(
     d: bytes, size: int
 ) -> Union[int, Tuple[Any, ...]]:  # pragma: no cover
@@ -292,6 +364,26 @@ class PdfReader:
     :param None/str/bytes password: Decrypt PDF file at initialization. If the
         password is None, the file will not be decrypted.
         Defaults to ``None``
+    :param None/int cache_max_bytes: Memory budget in bytes for the cache of
+        resolved indirect objects. Least recently used objects are evicted
+        and read again from the file when needed. ``None`` keeps every
+        object for the lifetime of the reader.
+        Defaults to ``None``
+    :param bool cache_pin_structural: Never evict the catalog, the page
+        tree and font dictionaries, which are read over and over, so only
+        the other objects are subject to the budget.
+        Defaults to ``True``
+    :param bool use_mmap: When ``stream`` is a path, memory-map the file
+        instead of reading it into memory. Stream data is then only copied
+        out of the mapping when it is decoded, and processes reading the
+        same file share a single copy in the page cache. An ``mmap.mmap``
+        object can also be passed as ``stream`` directly.
+        Defaults to ``False``
+    :param bool profile: Record the time spent in each phase of the reading
+        (cross-reference tables, object resolution, stream decoding per
+        filter, content stream parsing, fonts and text operators) along with
+        event counters, see :attr:`profile_stats`.
+        Defaults to ``False``
     """
 
     def __init__(
@@ -299,10 +391,34 @@ class PdfReader:
         stream: Union[StrByteType, Path],
         strict: bool = False,
         password: Union[None, str, bytes] = None,
+        cache_max_bytes: Optional[int] = None,
+        cache_pin_structural: bool = True,
+        use_mmap: bool = False,
+        profile: bool = False,
     ) -> None:
         self.strict = strict
+        self.profiler: Optional[Profiler] = Profiler() if profile else None
         self.flattened_pages: Optional[List[PageObject]] = None
-        self.resolved_objects: Dict[Tuple[Any, Any], Optional[PdfObject]] = {}
+        # stmnum -> decoded data, /First, /N and offset table of object streams
+        self._object_streams = LRUCache(
+            cache_max_bytes
+            if cache_max_bytes is not None
+            else _OBJECT_STREAM_CACHE_MAX_BYTES,
+            sizeof=lambda entry: len(entry[0]) + 64 * len(entry[3]),
+        )
+        # pages materialized on demand by descending the page tree
+        self._lazy_pages: Dict[int, PageObject] = {}
+        # idnum of a checked /Pages node -> its page count and the running
+        # totals of its kids' page counts (see _get_page_tree_layout)
+        self._page_tree_layouts: Dict[int, Tuple[int, Optional[List[int]]]] = {}
+        # (idnum, generation, orientations, space_width) of a form XObject
+        # -> its extracted text, shared by all the pages invoking it
+        self._xform_text_cache: Dict[Tuple[Any, ...], str] = {}
+        self.resolved_objects = LRUCache(
+            cache_max_bytes,
+            sizeof=_estimate_object_size,
+            pin=_is_structural_object if cache_pin_structural else None,
+        )
         self.xref_index = 0
         self._page_id2num: Optional[
             Dict[Any, Any]
@@ -313,10 +429,22 @@ class PdfReader:
                 "It may not be read correctly.",
                 __name__,
             )
+        # whether the stream was opened here, and is closed by close()
+        self._owns_stream = isinstance(stream, (str, Path))
         if isinstance(stream, (str, Path)):
             with open(stream, "rb") as fh:
-                stream = BytesIO(fh.read())
-        self.read(stream)
+                if use_mmap:
+                    if not os.fstat(fh.fileno()).st_size:
+                        raise EmptyFileError("Cannot read an empty file")
+                    stream = BufferStream(
+                        mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+                    )
+                else:
+                    stream = BytesIO(fh.read())
+        elif isinstance(stream, mmap.mmap):
+            stream = BufferStream(stream)
+        with profile_phase(self.profiler, "xref"):
+            self.read(stream)
         self.stream = stream
 
         self._override_encryption = False
@@ -346,6 +474,37 @@ class PdfReader:
             if password is not None:
                 raise PdfReadError("Not encrypted file")
 
+    def __enter__(self) -> "PdfReader":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Drop the cached objects and close the stream if it was opened by the
+        reader (``stream`` given as a path).
+
+        Stream data still sharing the input buffer (see
+        :meth:`BufferStream.read_view<PyPDF2._utils.BufferStream.read_view>`)
+        is copied first, so that objects kept by the caller stay readable and
+        a memory-mapped file is unmapped, and its descriptor closed, right
+        away instead of whenever the objects, which reference the reader,
+        are garbage collected.
+        """
+        for obj in self.resolved_objects.values():
+            if isinstance(obj, StreamObject):
+                obj._data  # copies memoryview data, see StreamObject._data
+        self.resolved_objects.clear()
+        self._object_streams.clear()
+        if self._owns_stream:
+            self.stream.close()
+
     @property
     def pdf_header(self) -> str:
         # TODO: Make this return a bytes object for consistency
@@ -445,6 +604,9 @@ class PdfReader:
             return self.trailer[TK.ROOT]["/Pages"]["/Count"]  # type: ignore
         else:
             if self.flattened_pages is None:
+                count = self._get_page_tree_count()
+                if count is not None:
+                    return count
                 self._flatten()
             return len(self.flattened_pages)  # type: ignore
 
@@ -489,6 +651,12 @@ class PdfReader:
         # ensure that we're not trying to access an encrypted PDF
         # assert not self.trailer.has_key(TK.ENCRYPT)
         if self.flattened_pages is None:
+            if page_number in self._lazy_pages:
+                return self._lazy_pages[page_number]
+            page = self._get_page_from_tree(page_number)
+            if page is not None:
+                self._lazy_pages[page_number] = page
+                return page
             self._flatten()
         assert self.flattened_pages is not None, "hint for mypy"
         return self.flattened_pages[page_number]
@@ -985,6 +1153,109 @@ class PdfReader:
         """Read-only property that emulates a list of :py:class:`Page<PyPDF2._page.Page>` objects."""
         return _VirtualList(self._get_num_pages, self._get_page)  # type: ignore
 
+    def iter_text(
+        self,
+        orientations: Union[int, Tuple[int, ...]] = (0, 90, 180, 270),
+        space_width: float = 200.0,
+        pages: Optional[Iterable[int]] = None,
+    ) -> Iterator[Tuple[int, str]]:
+        """
+        Extract the text of the document incrementally.
+
+        Pages are only loaded and parsed when the iteration reaches them, so
+        breaking out of the loop early skips the work for the remaining pages.
+
+        :param orientations: see :meth:`PageObject.extract_text`
+        :param space_width: see :meth:`PageObject.extract_text`
+        :param pages: Indices of the pages to extract, in the order they are
+            wanted, see :meth:`select_pages`. Defaults to all the pages.
+        :return: An iterator over ``(page_index, fragment)`` tuples
+        """
+        if pages is None:
+            pages = range(len(self.pages))
+        for page_index in pages:
+            page = self.pages[page_index]
+            for fragment in page.iter_text(orientations, space_width):
+                yield page_index, fragment
+
+    def select_pages(
+        self,
+        page_ranges: Union[
+            str, slice, PageRange, Iterable[Union[str, slice, PageRange]]
+        ] = (),
+        first: int = 0,
+        last: int = 0,
+        every: int = 0,
+    ) -> List[int]:
+        """
+        Select pages by page ranges and sampling strategies.
+
+        The selections are combined, e.g. ``first=3, last=2`` selects the
+        three first and the two last pages. Only the page count is read,
+        from the /Count of the page tree (see :meth:`_get_page_tree_count`),
+        so open-ended and negative ranges do not load any page.
+
+        :param page_ranges: A page range, or a list of them, in any form
+            accepted by :class:`PageRange<PyPDF2.pagerange.PageRange>`, like
+            ``"0:3"``, ``"-2:"`` or ``slice(0, 3)``.
+        :param int first: Select the first ``first`` pages.
+        :param int last: Select the last ``last`` pages.
+        :param int every: Select one page out of ``every``, starting with the
+            first one.
+        :return: The sorted indices of the selected pages; all the pages when
+            nothing is selected.
+        """
+        num_pages = len(self.pages)
+        if isinstance(page_ranges, (str, slice, PageRange)):
+            page_ranges = [page_ranges]
+        else:
+            page_ranges = list(page_ranges)
+        if not (page_ranges or first or last or every):
+            return list(range(num_pages))
+        selected = set()
+        for page_range in page_ranges:
+            selected.update(range(*PageRange(page_range).indices(num_pages)))
+        selected.update(range(min(first, num_pages)))
+        selected.update(range(max(num_pages - last, 0), num_pages))
+        if every > 0:
+            selected.update(range(0, num_pages, every))
+        return sorted(selected)
+
+    def extract_pages_text(
+        self,
+        page_ranges: Union[
+            str, slice, PageRange, Iterable[Union[str, slice, PageRange]]
+        ] = (),
+        first: int = 0,
+        last: int = 0,
+        every: int = 0,
+        orientations: Union[int, Tuple[int, ...]] = (0, 90, 180, 270),
+        space_width: float = 200.0,
+        text_runs: Optional[TextRuns] = None,
+    ) -> Dict[int, str]:
+        """
+        Extract the text of the pages selected as in :meth:`select_pages`.
+
+        Only the selected pages, and the objects they use, are read.
+
+        :param orientations: see :meth:`PageObject.extract_text`
+        :param space_width: see :meth:`PageObject.extract_text`
+        :param text_runs: if given, the positioned text runs of the pages are
+            appended to it, with the index of their page. See
+            :meth:`PageObject.extract_text`
+        :return: A dictionary mapping the index of each selected page to its
+            text, in page order.
+        """
+        texts: Dict[int, str] = {}
+        for page_index in self.select_pages(page_ranges, first, last, every):
+            texts[page_index] = self.pages[page_index].extract_text(
+                orientations,
+                space_width,
+                text_runs=text_runs,
+                page_number=page_index,
+            )
+        return texts
+
     @property
     def page_layout(self) -> Optional[str]:
         """
@@ -1127,59 +1398,240 @@ class PdfReader:
             # TODO: Could flattened_pages be None at this point?
             self.flattened_pages.append(page_obj)  # type: ignore
 
-    def _get_object_from_stream(
-        self, indirect_reference: IndirectObject
-    ) -> Union[int, PdfObject, str]:
-        # indirect reference to object in object stream
-        # read the entire object stream into memory
-        stmnum, idx = self.xref_objStm[indirect_reference.idnum]
+    def _get_page_tree_count(self) -> Optional[int]:
+        """
+        Count the pages from the /Count of the page tree root, checked
+        against the /Count of its kids only (see
+        :meth:`_get_page_tree_layout`), so that no page is read.
+
+        :return: the page count, or ``None`` if the page tree has to be
+            flattened instead.
+        """
+        try:
+            catalog = cast(DictionaryObject, self.trailer[TK.ROOT].get_object())
+            root = cast(DictionaryObject, catalog["/Pages"].get_object())
+            layout = self._get_page_tree_layout(root)
+        except (KeyError, AttributeError, TypeError, IndexError):
+            return None
+        return None if layout is None else layout[0]
+
+    def _get_page_tree_layout(
+        self, node: DictionaryObject
+    ) -> Optional[Tuple[int, Optional[List[int]]]]:
+        """
+        Page count of a /Pages node from its /Count, checked against its kids.
+
+        A node with as many kids as pages is taken to hold one page per kid,
+        which is checked for the kid descended into; the /Count entries of
+        the kids of any other node must add up to its own /Count. Only the
+        nodes on the path to a page are checked, so the pages are not read
+        to be counted and errors cancelling out elsewhere go unnoticed.
+        Layouts are memoized per node.
+
+        :return: the page count and the running totals of the kids' page
+            counts (``None`` for a node with one page per kid), or ``None``
+            if the node is inconsistent.
+        """
+        ref = getattr(node, "indirect_reference", None)
+        if ref is not None and ref.idnum in self._page_tree_layouts:
+            return self._page_tree_layouts[ref.idnum]
+        count = node.get(PA.COUNT)
+        kids = node.get(PA.KIDS)
+        if not isinstance(count, int) or count < 0 or not isinstance(kids, ArrayObject):
+            return None
+        totals: Optional[List[int]] = None
+        if len(kids) != count:
+            totals = []
+            total = 0
+            for kid in kids:
+                claimed = self._claimed_page_tree_count(kid)
+                if claimed is None:
+                    return None
+                total += claimed
+                totals.append(total)
+            if total != count:
+                return None
+        layout = (int(count), totals)
+        if ref is not None:
+            self._page_tree_layouts[ref.idnum] = layout
+        return layout
+
+    def _claimed_page_tree_count(self, kid: Any) -> Optional[int]:
+        """Number of pages under a node of the page tree according to its /Count."""
+        kid_obj = kid.get_object()
+        if not isinstance(kid_obj, DictionaryObject):
+            return None
+        if kid_obj.get(PA.TYPE, "/Pages") == "/Page":
+            return 1
+        count = kid_obj.get(PA.COUNT)
+        if not isinstance(count, int) or count < 0:
+            return None
+        return int(count)
+
+    def _locate_page_in_kids(
+        self, node: DictionaryObject, page_number: int
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Find the kid of a /Pages node holding a page, from the layout of the
+        node (see :meth:`_get_page_tree_layout`).
+
+        :return: the index of the kid and the page number within the kid, or
+            ``None`` if the page tree is inconsistent.
+        """
+        layout = self._get_page_tree_layout(node)
+        if layout is None:
+            return None
+        count, totals = layout
+        if not 0 <= page_number < count:
+            return None
+        if totals is None:
+            kid = cast(ArrayObject, node[PA.KIDS])[page_number]
+            if self._claimed_page_tree_count(kid) != 1:
+                return None
+            return page_number, 0
+        kid_idx = bisect_right(totals, page_number)
+        return kid_idx, page_number - (totals[kid_idx - 1] if kid_idx else 0)
+
+    def _get_page_from_tree(self, page_number: int) -> Optional[PageObject]:
+        """
+        Materialize a single page by descending the page tree using the
+        /Count entries of the intermediate /Pages nodes, checked along the
+        way (see :meth:`_get_page_tree_layout`).
+
+        This only touches the nodes on the path to the page, instead of
+        building every :class:`PageObject<PyPDF2._page.PageObject>` like
+        :meth:`_flatten` does.
+
+        :param int page_number: The page number to retrieve
+            (pages begin at zero)
+        :return: the page, or ``None`` if the page tree is inconsistent and
+            has to be flattened instead.
+        """
+        inheritable_page_attributes = (
+            NameObject(PG.RESOURCES),
+            NameObject(PG.MEDIABOX),
+            NameObject(PG.CROPBOX),
+            NameObject(PG.ROTATE),
+        )
+        inherit: Dict[str, Any] = {}
+        indirect_reference: Optional[IndirectObject] = None
+        try:
+            catalog = cast(DictionaryObject, self.trailer[TK.ROOT].get_object())
+            node = cast(DictionaryObject, catalog["/Pages"].get_object())
+            for _ in range(64):  # guard against cyclic page trees
+                if PA.KIDS not in node:
+                    break
+                for attr in inheritable_page_attributes:
+                    if attr in node:
+                        inherit[attr] = node[attr]
+                location = self._locate_page_in_kids(node, page_number)
+                if location is None:
+                    return None
+                kid_idx, page_number = location
+                kid = cast(ArrayObject, node[PA.KIDS])[kid_idx]
+                if isinstance(kid, IndirectObject):
+                    indirect_reference = kid
+                node = cast(DictionaryObject, kid.get_object())
+            else:
+                return None
+        except (KeyError, AttributeError, TypeError, IndexError):
+            return None
+        if page_number != 0 or node.get(PA.TYPE, "/Page") != "/Page":
+            return None
+
+        for attr_in, value in inherit.items():
+            # if the page has it's own value, it does not inherit the
+            # parent's value:
+            if attr_in not in node:
+                node[attr_in] = value
+        page_obj = PageObject(self, indirect_reference)
+        page_obj.update(node)
+        return page_obj
+
+    def _get_object_stream(
+        self, stmnum: int
+    ) -> Tuple[bytes, int, int, Dict[int, Tuple[int, int]]]:
+        """
+        Decoded data, /First, /N and offset table of an object stream.
+
+        Each object stream is decoded and its offset table parsed only once;
+        the result is kept in a bounded cache so that pulling any object
+        out of an already seen object stream is a dictionary lookup.
+        """
+        entry = self._object_streams.get(stmnum)
+        if entry is not None:
+            return entry
         obj_stm: EncodedStreamObject = IndirectObject(stmnum, 0, self).get_object()  # type: ignore
         # This is an xref to a stream, so its type better be a stream
         assert cast(str, obj_stm["/Type"]) == "/ObjStm"
+        data = b_(obj_stm.get_data())
+        first = int(obj_stm["/First"])  # type: ignore
         # /N is the number of indirect objects in the stream
-        assert idx < obj_stm["/N"]
-        stream_data = BytesIO(b_(obj_stm.get_data()))  # type: ignore
-        for i in range(obj_stm["/N"]):  # type: ignore
-            read_non_whitespace(stream_data)
-            stream_data.seek(-1, 1)
-            objnum = NumberObject.read_from_stream(stream_data)
-            read_non_whitespace(stream_data)
-            stream_data.seek(-1, 1)
-            offset = NumberObject.read_from_stream(stream_data)
-            read_non_whitespace(stream_data)
-            stream_data.seek(-1, 1)
-            if objnum != indirect_reference.idnum:
-                # We're only interested in one object
-                continue
-            if self.strict and idx != i:
-                raise PdfReadError("Object is in wrong index.")
-            stream_data.seek(int(obj_stm["/First"] + offset), 0)  # type: ignore
-
-            # to cope with some case where the 'pointer' is on a white space
-            read_non_whitespace(stream_data)
-            stream_data.seek(-1, 1)
-
+        n = int(obj_stm["/N"])  # type: ignore
+        # the header is made of /N pairs "objnum offset"
+        header = data[:first].split()
+        offsets: Dict[int, Tuple[int, int]] = {}
+        for i in range(min(n, len(header) // 2)):
             try:
-                obj = read_object(stream_data, self)
-            except PdfStreamError as exc:
-                # Stream object cannot be read. Normally, a critical error, but
-                # Adobe Reader doesn't complain, so continue (in strict mode?)
+                objnum = int(header[2 * i])
+                offset = int(header[2 * i + 1])
+            except ValueError:
                 logger_warning(
-                    f"Invalid stream (index {i}) within object "
-                    f"{indirect_reference.idnum} {indirect_reference.generation}: "
-                    f"{exc}",
+                    f"Invalid offset table in object stream {stmnum} at index {i}",
                     __name__,
                 )
-
                 if self.strict:
-                    raise PdfReadError(f"Can't read object stream: {exc}")
-                # Replace with null. Hopefully it's nothing important.
-                obj = NullObject()
-            return obj
+                    raise PdfReadError(f"Can't read object stream {stmnum}")
+                break
+            # keep the first occurrence, like a sequential scan would
+            offsets.setdefault(objnum, (i, offset))
+        entry = (data, first, n, offsets)
+        self._object_streams[stmnum] = entry
+        # the decoded data is held by the entry; keeping the stream object
+        # resolved as well would hold and count it twice
+        if (0, stmnum) in self.resolved_objects:
+            del self.resolved_objects[(0, stmnum)]
+        return entry
 
-        if self.strict:
-            raise PdfReadError("This is a fatal error in strict mode.")
-        return NullObject()
+    def _get_object_from_stream(
+        self, indirect_reference: IndirectObject
+    ) -> Union[int, PdfObject, str]:
+        # indirect reference to object in object stream
+        stmnum, idx = self.xref_objStm[indirect_reference.idnum]
+        data, first, n, offsets = self._get_object_stream(stmnum)
+        assert idx < n
+        if indirect_reference.idnum not in offsets:
+            if self.strict:
+                raise PdfReadError("This is a fatal error in strict mode.")
+            return NullObject()
+        i, offset = offsets[indirect_reference.idnum]
+        if self.strict and idx != i:
+            raise PdfReadError("Object is in wrong index.")
+        # BytesIO shares the buffer of data, this does not copy it
+        stream_data = BytesIO(data)
+        stream_data.seek(first + offset, 0)
+
+        # to cope with some case where the 'pointer' is on a white space
+        read_non_whitespace(stream_data)
+        stream_data.seek(-1, 1)
+
+        try:
+            obj = read_object(stream_data, self)
+        except PdfStreamError as exc:
+            # Stream object cannot be read. Normally, a critical error, but
+            # Adobe Reader doesn't complain, so continue (in strict mode?)
+            logger_warning(
+                f"Invalid stream (index {i}) within object "
+                f"{indirect_reference.idnum} {indirect_reference.generation}: "
+                f"{exc}",
+                __name__,
+            )
+
+            if self.strict:
+                raise PdfReadError(f"Can't read object stream: {exc}")
+            # Replace with null. Hopefully it's nothing important.
+            obj = NullObject()
+        return obj
 
     def _get_indirect_object(self, num: int, gen: int) -> Optional[PdfObject]:
         """
@@ -1198,6 +1650,15 @@ class PdfReader:
         )
         if retval is not None:
             return retval
+        if self.profiler is not None:
+            with self.profiler.phase("resolve"):
+                return self._read_indirect_object(indirect_reference)
+        return self._read_indirect_object(indirect_reference)
+
+    def _read_indirect_object(
+        self, indirect_reference: IndirectObject
+    ) -> Optional[PdfObject]:
+        retval: Optional[PdfObject] = None
         if (
             indirect_reference.generation == 0
             and indirect_reference.idnum in self.xref_objStm
@@ -1216,13 +1677,7 @@ class PdfReader:
             try:
                 idnum, generation = self.read_object_header(self.stream)
             except Exception:
-                if hasattr(self.stream, "getbuffer"):
-                    buf = bytes(self.stream.getbuffer())  # type: ignore
-                else:
-                    p = self.stream.tell()
-                    self.stream.seek(0, 0)
-                    buf = self.stream.read(-1)
-                    self.stream.seek(p, 0)
+                buf = _get_stream_buffer(self.stream)
                 m = re.search(
                     rf"\s{indirect_reference.idnum}\s+{indirect_reference.generation}\s+obj".encode(),
                     buf,
@@ -1270,13 +1725,7 @@ class PdfReader:
                     retval, indirect_reference.idnum, indirect_reference.generation
                 )
         else:
-            if hasattr(self.stream, "getbuffer"):
-                buf = bytes(self.stream.getbuffer())  # type: ignore
-            else:
-                p = self.stream.tell()
-                self.stream.seek(0, 0)
-                buf = self.stream.read(-1)
-                self.stream.seek(p, 0)
+            buf = _get_stream_buffer(self.stream)
             m = re.search(
                 rf"\s{indirect_reference.idnum}\s+{indirect_reference.generation}\s+obj".encode(),
                 buf,
@@ -1373,6 +1822,25 @@ class PdfReader:
     ) -> Optional[PdfObject]:
         return self.resolved_objects.get((generation, idnum))
 
+    @property
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        Hits, misses, evictions and memory usage of the cache of resolved
+        indirect objects.
+        """
+        return self.resolved_objects.stats
+
+    @property
+    def profile_stats(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Time spent in seconds and number of times each phase was entered, by
+        phase, when the reader was created with ``profile=True``; ``None``
+        otherwise. Reading pages and extracting their text adds to it.
+        """
+        if self.profiler is None:
+            return None
+        return self.profiler.stats
+
     def cacheGetIndirectObject(
         self, generation: int, idnum: int
     ) -> Optional[PdfObject]:  # pragma: no cover
@@ -1515,6 +1983,11 @@ class PdfReader:
             stream.seek(-1, 1)
             cnt = 0
             while cnt < size:
+                bulk_cnt = self._read_xref_entries_bulk(stream, num, size - cnt)
+                cnt += bulk_cnt
+                num += bulk_cnt
+                if cnt == size:
+                    break
                 line = stream.read(20)
 
                 # It's very clear in section 3.4.3 of the PDF spec
@@ -1536,20 +2009,14 @@ class PdfReader:
                 if line[-1] in b"0123456789t":
                     stream.seek(-1, 1)
 
+                entry_type_b = line[17:18]
                 try:
                     offset_b, generation_b = line[:16].split(b" ")
-                    entry_type_b = line[17:18]
 
                     offset, generation = int(offset_b), int(generation_b)
                 except Exception:
                     # if something wrong occured
-                    if hasattr(stream, "getbuffer"):
-                        buf = bytes(stream.getbuffer())  # type: ignore
-                    else:
-                        p = stream.tell()
-                        stream.seek(0, 0)
-                        buf = stream.read(-1)
-                        stream.seek(p)
+                    buf = _get_stream_buffer(stream)
 
                     f = re.search(f"{num}\\s+(\\d+)\\s+obj".encode(), buf)
                     if f is None:
@@ -1567,25 +2034,7 @@ class PdfReader:
                         generation = int(f.group(1))
                         offset = f.start()
 
-                if generation not in self.xref:
-                    self.xref[generation] = {}
-                    self.xref_free_entry[generation] = {}
-                if num in self.xref[generation]:
-                    # It really seems like we should allow the last
-                    # xref table in the file to override previous
-                    # ones. Since we read the file backwards, assume
-                    # any existing key is already set correctly.
-                    pass
-                else:
-                    self.xref[generation][num] = offset
-                    try:
-                        self.xref_free_entry[generation][num] = entry_type_b == b"f"
-                    except Exception:
-                        pass
-                    try:
-                        self.xref_free_entry[65535][num] = entry_type_b == b"f"
-                    except Exception:
-                        pass
+                self._set_xref_table_entry(num, offset, generation, entry_type_b)
                 cnt += 1
                 num += 1
             read_non_whitespace(stream)
@@ -1597,6 +2046,83 @@ class PdfReader:
             else:
                 break
 
+    def _read_xref_entries_bulk(self, stream: StreamType, num: int, size: int) -> int:
+        """
+        Read up to ``size`` well-formed 20-byte xref entries with one read.
+
+        :return: the number of entries read. The stream is left right after
+            them, so the caller can handle a malformed entry one by one and
+            then continue in bulk.
+        """
+        pos = stream.tell()
+        block = stream.read(20 * size)
+        # length of the run of well-formed entries at the start of the block
+        end = _XREF_ENTRIES_PATTERN.match(block).end()  # type: ignore
+        stream.seek(pos + end, 0)
+        count = end // 20
+        if count == 0:
+            return 0
+        # each entry is "offset generation type", separated by whitespace
+        fields = block[:end].split()
+        offsets = list(map(int, fields[0::3]))
+        generations = list(map(int, fields[1::3]))
+        entry_types = fields[2::3]
+
+        # entries up to the first one of each new generation have to be
+        # processed in order, as they create the dictionaries of the
+        # generation; usually this is only the "0000000000 65535 f" head
+        head = 0
+        for generation in set(generations):
+            if generation not in self.xref:
+                head = max(head, generations.index(generation) + 1)
+        for i in range(head):
+            self._set_xref_table_entry(
+                num + i, offsets[i], generations[i], entry_types[i]
+            )
+        if head == count:
+            return count
+
+        nums = range(num + head, num + count)
+        generation = generations[head]
+        xref_gen = self.xref[generation]
+        if generations[head:].count(generation) == count - head:
+            if not xref_gen.keys() & nums:
+                # same effect as _set_xref_table_entry for each entry
+                is_free = list(map(b"f".__eq__, entry_types[head:]))
+                xref_gen.update(zip(nums, offsets[head:]))
+                self.xref_free_entry[generation].update(zip(nums, is_free))
+                if 65535 in self.xref_free_entry:
+                    self.xref_free_entry[65535].update(zip(nums, is_free))
+                return count
+        for i in range(head, count):
+            self._set_xref_table_entry(
+                num + i, offsets[i], generations[i], entry_types[i]
+            )
+        return count
+
+    def _set_xref_table_entry(
+        self, num: int, offset: int, generation: int, entry_type_b: bytes
+    ) -> None:
+        if generation not in self.xref:
+            self.xref[generation] = {}
+            self.xref_free_entry[generation] = {}
+        if num in self.xref[generation]:
+            # It really seems like we should allow the last
+            # xref table in the file to override previous
+            # ones. Since we read the file backwards, assume
+            # any existing key is already set correctly.
+            pass
+        else:
+            self.xref[generation][num] = offset
+            try:
+                self.xref_free_entry[generation][num] = entry_type_b == b"f"
+            except Exception:
+                pass
+            try:
+                self.xref_free_entry[65535][num] = entry_type_b == b"f"
+            except Exception:
+                pass
+
     def _read_xref_tables_and_trailers(
         self, stream: StreamType, startxref: Optional[int], xref_issue_nr: int
     ) -> None:
@@ -1614,7 +2140,8 @@ class PdfReader:
                 startxref = self._read_xref(stream)
             elif xref_issue_nr:
                 try:
-                    self._rebuild_xref_table(stream)
+                    with profile_phase(self.profiler, "xref_repair"):
+                        self._rebuild_xref_table(stream)
                     break
                 except Exception:
                     xref_issue_nr = 0
@@ -1706,7 +2233,8 @@ class PdfReader:
             # if Root has been already found, just raise warning
             logger_warning("Invalid parent xref., rebuild xref", __name__)
             try:
-                self._rebuild_xref_table(stream)
+                with profile_phase(self.profiler, "xref_repair"):
+                    self._rebuild_xref_table(stream)
                 return None
             except Exception:
                 raise PdfReadError("can not rebuild xref")
@@ -1779,17 +2307,16 @@ class PdfReader:
 
     def _rebuild_xref_table(self, stream: StreamType) -> None:
         self.xref = {}
-        stream.seek(0, 0)
-        f_ = stream.read(-1)
+        f_ = _get_stream_buffer(stream)
 
-        for m in re.finditer(rb"[\r\n \t][ \t]*(\d+)[ \t]+(\d+)[ \t]+obj", f_):
+        for m in _OBJ_HEADER_PATTERN.finditer(f_):
             idnum = int(m.group(1))
             generation = int(m.group(2))
             if generation not in self.xref:
                 self.xref[generation] = {}
             self.xref[generation][idnum] = m.start(1)
         stream.seek(0, 0)
-        for m in re.finditer(rb"[\r\n \t][ \t]*trailer[\r\n \t]*(<<)", f_):
+        for m in _TRAILER_PATTERN.finditer(f_):
             stream.seek(m.start(1), 0)
             new_trailer = cast(Dict[Any, Any], read_object(stream, self))
             # Here, we are parsing the file from start to end, the new data have to erase the existing.
@@ -469,3 +469,81 @@ class File:
 
     def __repr__(self) -> str:
         return f"File(name={self.name}, data: {_human_readable_bytes(len(self.data))}, hash: {hash(self.data)})"
+
+
+class BufferStream:
+    """
+    Read-only, seekable stream over a buffer such as an ``mmap.mmap``.
+
+    Unlike ``io.BytesIO``, the buffer is not copied. :meth:`read` returns
+    ``bytes`` like any other stream, while :meth:`read_view` returns a
+    ``memoryview`` slice of the buffer, which is used for stream data so it
+    stays in the (shared) page cache until it is decoded.
+    """
+
+    mode = "rb"
+
+    def __init__(self, buffer: Any) -> None:
+        self._buffer = buffer
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        start, end = self._advance(size)
+        # slicing mmap or bytes directly is much faster than going through
+        # the memoryview for the many small reads of the parser
+        data = self._buffer[start:end]
+        return data if isinstance(data, bytes) else bytes(data)
+
+    def read_view(self, size: Optional[int] = -1) -> memoryview:
+        start, end = self._advance(size)
+        return self._view[start:end]
+
+    def _advance(self, size: Optional[int]) -> Tuple[int, int]:
+        start = self._pos
+        if size is None or size < 0:
+            end = len(self._view)
+        else:
+            end = min(start + size, len(self._view))
+        self._pos = max(start, end)
+        return start, end
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError(f"negative seek value {offset}")
+        self._pos = offset
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def getbuffer(self) -> memoryview:
+        return self._view
+
+    def seekable(self) -> bool:
+        return True
+
+    def readable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        """
+        Release the buffer, and close it if it can be closed.
+
+        Slices returned by :meth:`read_view` that are still alive keep the
+        buffer exported; it is then left to be closed when the last of them
+        is garbage collected instead of raising ``BufferError``.
+        """
+        try:
+            self._view.release()
+            if hasattr(self._buffer, "close"):
+                self._buffer.close()
+        except BufferError:
+            pass
+        self._view = memoryview(b"")
+        self._buffer = b""
+        self._pos = 0
@@ -34,6 +34,7 @@ See TABLE H.1 Abbreviations for standard filter names
 __author__ = "Mathieu Fenniak"
 __author_email__ = "biziqe@mathieu.fenniak.net"
 
+import binascii
 import math
 import struct
 import zlib
@@ -49,6 +50,7 @@ except ImportError:
     # For older Python versions, the backport typing_extensions is necessary:
     from typing_extensions import Literal  # type: ignore[misc]
 
+from ._profile import current_profiler, profile_phase
 from ._utils import b_, deprecate_with_replacement, ord_, paeth_predictor
 from .constants import CcittFaxDecodeParameters as CCITT
 from .constants import ColorSpaces
@@ -60,6 +62,12 @@ from .constants import LzwFilterParameters as LZW
 from .constants import StreamAttributes as SA
 from .errors import PdfReadError, PdfStreamError
 
+# bytes skipped by ASCIIHexDecode (the ones for which str.isspace() is true)
+_HEX_WHITESPACES = bytes(c for c in range(256) if chr(c).isspace())
+# bytes skipped by ASCII85Decode, and the table mapping its digits to values
+_A85_IGNORED = bytes(c for c in range(256) if not (33 <= c <= 117 or c == 122))
+_A85_DIGITS = bytes((c - 33) % 256 for c in range(256))
+
 
 def decompress(data: bytes) -> bytes:
     try:
@@ -197,41 +205,31 @@ class ASCIIHexDecode:
 
     @staticmethod
     def decode(
-        data: str,
+        data: Union[str, bytes],
         decode_parms: Union[None, ArrayObject, DictionaryObject] = None,  # noqa: F841
         **kwargs: Any,
-    ) -> str:
+    ) -> Union[str, bytes]:
         """
-        :param data: a str sequence of hexadecimal-encoded values to be
+        :param data: a str or bytes sequence of hexadecimal-encoded values to be
             converted into a base-7 ASCII string
         :param decode_parms:
         :return: a string conversion in base-7 ASCII, where each of its values
-            v is such that 0 <= ord(v) <= 127.
+            v is such that 0 <= ord(v) <= 127; bytes if data is bytes.
 
         :raises PdfStreamError:
         """
         if "decodeParms" in kwargs:  # pragma: no cover
             deprecate_with_replacement("decodeParms", "parameters", "4.0.0")
             decode_parms = kwargs["decodeParms"]  # noqa: F841
-        retval = ""
-        hex_pair = ""
-        index = 0
-        while True:
-            if index >= len(data):
-                raise PdfStreamError("Unexpected EOD in ASCIIHexDecode")
-            char = data[index]
-            if char == ">":
-                break
-            elif char.isspace():
-                index += 1
-                continue
-            hex_pair += char
-            if len(hex_pair) == 2:
-                retval += chr(int(hex_pair, base=16))
-                hex_pair = ""
-            index += 1
-        assert hex_pair == ""
-        return retval
+        is_str = isinstance(data, str)
+        raw = data.encode("latin-1") if is_str else data  # type: ignore
+        eod = raw.find(b">")
+        if eod == -1:
+            raise PdfStreamError("Unexpected EOD in ASCIIHexDecode")
+        hex_data = raw[:eod].translate(None, _HEX_WHITESPACES)
+        assert len(hex_data) % 2 == 0
+        retval = binascii.unhexlify(hex_data)
+        return retval.decode("latin-1") if is_str else retval  # type: ignore
 
 
 class LZWDecode:
@@ -348,25 +346,37 @@ class ASCII85Decode:
             decode_parms = kwargs["decodeParms"]  # noqa: F841
         if isinstance(data, str):
             data = data.encode("ascii")
-        group_index = b = 0
-        out = bytearray()
-        for char in data:
-            if ord("!") <= char and char <= ord("u"):
-                group_index += 1
-                b = b * 85 + (char - 33)
-                if group_index == 5:
-                    out += struct.pack(b">L", b)
-                    group_index = b = 0
-            elif char == ord("z"):
-                assert group_index == 0
-                out += b"\0\0\0\0"
-            elif char == ord("~"):
-                if group_index:
-                    for _ in range(5 - group_index):
-                        b = b * 85 + 84
-                    out += struct.pack(b">L", b)[: group_index - 1]
-                break
-        return bytes(out)
+        eod = data.find(b"~")
+        if eod != -1:
+            data = data[:eod]
+        # everything but the digits and "z" is ignored, like whitespace
+        data = data.translate(None, _A85_IGNORED)
+        if b"z" in data:
+            groups = data.split(b"z")
+            for group in groups[:-1]:
+                assert len(group) % 5 == 0
+            data = b"!!!!!".join(groups)
+        remainder = len(data) % 5
+        if remainder:
+            if eod == -1:
+                # an incomplete group is only flushed by the EOD marker
+                data = data[:-remainder]
+                remainder = 0
+            else:
+                data += b"u" * (5 - remainder)
+        digits = data.translate(_A85_DIGITS)
+        out = struct.pack(
+            f">{len(digits) // 5}L",
+            *[
+                c1 * 52200625 + c2 * 614125 + c3 * 7225 + c4 * 85 + c5
+                for c1, c2, c3, c4, c5 in zip(
+                    digits[0::5], digits[1::5], digits[2::5], digits[3::5], digits[4::5]
+                )
+            ],
+        )
+        if remainder:
+            out = out[: remainder - 5]
+        return out
 
 
 class DCTDecode:
@@ -520,33 +530,35 @@ def decode_stream_data(stream: Any) -> Union[str, bytes]:  # utils.StreamObject
     data: bytes = stream._data
     # If there is not data to decode we should not try to decode the data.
     if data:
+        profiler = current_profiler()
         for filter_type in filters:
-            if filter_type in (FT.FLATE_DECODE, FTA.FL):
-                data = FlateDecode.decode(data, stream.get(SA.DECODE_PARMS))
-            elif filter_type in (FT.ASCII_HEX_DECODE, FTA.AHx):
-                data = ASCIIHexDecode.decode(data)  # type: ignore
-            elif filter_type in (FT.LZW_DECODE, FTA.LZW):
-                data = LZWDecode.decode(data, stream.get(SA.DECODE_PARMS))  # type: ignore
-            elif filter_type in (FT.ASCII_85_DECODE, FTA.A85):
-                data = ASCII85Decode.decode(data)
-            elif filter_type == FT.DCT_DECODE:
-                data = DCTDecode.decode(data)
-            elif filter_type == "/JPXDecode":
-                data = JPXDecode.decode(data)
-            elif filter_type == FT.CCITT_FAX_DECODE:
-                height = stream.get(IA.HEIGHT, ())
-                data = CCITTFaxDecode.decode(data, stream.get(SA.DECODE_PARMS), height)
-            elif filter_type == "/Crypt":
-                decode_parms = stream.get(SA.DECODE_PARMS, {})
-                if "/Name" not in decode_parms and "/Type" not in decode_parms:
-                    pass
+            with profile_phase(profiler, f"filter{filter_type}"):
+                if filter_type in (FT.FLATE_DECODE, FTA.FL):
+                    data = FlateDecode.decode(data, stream.get(SA.DECODE_PARMS))
+                elif filter_type in (FT.ASCII_HEX_DECODE, FTA.AHx):
+                    data = ASCIIHexDecode.decode(data)  # type: ignore
+                elif filter_type in (FT.LZW_DECODE, FTA.LZW):
+                    data = LZWDecode.decode(data, stream.get(SA.DECODE_PARMS))  # type: ignore
+                elif filter_type in (FT.ASCII_85_DECODE, FTA.A85):
+                    data = ASCII85Decode.decode(data)
+                elif filter_type == FT.DCT_DECODE:
+                    data = DCTDecode.decode(data)
+                elif filter_type == "/JPXDecode":
+                    data = JPXDecode.decode(data)
+                elif filter_type == FT.CCITT_FAX_DECODE:
+                    height = stream.get(IA.HEIGHT, ())
+                    data = CCITTFaxDecode.decode(data, stream.get(SA.DECODE_PARMS), height)
+                elif filter_type == "/Crypt":
+                    decode_parms = stream.get(SA.DECODE_PARMS, {})
+                    if "/Name" not in decode_parms and "/Type" not in decode_parms:
+                        pass
+                    else:
+                        raise NotImplementedError(
+                            "/Crypt filter with /Name or /Type not supported yet"
+                        )
                 else:
-                    raise NotImplementedError(
-                        "/Crypt filter with /Name or /Type not supported yet"
-                    )
-            else:
-                # Unsupported filter
-                raise NotImplementedError(f"unsupported filter {filter_type}")
+                    # Unsupported filter
+                    raise NotImplementedError(f"unsupported filter {filter_type}")
     return data
 
 
@@ -32,7 +32,18 @@ __author_email__ = "biziqe@mathieu.fenniak.net"
 import logging
 import re
 from io import BytesIO
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Union, cast
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
 from .._protocols import PdfWriterProtocol
 from .._utils import (
@@ -73,6 +84,8 @@ from ._utils import read_hex_string_from_stream, read_string_from_stream
 logger = logging.getLogger(__name__)
 NumberSigns = b"+-"
 IndirectPattern = re.compile(rb"[+-]?(\d+)\s+(\d+)\s+R[^a-zA-Z]")
+_WHITESPACE_CLASS = b"[" + re.escape(b"".join(WHITESPACES)) + b"]"
+InlineImageEndPattern = re.compile(_WHITESPACE_CLASS + b"EI" + _WHITESPACE_CLASS + b"+")
 
 
 class ArrayObject(list, PdfObject):
@@ -427,7 +440,9 @@ class DictionaryObject(dict, PdfObject):
                 length = pdf.get_object(length)
                 stream.seek(t, 0)
             pstart = stream.tell()
-            data["__streamdata__"] = stream.read(length)
+            # zero-copy read for buffer backed streams (see BufferStream)
+            read_data = getattr(stream, "read_view", stream.read)
+            data["__streamdata__"] = read_data(length)
             e = read_non_whitespace(stream)
             ndstream = stream.read(8)
             if (e + ndstream) != b"endstream":
@@ -718,12 +733,21 @@ class StreamObject(DictionaryObject):
 
     @property
     def _data(self) -> Any:
+        if isinstance(self.__data, memoryview):
+            # data read with BufferStream.read_view is a slice of the input
+            # buffer (e.g. a memory-mapped file) until it is actually used
+            self.__data = self.__data.tobytes()
         return self.__data
 
     @_data.setter
     def _data(self, value: Any) -> None:
         self.__data = value
 
+    @property
+    def _raw_data(self) -> Any:
+        """The stream data as stored, without copying memoryview slices."""
+        return self.__data
+
     def write_to_stream(
         self, stream: StreamType, encryption_key: Union[None, str, bytes]
     ) -> None:
@@ -843,6 +867,53 @@ class EncodedStreamObject(StreamObject):
         return self.set_data(data)
 
 
+class _InlineImageOperands(MutableMapping[str, Any]):
+    """
+    Operands of an inline image in ContentStream.operations, its "settings"
+    and "data". The data is kept as its span of the content stream until it
+    is read, so that parsing does not copy the images.
+    """
+
+    def __init__(
+        self,
+        settings: DictionaryObject,
+        stream_data: bytes,
+        start: int,
+        end: int,
+    ) -> None:
+        self._values: Dict[str, Any] = {"settings": settings}
+        self._span: Optional[Tuple[bytes, int, int]] = (stream_data, start, end)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "data" and self._span is not None:
+            stream_data, start, end = self._span
+            self._values["data"] = stream_data[start:end]
+            self._span = None
+        return self._values[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key == "data":
+            self._span = None
+        self._values[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key == "data" and self._span is not None:
+            self._span = None
+        else:
+            del self._values[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._values or (key == "data" and self._span is not None)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._values
+        if self._span is not None:
+            yield "data"
+
+    def __len__(self) -> int:
+        return len(self._values) + (self._span is not None)
+
+
 class ContentStream(DecodedStreamObject):
     def __init__(
         self,
@@ -937,12 +1008,12 @@ class ContentStream(DecodedStreamObject):
                 # encountering a comment -- but read_object assumes that
                 # following the comment must be the object we're trying to
                 # read.  In this case, it could be an operator instead.
-                while peek not in (b"\r", b"\n"):
+                while peek not in (b"\r", b"\n", b""):
                     peek = stream.read(1)
             else:
                 operands.append(read_object(stream, None, self.forced_encoding))
 
-    def _read_inline_image(self, stream: StreamType) -> Dict[str, Any]:
+    def _read_inline_image(self, stream: StreamType) -> _InlineImageOperands:
         # begin reading just after the "BI" - begin image
         # first read the dictionary of settings.
         settings = DictionaryObject()
@@ -960,47 +1031,24 @@ class ContentStream(DecodedStreamObject):
         # left at beginning of ID
         tmp = stream.read(3)
         assert tmp[:2] == b"ID"
-        data = BytesIO()
-        # Read the inline image, while checking for EI (End Image) operator.
-        while True:
-            # Read 8 kB at a time and check if the chunk contains the E operator.
-            buf = stream.read(8192)
-            # We have reached the end of the stream, but haven't found the EI operator.
-            if not buf:
-                raise PdfReadError("Unexpected end of stream")
-            loc = buf.find(b"E")
-
-            if loc == -1:
-                data.write(buf)
-            else:
-                # Write out everything before the E.
-                data.write(buf[0:loc])
-
-                # Seek back in the stream to read the E next.
-                stream.seek(loc - len(buf), 1)
-                tok = stream.read(1)
-                # Check for End Image
-                tok2 = stream.read(1)
-                if tok2 == b"I" and buf[loc - 1 : loc] in WHITESPACES:
-                    # Data can contain [\s]EI,  so check for the separator \s; 4 chars suffisent Q operator not required.
-                    tok3 = stream.read(1)
-                    info = tok + tok2
-                    # We need to find at least one whitespace after.
-                    has_q_whitespace = False
-                    while tok3 in WHITESPACES:
-                        has_q_whitespace = True
-                        info += tok3
-                        tok3 = stream.read(1)
-                    if has_q_whitespace:
-                        stream.seek(-1, 1)
-                        break
-                    else:
-                        stream.seek(-1, 1)
-                        data.write(info)
-                else:
-                    stream.seek(-1, 1)
-                    data.write(tok)
-        return {"settings": settings, "data": data.getvalue()}
+        # The image data ends with a whitespace followed by "EI" and at least
+        # one more whitespace. Search for it over the whole buffer instead of
+        # walking the data, which may contain any number of "E" bytes. The
+        # data is not copied, only its span kept: getvalue() of the BytesIO
+        # of the content stream returns the bytes it was made of.
+        start = stream.tell()
+        if isinstance(stream, BytesIO):
+            buffer = stream.getvalue()
+            base = start
+        else:
+            buffer = stream.read()
+            base = 0
+        match = InlineImageEndPattern.search(buffer, base)
+        if match is None:
+            raise PdfReadError("Unexpected end of stream")
+        stream.seek(start + match.end() - base, 0)
+        # the whitespace before EI is kept with the data
+        return _InlineImageOperands(settings, buffer, base, match.start() + 1)
 
     @property
     def _data(self) -> bytes:
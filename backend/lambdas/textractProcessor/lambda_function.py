@@ -6,10 +6,12 @@ Falls back to PyPDF2 for free text extraction if Textract unavailable.
 import json
 import boto3
 import os
-from typing import Dict, Any
-import io
+import tempfile
+import time
+import uuid
+from typing import Dict, Any, List, Optional
 try:
-    from PyPDF2 import PdfReader
+    from PyPDF2 import PdfReader, TextRuns
     PYPDF2_AVAILABLE = True
     print("PyPDF2 successfully imported")
 except ImportError as e:
@@ -24,19 +26,36 @@ sqs = boto3.client('sqs')
 UPLOAD_BUCKET = os.environ.get('UPLOAD_BUCKET_NAME', 'contract-review-uploads')
 TEXTRACT_BUCKET = os.environ.get('TEXTRACT_BUCKET_NAME', 'contract-textract-results')
 SQS_QUEUE_URL = os.environ.get('SQS_QUEUE_URL')
+# Log per-phase PyPDF2 timings (xref, object resolution, decoding, parsing) for each document
+PDF_PROFILING_ENABLED = os.environ.get('PDF_PROFILING_ENABLED', 'false').lower() == 'true'
+# Pages extracted in preview mode: the first pages (parties, contract type) and
+# the last pages (signatures)
+PREVIEW_FIRST_PAGES = int(os.environ.get('PREVIEW_FIRST_PAGES', '3'))
+PREVIEW_LAST_PAGES = int(os.environ.get('PREVIEW_LAST_PAGES', '2'))
+# Classify pages before starting Textract: documents with a text layer and no
+# scanned pages are extracted with PyPDF2 instead of paying for OCR
+OCR_ROUTING_ENABLED = os.environ.get('OCR_ROUTING_ENABLED', 'true').lower() == 'true'
+# Also save the positioned text runs (text, x, y, font size, page) of free
+# extractions, for clause segmentation; see PyPDF2.TextRuns for the format
+LAYOUT_OUTPUT_ENABLED = os.environ.get('LAYOUT_OUTPUT_ENABLED', 'false').lower() == 'true'
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Process S3 event trigger to extract text from PDF using Textract.
     
+    A direct invocation with {"bucket": ..., "key": ..., "preview": true} only
+    extracts the first and last pages into a preview text object, for routing,
+    contract-type detection and previews.
+    
     Args:
-        event: S3 event from EventBridge
+        event: S3 event from EventBridge, or a direct invocation
         context: Lambda context
         
     Returns:
         Status of text extraction
     """
+    pdf = None
     try:
         print(f"Received event: {json.dumps(event)}")
         
@@ -59,6 +78,10 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             record = records[0]
             bucket = record['s3']['bucket']['name']
             key = record['s3']['object']['key']
+        elif 'bucket' in event and 'key' in event:
+            # Direct invocation
+            bucket = event['bucket']
+            key = event['key']
         else:
             print("Unknown event format")
             return {'statusCode': 400, 'body': 'Unknown event format'}
@@ -76,31 +99,61 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             # Extract contract ID first (needed for both paths)
             contract_id = extract_contract_id_from_key(key)
             
-            # Try Textract first (paid service)
-            use_free_extraction = False
-            try:
-                response = textract.start_document_text_detection(
-                    DocumentLocation={
-                        'S3Object': {
-                            'Bucket': bucket,
-                            'Name': key
-                        }
-                    }
+            # Cheap preview mode: only the first and last pages, no Textract job
+            if event.get('preview'):
+                preview_text = extract_preview_text_from_pdf(bucket, key)
+                preview_key = f"extracted-text/{contract_id}/preview.txt"
+                s3_client.put_object(
+                    Bucket=TEXTRACT_BUCKET,
+                    Key=preview_key,
+                    Body=preview_text,
+                    ContentType='text/plain'
                 )
-                job_id = response['JobId']
-                print(f"Textract job started: {job_id}")
-            except Exception as e:
-                if 'SubscriptionRequiredException' in str(e) or 'AccessDeniedException' in str(e):
-                    # Textract not available - use free PDF extraction
-                    print("Textract not available, using free PDF extraction (PyPDF2)")
+                print(f"Preview text saved to s3://{TEXTRACT_BUCKET}/{preview_key}")
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps({'message': 'Preview extracted', 'preview_key': preview_key})
+                }
+            
+            # Downloaded once, on first use, for both the page classification
+            # and the free extraction
+            pdf = DownloadedPdf(bucket, key)
+            
+            # Skip OCR when every page that shows something has a text layer
+            use_free_extraction = False
+            if OCR_ROUTING_ENABLED:
+                page_kinds = classify_pdf_pages(pdf)
+                if 'text' in page_kinds and 'image' not in page_kinds:
+                    print("Document has a text layer, using free PDF extraction (PyPDF2)")
                     use_free_extraction = True
                     job_id = f"free-extraction-{contract_id}"
-                else:
-                    raise
+            
+            # Try Textract first (paid service)
+            if not use_free_extraction:
+                try:
+                    response = textract.start_document_text_detection(
+                        DocumentLocation={
+                            'S3Object': {
+                                'Bucket': bucket,
+                                'Name': key
+                            }
+                        }
+                    )
+                    job_id = response['JobId']
+                    print(f"Textract job started: {job_id}")
+                except Exception as e:
+                    if 'SubscriptionRequiredException' in str(e) or 'AccessDeniedException' in str(e):
+                        # Textract not available - use free PDF extraction
+                        print("Textract not available, using free PDF extraction (PyPDF2)")
+                        use_free_extraction = True
+                        job_id = f"free-extraction-{contract_id}"
+                    else:
+                        raise
             
             # Free alternative: Extract text using PyPDF2 (if Textract unavailable)
             if use_free_extraction:
-                extracted_text = extract_text_from_pdf_free(bucket, key)
+                text_runs = TextRuns() if LAYOUT_OUTPUT_ENABLED and PYPDF2_AVAILABLE else None
+                extracted_text = extract_text_from_pdf_free(pdf, text_runs)
                 # Save extracted text
                 s3_client.put_object(
                     Bucket=TEXTRACT_BUCKET,
@@ -108,6 +161,14 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     Body=extracted_text,
                     ContentType='text/plain'
                 )
+                if text_runs:
+                    s3_client.put_object(
+                        Bucket=TEXTRACT_BUCKET,
+                        Key=f"extracted-text/{contract_id}/layout.bin",
+                        Body=text_runs.to_bytes(),
+                        ContentType='application/octet-stream'
+                    )
+                    print(f"Layout saved: {len(text_runs)} text runs, {text_runs.nbytes} bytes")
                 print(f"Text extracted using free method, saved to S3")
             
             # Save job metadata
@@ -154,31 +215,75 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
+    finally:
+        if pdf is not None:
+            pdf.close()
+
+
+class DownloadedPdf:
+    """
+    A PDF of S3, downloaded to /tmp and opened on first use, so that the
+    page classification and the text extraction share one download and one
+    PdfReader. The file is memory-mapped instead of holding a copy of the
+    whole document in the heap.
+    """
+    
+    def __init__(self, bucket: str, key: str):
+        self.bucket = bucket
+        self.key = key
+        self.local_path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}.pdf")
+        self.size: Optional[int] = None
+        self._reader: Optional[Any] = None
+    
+    def download(self) -> int:
+        """Download the file unless already done; return its size in bytes."""
+        if self.size is None:
+            s3_client.download_file(self.bucket, self.key, self.local_path)
+            self.size = os.path.getsize(self.local_path)
+        return self.size
+    
+    @property
+    def reader(self) -> Any:
+        """PdfReader of the file, downloading it first if needed."""
+        if self._reader is None:
+            self.download()
+            self._reader = PdfReader(self.local_path, use_mmap=True, profile=PDF_PROFILING_ENABLED)
+        return self._reader
+    
+    def close(self) -> None:
+        """Close the reader and delete the file."""
+        # Unmap the file before deleting it; a reader left to the garbage
+        # collector keeps the mapping and its descriptor open
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if os.path.exists(self.local_path):
+            os.remove(self.local_path)
 
 
-def extract_text_from_pdf_free(bucket: str, key: str) -> str:
+def extract_text_from_pdf_free(pdf: DownloadedPdf, text_runs: Optional[Any] = None) -> str:
     """
     Extract text from PDF using free method (PyPDF2).
     This is a fallback when Textract is not available.
+    When text_runs (a PyPDF2.TextRuns) is given, the positioned text runs of
+    every page are appended to it.
     """
+    bucket, key = pdf.bucket, pdf.key
     try:
-        # Download PDF from S3
-        pdf_obj = s3_client.get_object(Bucket=bucket, Key=key)
-        pdf_bytes = pdf_obj['Body'].read()
+        pdf_size = pdf.download()
         
         print(f"PYPDF2_AVAILABLE: {PYPDF2_AVAILABLE}")
         if not PYPDF2_AVAILABLE:
             print("PyPDF2 not available, returning placeholder")
-            return f"[PDF extracted using free method]\nFile: {key}\nSize: {len(pdf_bytes)} bytes\n\nNote: PyPDF2 not installed. Install PyPDF2 in Lambda layer for actual text extraction."
+            return f"[PDF extracted using free method]\nFile: {key}\nSize: {pdf_size} bytes\n\nNote: PyPDF2 not installed. Install PyPDF2 in Lambda layer for actual text extraction."
         
         # Extract text using PyPDF2
-        pdf_file = io.BytesIO(pdf_bytes)
-        reader = PdfReader(pdf_file)
+        reader = pdf.reader
         
         text_parts = []
         for page_num, page in enumerate(reader.pages, 1):
             try:
-                page_text = page.extract_text()
+                page_text = page.extract_text(text_runs=text_runs, page_number=page_num - 1)
                 if page_text.strip():
                     text_parts.append(page_text)
             except Exception as e:
@@ -187,8 +292,16 @@ def extract_text_from_pdf_free(bucket: str, key: str) -> str:
         
         extracted_text = "\n\n".join(text_parts)
         
+        if PDF_PROFILING_ENABLED:
+            print(f"PDF profile for s3://{bucket}/{key}: " + json.dumps({
+                'size_bytes': pdf_size,
+                'pages': len(reader.pages),
+                'profile': reader.profile_stats,
+                'cache': reader.cache_stats
+            }))
+        
         if not extracted_text.strip():
-            return f"[PDF extracted using free method]\nFile: {key}\nSize: {len(pdf_bytes)} bytes\n\nNote: No text could be extracted from this PDF. It may be image-based or encrypted. Consider using Textract (paid) for better accuracy."
+            return f"[PDF extracted using free method]\nFile: {key}\nSize: {pdf_size} bytes\n\nNote: No text could be extracted from this PDF. It may be image-based or encrypted. Consider using Textract (paid) for better accuracy."
         
         return extracted_text
         
@@ -197,6 +310,80 @@ def extract_text_from_pdf_free(bucket: str, key: str) -> str:
         return f"Error extracting text: {str(e)}"
 
 
+def classify_pdf_pages(pdf: DownloadedPdf) -> List[str]:
+    """
+    Classify each page of a PDF as "text", "image" (scanned, needs OCR) or
+    "none" from its content streams, without extracting any text.
+    Returns an empty list when the PDF cannot be classified.
+    """
+    if not PYPDF2_AVAILABLE:
+        return []
+    
+    try:
+        pdf.download()
+        start = time.perf_counter()
+        reader = pdf.reader
+        
+        page_kinds = []
+        for page_num, page in enumerate(reader.pages, 1):
+            try:
+                page_kinds.append(page.classify_content())
+            except Exception as e:
+                # Unreadable content: let OCR have a look at it
+                print(f"Error classifying page {page_num}: {e}")
+                page_kinds.append('image')
+        
+        print(f"PDF page classification for s3://{pdf.bucket}/{pdf.key}: " + json.dumps({
+            'pages': len(page_kinds),
+            'kinds': {kind: page_kinds.count(kind) for kind in set(page_kinds)},
+            'seconds': round(time.perf_counter() - start, 4)
+        }))
+        return page_kinds
+        
+    except Exception as e:
+        print(f"Error classifying PDF pages: {e}")
+        return []
+
+
+def extract_preview_text_from_pdf(bucket: str, key: str) -> str:
+    """
+    Extract the text of the first and last pages of a PDF only.
+    Pages in between are never parsed, so this stays cheap on long contracts.
+    """
+    if not PYPDF2_AVAILABLE:
+        return f"[PDF preview unavailable]\nFile: {key}\n\nNote: PyPDF2 not installed."
+    
+    pdf = DownloadedPdf(bucket, key)
+    try:
+        reader = pdf.reader
+        page_count = len(reader.pages)
+        
+        page_texts = {}
+        for page_index in reader.select_pages(first=PREVIEW_FIRST_PAGES, last=PREVIEW_LAST_PAGES):
+            try:
+                page_texts[page_index] = reader.pages[page_index].extract_text()
+            except Exception as e:
+                print(f"Error extracting page {page_index + 1}: {e}")
+        
+        if PDF_PROFILING_ENABLED:
+            print(f"PDF preview profile for s3://{bucket}/{key}: " + json.dumps({
+                'pages': page_count,
+                'preview_pages': [page_index + 1 for page_index in page_texts],
+                'profile': reader.profile_stats
+            }))
+        
+        return "\n\n".join(
+            f"--- Page {page_index + 1} of {page_count} ---\n{text}"
+            for page_index, text in page_texts.items()
+        )
+        
+    except Exception as e:
+        print(f"Error in preview extraction: {e}")
+        return f"Error extracting preview: {str(e)}"
+    finally:
+        pdf.close()
+
+
 def extract_contract_id_from_key(key: str) -> str:
     """Extract contract ID from S3 key path."""
     parts = key.split('/')
@@ -15,6 +15,10 @@ echo "Deploying Lambda functions..."
 deploy_lambda() {
     FUNCTION_NAME=$1
     FUNCTION_DIR=$2
+    HANDLER=${3:-lambda_function.lambda_handler}
+    # Same timeouts and ephemeral storage (MB) as the CloudFormation template
+    TIMEOUT=${4:-30}
+    EPHEMERAL_STORAGE=${5:-512}
     
     echo "Deploying $FUNCTION_NAME..."
     
@@ -37,9 +41,10 @@ deploy_lambda() {
             --function-name "${PROJECT_NAME}-${FUNCTION_NAME}-${ENVIRONMENT}" \
             --runtime python3.9 \
             --role "arn:aws:iam::ACCOUNT:role/${PROJECT_NAME}-lambda-role-${ENVIRONMENT}" \
-            --handler lambda_function.lambda_handler \
+            --handler "$HANDLER" \
             --zip-file "fileb://../${FUNCTION_NAME}.zip" \
-            --timeout 30 \
+            --timeout "$TIMEOUT" \
+            --ephemeral-storage "Size=$EPHEMERAL_STORAGE" \
             --region "$REGION"
     
     cd - > /dev/null
@@ -51,9 +56,10 @@ deploy_lambda() {
 cd "$(dirname "$0")/../lambdas"
 
 deploy_lambda "upload-handler" "uploadHandler"
-deploy_lambda "textract-processor" "textractProcessor"
-deploy_lambda "bedrock-analyzer" "bedrockAnalyzer"
-deploy_lambda "sagemaker-scorer" "sageMakerScorer"
+deploy_lambda "textract-processor" "textractProcessor" "lambda_function.lambda_handler" 300
+deploy_lambda "bedrock-analyzer" "bedrockAnalyzer" "lambda_function.lambda_handler" 900
+deploy_lambda "bedrock-batch" "bedrockAnalyzer" "batch_inference.lambda_handler" 900 2048
+deploy_lambda "sagemaker-scorer" "sageMakerScorer" "lambda_function.lambda_handler" 60
 deploy_lambda "notify-user" "notifyUser"
 
 echo "All Lambda functions deployed successfully!"
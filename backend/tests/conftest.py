@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The vendored PyPDF2 is shipped inside the textractProcessor Lambda
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'lambdas', 'textractProcessor')
+)
@@ -0,0 +1,48 @@
+"""
+Inline images (BI ... ID ... EI) in content streams parsed by the vendored
+PyPDF2: their data ends at the first whitespace, EI, whitespace sequence,
+and is only copied out of the content stream when it is read.
+"""
+import pytest
+
+from PyPDF2.errors import PdfReadError
+from PyPDF2.generic import ContentStream, DecodedStreamObject
+
+# Image data full of "E" and "EI" bytes that do not end it
+IMAGE = b"EIE\x00EI\x01E EIx" * 1000
+
+
+def content_stream(data):
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    return ContentStream(stream, None)
+
+
+@pytest.mark.parametrize("separator", [b" ", b"\n", b"\r\n  "])
+def test_inline_image_operations(separator):
+    content = content_stream(
+        b"q BI /W 4 /H 4 /BPC 8 /CS /G ID " + IMAGE + b" EI" + separator + b"Q\n"
+    )
+    operands, operator = content.operations[1]
+    assert [operator for _, operator in content.operations] == [b"q", b"INLINE IMAGE", b"Q"]
+    assert dict(operands["settings"]) == {"/W": 4, "/H": 4, "/BPC": 8, "/CS": "/G"}
+    assert operands["data"] == IMAGE + b" "
+
+
+def test_inline_image_data_is_read_lazily():
+    content = content_stream(b"BI /W 1 ID " + IMAGE + b" EI\n")
+    operands, _ = content.operations[0]
+    assert "data" in operands and list(operands) == ["settings", "data"]
+    assert operands._span is not None
+    assert operands["data"] == IMAGE + b" "
+    assert operands._span is None
+
+
+def test_inline_image_written_back():
+    content = content_stream(b"BI /W 1 ID " + IMAGE + b" EI\n")
+    assert content_stream(content._data).operations[0][0]["data"] == IMAGE + b" "
+
+
+def test_inline_image_without_end():
+    with pytest.raises(PdfReadError):
+        content_stream(b"BI /W 1 ID " + IMAGE)
@@ -0,0 +1,141 @@
+"""
+Page access of the vendored PyPDF2 on page trees whose /Count entries are
+wrong: every page must be found, in order, however the pages are accessed.
+"""
+from io import BytesIO
+
+import pytest
+
+from PyPDF2 import PdfReader
+
+PAGES_PER_NODE = 3
+NODES = 'abc'
+
+
+def build_pdf(counts, nodes=NODES, pages_per_node=PAGES_PER_NODE):
+    """
+    A 9-page PDF whose page tree root has three /Pages kids ('a', 'b', 'c')
+    of three pages each, page N showing the text "Page N". counts overrides
+    the /Count of 'root' or of a kid; nodes and pages_per_node change the
+    shape of the tree.
+    """
+    objects = {
+        1: b'<< /Type /Catalog /Pages 2 0 R >>',
+        3: b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    }
+    next_num = 4
+    page = 0
+    kids = []
+    for name in nodes:
+        node_num = next_num
+        next_num += 1
+        pages = []
+        for _ in range(pages_per_node):
+            page_num, content_num = next_num, next_num + 1
+            next_num += 2
+            content = b'BT /F1 12 Tf 72 700 Td (Page %d) Tj ET' % page
+            objects[content_num] = (
+                b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content)
+            )
+            objects[page_num] = (
+                b'<< /Type /Page /Parent %d 0 R /Contents %d 0 R >>' % (node_num, content_num)
+            )
+            pages.append(b'%d 0 R' % page_num)
+            page += 1
+        objects[node_num] = b'<< /Type /Pages /Parent 2 0 R /Count %d /Kids [%s] >>' % (
+            counts.get(name, pages_per_node), b' '.join(pages)
+        )
+        kids.append(b'%d 0 R' % node_num)
+    objects[2] = (
+        b'<< /Type /Pages /Count %d /Kids [%s] /MediaBox [0 0 612 792]'
+        b' /Resources << /Font << /F1 3 0 R >> >> >>'
+        % (counts.get('root', page), b' '.join(kids))
+    )
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(out)
+        out += b'%d 0 obj\n%s\nendobj\n' % (num, objects[num])
+    size = max(objects) + 1
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % size
+    for num in range(1, size):
+        if num in offsets:
+            out += b'%010d 00000 n \n' % offsets[num]
+        else:
+            out += b'0000000000 65535 f \n'
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, xref)
+    return bytes(out)
+
+
+def page_text(reader, page_number):
+    return reader.pages[page_number].extract_text().strip()
+
+
+EXPECTED = ['Page %d' % n for n in range(len(NODES) * PAGES_PER_NODE)]
+# Only the nodes on the path to a page are checked: errors in kids that the
+# /Count of their parent makes up for, like {'root': 8, 'a': 2}, are only
+# noticed when descending into them
+WRONG_COUNTS = [
+    {},
+    {'root': 8},
+    {'root': 10},
+    {'a': 2},
+    {'a': 4},
+    {'b': 1},
+    {'b': 7},
+    {'a': 0, 'b': 0, 'c': 0},
+    {'a': 2, 'b': 4},
+    {'a': 4, 'b': 2},
+]
+
+
+@pytest.mark.parametrize('counts', WRONG_COUNTS)
+def test_len_and_iteration(counts):
+    reader = PdfReader(BytesIO(build_pdf(counts)))
+    assert len(reader.pages) == len(EXPECTED)
+    assert [page.extract_text().strip() for page in reader.pages] == EXPECTED
+
+
+@pytest.mark.parametrize('counts', WRONG_COUNTS)
+@pytest.mark.parametrize('order', ['forward', 'backward', 'middle_out'])
+def test_random_access(counts, order):
+    numbers = list(range(len(EXPECTED)))
+    if order == 'backward':
+        numbers.reverse()
+    elif order == 'middle_out':
+        middle = len(numbers) // 2
+        numbers.sort(key=lambda n: abs(n - middle))
+    reader = PdfReader(BytesIO(build_pdf(counts)))
+    assert {n: page_text(reader, n) for n in numbers} == dict(enumerate(EXPECTED))
+
+
+@pytest.mark.parametrize('counts', WRONG_COUNTS)
+def test_matches_flattened_pages(counts):
+    flattened = PdfReader(BytesIO(build_pdf(counts)))
+    flattened._flatten()
+    reader = PdfReader(BytesIO(build_pdf(counts)))
+    assert [page_text(reader, n) for n in reversed(range(len(EXPECTED)))] == [
+        page.extract_text().strip() for page in reversed(flattened.flattened_pages)
+    ]
+
+
+def test_len_reads_no_page():
+    reader = PdfReader(BytesIO(build_pdf({})))
+    assert len(reader.pages) == len(EXPECTED)
+    resolved = [reader.resolved_objects[key] for key in reader.resolved_objects]
+    assert not [obj for obj in resolved if obj.get('/Type') == '/Page']
+
+
+@pytest.mark.parametrize('selection, expected', [
+    ({'first': 1}, [0]),
+    ({'page_ranges': '-1:'}, [999]),
+    ({'first': 1, 'last': 1}, [0, 999]),
+])
+def test_preview_reads_only_the_selected_pages(selection, expected):
+    reader = PdfReader(BytesIO(build_pdf({}, nodes=range(20), pages_per_node=50)))
+    texts = reader.extract_pages_text(**selection)
+    assert texts == {n: 'Page %d' % n for n in expected}
+    resolved = [reader.resolved_objects[key] for key in reader.resolved_objects]
+    assert len([obj for obj in resolved if obj.get('/Type') == '/Page']) == len(expected)
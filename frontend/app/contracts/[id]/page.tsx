@@ -32,6 +32,13 @@ export default function ContractDetailPage() {
     fetchAnalysis()
   }, [contractId])
 
+  // Clauses are saved while the analysis streams: refresh until it is done
+  useEffect(() => {
+    if (analysis?.status !== 'processing' && analysis?.status !== 'partially_analyzed') return
+    const timer = setTimeout(fetchAnalysis, 3000)
+    return () => clearTimeout(timer)
+  }, [analysis])
+
   const fetchAnalysis = async () => {
     try {
       const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'https://YOUR_API_GATEWAY_URL/dev'
@@ -8,7 +8,7 @@ interface Contract {
   id: string
   filename: string
   uploadedAt: string
-  status: 'processing' | 'completed' | 'failed'
+  status: 'processing' | 'batch_queued' | 'partially_analyzed' | 'analyzed' | 'completed' | 'failed'
   riskScore?: number
   clausesCount?: number
   summary?: string
@@ -105,9 +105,9 @@ export default function DashboardPage() {
                     )}
                     <span
                       className={`px-3 py-1 rounded-full text-sm font-medium ${
-                        contract.status === 'completed'
+                        contract.status === 'completed' || contract.status === 'analyzed'
                           ? 'bg-green-100 text-green-800'
-                          : contract.status === 'processing'
+                          : contract.status === 'processing' || contract.status === 'batch_queued' || contract.status === 'partially_analyzed'
                           ? 'bg-yellow-100 text-yellow-800'
                           : 'bg-red-100 text-red-800'
                       }`}